@@ -0,0 +1,234 @@
+"""
+Streaming ZIP archives of project photos / documents.
+
+stream_zip() yields the bytes of a ZIP file while it is being written, one
+file chunk at a time, so a download never holds a whole photo (let alone the
+whole archive) in memory. Entries use data descriptors and zip64 as needed,
+which is what lets the archive be written to a non-seekable stream.
+
+Formats that are already compressed (JPEG, PNG, HEIC, PDF, ...) are STORED;
+deflating them costs CPU and saves nothing. Everything else is DEFLATED.
+
+Bulk archives (many projects, one `application_id/` folder each) are built by
+the report worker as `media_archive` ReportJobs; see build_archive().
+"""
+import os
+import re
+import zipfile
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+# Read size for each file; also roughly the peak amount of file data held in memory
+CHUNK_SIZE = 64 * 1024
+
+# ReportJob.report_type of a bulk media archive
+MEDIA_ARCHIVE = 'media_archive'
+
+# Extensions stored as-is in the archive
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.heic', '.heif', '.webp', '.gif', '.pdf',
+    '.zip', '.gz', '.mp4', '.mov',
+}
+
+
+class _ZipSink:
+    """
+    Write-only, non-seekable file object for ZipFile.
+    Bytes written are collected until drain() hands them to the response.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def compress_type_for(name):
+    """ZIP_STORED for already-compressed formats, ZIP_DEFLATED otherwise."""
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE):
+    """
+    Yields a ZIP archive as a sequence of byte strings.
+    `entries` is an iterable of (archive name, FieldFile) pairs. Files that
+    cannot be opened are skipped, like the old in-memory download did.
+    """
+    sink = _ZipSink()
+    date_time = timezone.localtime().timetuple()[:6]
+
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as zf:
+        for arcname, field_file in entries:
+            try:
+                size = field_file.size
+                src = field_file.open('rb')
+            except Exception:
+                continue  # Skip any files that can't be read
+
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            info.compress_type = compress_type_for(arcname)
+            info.file_size = size  # lets zipfile decide whether this entry needs zip64
+            with src, zf.open(info, 'w') as dest:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    # Central directory
+    yield from sink.drain()
+
+
+def survey_entries(survey):
+    """
+    Returns (archive name, FieldFile) pairs for every photo / document of `survey`:
+    roof photo, SurveyMedia uploads, legacy document photos and, if an
+    installation exists, its photos.
+    """
+    def ext(field_file):
+        return os.path.splitext(field_file.name)[1]
+
+    images = []
+
+    if survey.roof_photo:
+        images.append((f'roof_photo{ext(survey.roof_photo)}', survey.roof_photo))
+
+    # New Multi-file Uploads from SurveyMedia
+    for sm in survey.media_files.all():
+        if sm.file:
+            images.append((f"{sm.media_type}_{sm.id}{ext(sm.file)}", sm.file))
+
+    # Legacy Document photos uploaded by Field Engineer
+    if survey.pan_card_photo:
+        images.append((f'pan_card{ext(survey.pan_card_photo)}', survey.pan_card_photo))
+    if survey.aadhar_photo:
+        images.append((f'aadhar_card{ext(survey.aadhar_photo)}', survey.aadhar_photo))
+    if survey.current_bill_photo:
+        images.append((f'current_bill{ext(survey.current_bill_photo)}', survey.current_bill_photo))
+    if survey.bank_account_photo:
+        images.append((f'bank_account{ext(survey.bank_account_photo)}', survey.bank_account_photo))
+    if survey.parent_bank_photo:
+        images.append((f'parent_bank{ext(survey.parent_bank_photo)}', survey.parent_bank_photo))
+    if survey.property_tax_photo:
+        images.append((f'property_tax{ext(survey.property_tax_photo)}', survey.property_tax_photo))
+
+    if hasattr(survey, 'installation'):
+        inst = survey.installation
+        if inst.inverter_serial_photo:
+            images.append((f'inverter_serial{ext(inst.inverter_serial_photo)}', inst.inverter_serial_photo))
+        if inst.inverter_acdb_photo:
+            images.append((f'inverter_acdb{ext(inst.inverter_acdb_photo)}', inst.inverter_acdb_photo))
+        if inst.panel_serial_photo:
+            images.append((f'panel_serial{ext(inst.panel_serial_photo)}', inst.panel_serial_photo))
+        if inst.site_photos_with_customer:
+            images.append((f'site_with_customer{ext(inst.site_photos_with_customer)}', inst.site_photos_with_customer))
+
+        # Additional single/multi photos
+        for add_photo in inst.additional_photos.all():
+            if add_photo.photo:
+                images.append((f"{add_photo.photo_type}_{add_photo.id}{ext(add_photo.photo)}", add_photo.photo))
+
+    return images
+
+
+# ------------------------------------------------------------------
+# Bulk archives (background job)
+# ------------------------------------------------------------------
+def clean_archive_params(data):
+    """
+    Normalizes the bulk archive filters from a POST (date_from, date_to, area,
+    workflow_status, ids) into a dict for ReportJob.params.
+    `ids` may mix survey ids and application ids (WS-APP-00012), separated by
+    commas, spaces or newlines. Raises ValueError if no filter is given or a date is invalid.
+    """
+    from .models import CustomerSurvey
+
+    params = {}
+    for key in ('date_from', 'date_to'):
+        value = (data.get(key) or '').strip()
+        if value:
+            if parse_date(value) is None:
+                raise ValueError(f"Invalid date: {value}")
+            params[key] = value
+    area = (data.get('area') or '').strip()
+    if area:
+        params['area'] = area
+    status = (data.get('workflow_status') or '').strip()
+    if status:
+        if status not in dict(CustomerSurvey.WORKFLOW_STATUS_CHOICES):
+            raise ValueError(f"Invalid workflow status: {status}")
+        params['workflow_status'] = status
+    ids = [t for t in re.split(r'[\s,]+', data.get('ids') or '') if t]
+    if ids:
+        params['ids'] = sorted(set(ids))
+    if not params:
+        raise ValueError("Choose at least one filter (date range, area, status or project IDs).")
+    return params
+
+
+def archive_queryset(params):
+    """Surveys with media that match the bulk archive filters in `params`."""
+    from .models import CustomerSurvey
+
+    surveys = CustomerSurvey.objects.filter(media_count__gt=0)
+    if params.get('ids'):
+        pks = [int(t) for t in params['ids'] if t.isdigit()]
+        app_ids = [t.upper() for t in params['ids'] if not t.isdigit()]
+        surveys = surveys.filter(Q(pk__in=pks) | Q(application_id__in=app_ids))
+    if params.get('date_from'):
+        surveys = surveys.filter(created_at__date__gte=params['date_from'])
+    if params.get('date_to'):
+        surveys = surveys.filter(created_at__date__lte=params['date_to'])
+    if params.get('area'):
+        surveys = surveys.filter(area__icontains=params['area'])
+    if params.get('workflow_status'):
+        surveys = surveys.filter(workflow_status=params['workflow_status'])
+    return surveys.order_by('id')
+
+
+def archive_filename(when=None):
+    when = when or timezone.localtime()
+    return f"Media_Archive_{when.strftime('%Y%m%d_%H%M%S')}.zip"
+
+
+def build_archive(params, fileobj, progress=None):
+    """
+    Writes one ZIP of every matching project's media to `fileobj`, with one
+    `application_id/` folder per project. Files are streamed from disk a chunk
+    at a time; `progress(percent)` is called as files are added.
+    Returns the number of files written.
+    """
+    surveys = archive_queryset(params)
+    total = surveys.aggregate(n=Sum('media_count'))['n'] or 0
+    done = 0
+
+    def entries():
+        nonlocal done
+        rows = surveys.select_related('installation').prefetch_related(
+            'media_files', 'installation__additional_photos',
+        )
+        for survey in rows.iterator(chunk_size=100):
+            folder = survey.application_id or f"survey_{survey.pk}"
+            for name, field_file in survey_entries(survey):
+                yield f"{folder}/{name}", field_file
+                done += 1
+                if progress and total:
+                    progress(min(99, done * 100 // total))
+
+    for chunk in stream_zip(entries()):
+        fileobj.write(chunk)
+    return done
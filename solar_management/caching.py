@@ -0,0 +1,117 @@
+"""
+Application cache tier with versioned keys.
+
+Every cached value is keyed on the current *version* of the models it was
+computed from. Saving or deleting a CustomerSurvey, Installation,
+BankDetails, SurveyMedia, InstallationPhoto or UserProfile bumps that model's
+version once the transaction commits (see bump_cache_version in models.py),
+so every key built on the old version is never read again and expires on its
+own. Views can therefore cache generously without serving stale data.
+
+    from .caching import cached, cached_queryset, cache_json
+
+    total = cached('survey_total', [CustomerSurvey], lambda: CustomerSurvey.objects.count())
+    rows = cached_queryset('recent_loans', BankDetails.objects.order_by('-id')[:5], timeout=60)
+
+    @cache_json([CustomerSurvey, Installation])
+    def lookup_view(request): ...
+
+Writes done with QuerySet.update() (which sends no signals) must call
+bump_version(model) themselves if cached data depends on those columns.
+
+The backend is Django's `default` cache (CACHES, settings section 11): locmem
+with DEBUG and in tests, otherwise a shared file (default) or Redis cache so
+all gunicorn workers see the same versions.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+_MISSING = object()
+
+
+def _version_key(model):
+    return f"v:{model._meta.label_lower}"
+
+
+def _new_version():
+    # Seeded from the clock: if a counter is evicted, restarting it can't reuse the old (cached) numbers
+    return time.time_ns()
+
+
+def model_versions(models):
+    """Current version of each model, in one cache round-trip."""
+    keys = [_version_key(m) for m in models]
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    for key, version in missing.items():
+        cache.add(key, version, timeout=None)
+    if missing:
+        found.update(cache.get_many(list(missing)))  # another worker may have added it first
+    return [found.get(key, missing.get(key)) for key in keys]
+
+
+def bump_version(model):
+    """Invalidates every cached value computed from `model`."""
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def versioned_key(name, models, *parts):
+    """Cache key for `name` + `parts` under the current versions of `models`."""
+    versions = '.'.join(str(v) for v in model_versions(models))
+    raw = '|'.join(str(p) for p in parts)
+    digest = hashlib.md5(raw.encode()).hexdigest() if raw else ''
+    return f"c:{name}:{versions}:{digest}"
+
+
+def cached(name, models, compute, *parts, timeout=None):
+    """Returns the cached result of compute(), recomputing it once any of `models` changed."""
+    key = versioned_key(name, models, *parts)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout or settings.CACHE_DEFAULT_TIMEOUT)
+    return value
+
+
+def cached_queryset(name, queryset, *parts, models=None, timeout=None):
+    """
+    The rows of `queryset` as a list, cached. Depends on the queryset's model
+    unless `models` lists everything it reads (select_related tables etc.).
+    """
+    return cached(name, models or [queryset.model], lambda: list(queryset), str(queryset.query), *parts, timeout=timeout)
+
+
+def cache_json(models, timeout=None, per_user=False):
+    """
+    Caches a JSON view's response body, keyed on the request path and query
+    string (and the user, with per_user=True). Only 200 responses are cached.
+    """
+    def decorator(view_func):
+        name = f"json:{view_func.__module__}.{view_func.__name__}"
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+            parts = [request.get_full_path()]
+            if per_user:
+                parts.append(request.user.pk)
+            key = versioned_key(name, models, *parts)
+            body = cache.get(key)
+            if body is not None:
+                return HttpResponse(body, content_type='application/json')
+            response = view_func(request, *args, **kwargs)
+            if isinstance(response, JsonResponse) and response.status_code == 200:
+                cache.set(key, response.content, timeout or settings.CACHE_DEFAULT_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+
+def image_compression(request):
+    """Settings for the browser-side photo compression script (static/js/image_compress.js)."""
+    return {
+        'image_compression': {
+            'enabled': settings.CLIENT_IMAGE_COMPRESSION_ENABLED,
+            'max_dimension': settings.CLIENT_IMAGE_MAX_DIMENSION,
+            'quality': settings.CLIENT_IMAGE_QUALITY,
+        }
+    }
+
+
+def roles(request):
+    """The user's per-request Roles (see roles.py), loaded only if a template uses it."""
+    from .roles import user_roles
+    return {'roles': SimpleLazyObject(lambda: user_roles(request.user))}
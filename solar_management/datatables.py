@@ -0,0 +1,182 @@
+"""
+Server-side data tables for the office list pages.
+
+office_fe_data, office_installer_data and enquiry_list used to render every
+row of their table (every column of every survey / installation / enquiry)
+into one HTML page. The pages now render only the table shell; the rows come
+from the same URL with `?format=json` (static/js/data_table.js), one page at
+a time:
+
+    ?format=json                     first page, default sort
+    &columns=customer_name,sc_no     only these columns (the `.values()` query
+                                     selects just the fields they need)
+    &sort=-created_at                any sortable column, `-` for descending
+    &q=ravi                          search
+    &workflow_status=Completed       exact filter on a filterable column
+    &cursor=...                      next / previous page (pagination.py)
+
+The response is {results, next, previous, total, total_capped, sort}; `total`
+is counted up to TOTAL_LIMIT only. Sorting is keyset-paginated on
+(sort column, id), so sortable columns must be non-null model fields.
+"""
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from .pagination import KeysetPaginator
+from .projections import Field, Projection, sources
+
+TOTAL_LIMIT = 1000
+
+
+def _date(value):
+    return timezone.localtime(value).strftime('%b %d, %Y') if value else ''
+
+
+def _time(value):
+    return timezone.localtime(value).strftime('%I:%M %p') if value else ''
+
+
+def _full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+class Column(Field):
+    """A projection Field that the table can also sort / filter on."""
+
+    def __init__(self, name, fields=None, render=None, sortable=False, filterable=False):
+        super().__init__(name, fields, render)
+        self.sortable = sortable
+        self.filterable = filterable
+
+
+class DataTable:
+    columns = ()
+    default_sort = '-created_at'
+    per_page = 25
+    max_per_page = 100
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        return queryset
+
+    def _sort(self, requested):
+        sortable = {column.name for column in self.columns if column.sortable}
+        if requested and requested.lstrip('-') in sortable:
+            return requested
+        return self.default_sort
+
+    def _per_page(self, requested):
+        try:
+            return max(1, min(int(requested), self.max_per_page))
+        except (TypeError, ValueError):
+            return self.per_page
+
+    def response(self, request):
+        params = request.GET
+        projection = Projection(*self.columns)
+        columns = projection.select(params.get('columns'))
+        sort = self._sort(params.get('sort'))
+
+        queryset = self.get_queryset()
+        query = params.get('q', '').strip()
+        if query:
+            queryset = self.search(queryset, query)
+        for column in self.columns:
+            value = params.get(column.name)
+            if column.filterable and value:
+                queryset = queryset.filter(**{column.fields[0]: value})
+
+        fields = {'id', sort.lstrip('-'), *sources(columns)}
+        ordering = (sort, '-id' if sort.startswith('-') else 'id')
+        paginator = KeysetPaginator(queryset.values(*fields), self._per_page(params.get('per_page')),
+                                    ordering, total_limit=TOTAL_LIMIT)
+        page = paginator.page(params.get('cursor'))
+
+        data = page.to_json(lambda row: projection.serialize(row, columns))
+        data['sort'] = sort
+        return JsonResponse(data)
+
+
+class SurveyTable(DataTable):
+    """office_fe_data: every customer survey."""
+    columns = (
+        Column('id'),
+        Column('application_id'),
+        Column('customer_name', sortable=True),
+        Column('sc_no', sortable=True),
+        Column('submitted_by', ('created_by__username', 'created_by__first_name', 'created_by__last_name'),
+               lambda row: _full_name(row['created_by__first_name'], row['created_by__last_name'])
+               or row['created_by__username'] or ''),
+        Column('workflow_status', sortable=True, filterable=True),
+        Column('completed', ('workflow_status',), lambda row: row['workflow_status'] == 'Completed'),
+        Column('created_at', render=lambda row: row['created_at'].isoformat(), sortable=True),
+        Column('created_date', ('created_at',), lambda row: _date(row['created_at'])),
+        Column('created_time', ('created_at',), lambda row: _time(row['created_at'])),
+        Column('view_url', ('id',), lambda row: reverse('site_detail_fe_view', args=[row['id']])),
+        Column('edit_url', ('id',), lambda row: reverse('update_survey', args=[row['id']])),
+        Column('download_url', ('id',), lambda row: reverse('download_images', args=[row['id']])),
+    )
+
+    def get_queryset(self):
+        from .models import CustomerSurvey
+        return CustomerSurvey.objects.all()
+
+    def search(self, queryset, query):
+        from .search import search_surveys
+        return search_surveys(query, queryset)
+
+
+class InstallationTable(DataTable):
+    """office_installer_data: every installation with its survey."""
+    default_sort = '-timestamp'
+    columns = (
+        Column('id'),
+        Column('survey_id'),
+        Column('application_id', ('survey__application_id',)),
+        Column('customer_name', ('survey__customer_name',)),
+        Column('sc_no', ('survey__sc_no',)),
+        Column('uploaded_by', ('updated_by__first_name', 'updated_by__last_name'),
+               lambda row: _full_name(row['updated_by__first_name'], row['updated_by__last_name'])),
+        Column('inverter_make', sortable=True),
+        Column('timestamp', render=lambda row: row['timestamp'].isoformat(), sortable=True),
+        Column('date', ('timestamp',), lambda row: _date(row['timestamp'])),
+        Column('time', ('timestamp',), lambda row: _time(row['timestamp'])),
+        Column('view_url', ('survey_id',), lambda row: reverse('site_detail_installer_view', args=[row['survey_id']])),
+        Column('edit_url', ('survey_id',), lambda row: reverse('update_installation', args=[row['survey_id']])),
+        Column('download_url', ('survey_id',), lambda row: reverse('download_images', args=[row['survey_id']])),
+    )
+
+    def get_queryset(self):
+        from .models import Installation
+        return Installation.objects.all()
+
+    def search(self, queryset, query):
+        from .search import search_survey_ids
+        return queryset.filter(survey_id__in=search_survey_ids(query))
+
+
+class EnquiryTable(DataTable):
+    """enquiry_list: contact requests from the landing page."""
+    columns = (
+        Column('id'),
+        Column('name', sortable=True),
+        Column('mobile_number', sortable=True),
+        Column('email', render=lambda row: row['email'] or ''),
+        Column('address'),
+        Column('created_at', render=lambda row: row['created_at'].isoformat(), sortable=True),
+        Column('created_date', ('created_at',), lambda row: _date(row['created_at'])),
+        Column('created_time', ('created_at',), lambda row: _time(row['created_at'])),
+    )
+
+    def get_queryset(self):
+        from .models import Enquiry
+        return Enquiry.objects.all()
+
+    def search(self, queryset, query):
+        from django.db.models import Q
+        return queryset.filter(
+            Q(name__icontains=query) | Q(mobile_number__contains=query) | Q(email__icontains=query)
+        )
@@ -1,7 +1,10 @@
 from django.contrib.auth.decorators import user_passes_test
 
+from .roles import user_roles
+
+
 def installer_only(view_func):
-    return user_passes_test(lambda u: u.groups.filter(name='Installers').exists() or u.is_superuser)(view_func)
+    return user_passes_test(lambda u: 'Installers' in user_roles(u).groups or u.is_superuser)(view_func)
 
 def admin_only(view_func):
     return user_passes_test(lambda u: u.is_superuser)(view_func)
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+File download responses with HTTP Range support.
+
+Generated reports and media archives can run to several GB; a dropped
+connection should resume where it stopped instead of starting over.
+ranged_file_response() answers a single `Range: bytes=...` request with 206
+Partial Content, honours If-Range / If-None-Match / If-Modified-Since via a
+size+mtime ETag, and falls back to a plain FileResponse otherwise.
+ranged_storage_response() does the same for a name in a storage (media files).
+"""
+import re
+
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+# Read size when streaming part of a file
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Parses a single-range `Range` header against a file of `size` bytes.
+    Returns (start, end) inclusive, None if the header should be ignored
+    (absent, malformed or multi-range), or False if it is unsatisfiable.
+    """
+    match = _RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _read_range(fh, start, length):
+    try:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def ranged_file_response(request, field_file, filename, content_type, as_attachment=True):
+    """Serves `field_file` with Range / conditional request support."""
+    return ranged_storage_response(request, field_file.storage, field_file.name, filename, content_type, as_attachment)
+
+
+def _not_modified(request, etag, modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return if_none_match == etag
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return since is not None and int(modified) <= since
+
+
+def ranged_storage_response(request, storage, name, filename, content_type, as_attachment=True):
+    """Serves the file `name` of `storage` with Range / conditional request support."""
+    size = storage.size(name)
+    modified = storage.get_modified_time(name).timestamp()
+    etag = f'"{int(modified):x}-{size:x}"'
+    last_modified = http_date(modified)
+
+    if _not_modified(request, etag, modified):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        return response
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range not in (etag, last_modified):
+        byte_range = None  # File changed since the partial download began; send it all
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(storage.open(name, 'rb'), start, length), status=206, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    else:
+        response = FileResponse(
+            storage.open(name, 'rb'), as_attachment=as_attachment, filename=filename, content_type=content_type,
+        )
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
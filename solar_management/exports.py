@@ -0,0 +1,394 @@
+"""
+Excel report engine for export_solar_data.
+
+Reports are written with openpyxl's write-only mode into a spooled temp file,
+fed by querysets read in keyset batches of CHUNK_SIZE rows (see
+pagination.keyset_batches). Memory use stays flat no matter how many rows the
+report has: at most one batch is held at a time, and rows are streamed to the
+worksheet's temp file as they are produced, never held as cell objects.
+`.iterator(chunk_size=...)` would not do: the MySQL driver buffers the whole
+result set in client memory before the first chunk arrives.
+
+Each batch is a single SQL statement: related names come from joins and
+per-row checks (e.g. "has a property tax upload") are `Exists(...)` annotations,
+projected with `.values_list(..., named=True)` so no model instances are built.
+"""
+import tempfile
+from datetime import datetime
+
+import openpyxl
+from django.db.models import Exists, OuterRef
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .models import CustomerSurvey, Installation, Enquiry, UserProfile, SurveyMedia
+from .pagination import keyset_batches
+
+# Rows fetched from the DB per query
+CHUNK_SIZE = 2000
+
+# Reports smaller than this stay in memory; larger ones roll over to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+REPORT_TYPES = ('master', 'field_engineer', 'installer', 'material_dispatch', 'enquiries', 'users')
+
+# Report types Office users may download (Staff/Admin may download all)
+OFFICE_REPORT_TYPES = {'installer', 'material_dispatch', 'enquiries'}
+
+
+def full_name(first_name, last_name):
+    """Same as User.get_full_name(), from projected columns."""
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+def fmt(value, pattern):
+    return value.strftime(pattern) if value else ''
+
+
+# ==========================================
+# 1. FIELD ENGINEER REPORT
+# ==========================================
+FIELD_ENGINEER_HEADERS = [
+    'Customer Name', 'SC No', 'Phone', 'Connection', 'Phase', 'Contracted Load (KW)', 'Feasibility KW',
+    'Aadhar No', 'PAN Card', 'Email', 'Aadhar Linked Phone', 'Bank Account No', 'Property Tax Photo',
+    'Roof Type', 'Structure Type', 'Structure Height', 'Floors', 'Area', 'GPS Coordinates',
+    'Agreed Amount', 'Advance Paid', 'MEFMA Status', 'RP Name', 'RP Phone',
+    'FE Remarks', 'Reference Name', 'PMS Registration Number', 'Division', 'Registration Status',
+    'Discom Status', 'Net Metering Status', 'Subsidy Status', 'Office Remarks',
+    'Workflow Status', 'Installation Date', 'Engineer', 'Date Created'
+]
+
+
+def field_engineer_rows():
+    surveys = CustomerSurvey.objects.annotate(
+        has_property_tax_media=Exists(SurveyMedia.objects.filter(survey=OuterRef('pk'), media_type='property_tax')),
+    ).values_list(
+        'id', 'customer_name', 'sc_no', 'aadhar_linked_phone', 'connection_type', 'phase', 'contracted_load', 'feasibility_kw',
+        'aadhar_no', 'pan_card', 'email', 'bank_account_no', 'property_tax_photo', 'has_property_tax_media',
+        'roof_type', 'structure_type', 'structure_height', 'floors', 'area', 'gps_coordinates',
+        'agreed_amount', 'advance_paid', 'mefma_status', 'rp_name', 'rp_phone_number',
+        'fe_remarks', 'reference_name', 'pms_registration_number', 'division', 'registration_status',
+        'discom_status', 'net_metering_status', 'subsidy_status', 'office_remarks',
+        'workflow_status', 'installation_date', 'created_at',
+        'created_by_id', 'created_by__first_name', 'created_by__last_name',
+        named=True,
+    )
+    for s in keyset_batches(surveys, ['id'], CHUNK_SIZE):
+        yield [
+            s.customer_name, s.sc_no, s.aadhar_linked_phone, s.connection_type, s.phase, s.contracted_load, s.feasibility_kw,
+            s.aadhar_no, s.pan_card, s.email, s.aadhar_linked_phone, s.bank_account_no, 'Uploaded' if s.property_tax_photo or s.has_property_tax_media else 'Not Uploaded',
+            s.roof_type, s.structure_type, s.structure_height, s.floors if s.floors is not None else '', s.area, s.gps_coordinates,
+            s.agreed_amount, s.advance_paid, 'Yes' if s.mefma_status else 'No', s.rp_name, s.rp_phone_number,
+            s.fe_remarks, s.reference_name, s.pms_registration_number, s.division, 'Yes' if s.registration_status else 'No',
+            s.discom_status, s.net_metering_status, s.subsidy_status, s.office_remarks,
+            s.workflow_status, fmt(s.installation_date, "%Y-%m-%d"),
+            full_name(s.created_by__first_name, s.created_by__last_name) if s.created_by_id else 'Unknown',
+            s.created_at.strftime("%Y-%m-%d %H:%M")
+        ]
+
+
+# ==========================================
+# 2. INSTALLER REPORT
+# ==========================================
+INSTALLER_HEADERS = [
+    'Customer Name', 'SC No', 'Phone', 'Connection Type', 'Phase', 'Roof Type', 'Agreed Amount',
+    'Installer', 'Install Date', 'Inverter Make', 'Inverter Phase',
+    'AC Cable (m)', 'DC Cable (m)', 'LA Cable (m)', 'Pipes (m)', 'Leftover Materials',
+    'DC Volt', 'AC Volt', 'Earth Resistance', 'Warranty Claimed', 'App Installed',
+    'Installer Remarks', 'Customer Remarks', 'Customer Rating', 'Status',
+    # Materials Dispatched
+    'Panels (Count)', 'Structure Kit', 'Inverter (kW)', 'Inverter Phase Type',
+    'AC Cable Red (m)', 'AC Cable Black (m)', 'DC Cable R&B (m)', 'LA Cable (m)',
+    'Pipes Count', 'Earthing Kit', 'ACDB', 'DCDB', 'MC4 Connectors',
+    'Long L Bands', 'Short L Bands', 'T Bands',
+    'Tapes Red', 'Tapes Black', 'Tags',
+    'Nail Clamps 2 Side', 'Nail Clamps 1 Side', 'Anchor Hardener',
+]
+
+
+# Installation columns written after the survey / installer columns, in header order
+INSTALLER_MATERIAL_FIELDS = [
+    'panels_count', 'structure_kit_type', 'inverter_kw', 'inverter_phase_type',
+    'ac_cable_red', 'ac_cable_black', 'dc_cable_red_black', 'la_cable_mtrs',
+    'pipes_count', 'earthing_kit_count', 'acdb_count', 'dcdb_count', 'mc4_connectors_count',
+    'long_l_bands_count', 'short_l_bands_count', 't_bands_count',
+    'tapes_red_count', 'tapes_black_count', 'tags_count',
+    'nail_clamps_2side_count', 'nail_clamps_1side_count', 'anchor_hardener_count',
+]
+
+
+def installer_rows():
+    installations = Installation.objects.values_list(
+        'id', 'survey__customer_name', 'survey__sc_no', 'survey__aadhar_linked_phone', 'survey__connection_type',
+        'survey__phase', 'survey__roof_type', 'survey__agreed_amount', 'survey__workflow_status',
+        'updated_by_id', 'updated_by__first_name', 'updated_by__last_name', 'timestamp',
+        'inverter_make', 'inverter_phase', 'ac_cable_used', 'dc_cable_used', 'la_cable_used', 'pipes_used',
+        'leftover_materials', 'dc_voltage', 'ac_voltage', 'earthing_resistance', 'warranty_claimed',
+        'app_installation_status', 'installer_remarks', 'customer_remarks', 'customer_rating',
+        *INSTALLER_MATERIAL_FIELDS,
+        named=True,
+    )
+    for i in keyset_batches(installations, ['id'], CHUNK_SIZE):
+        yield [
+            i.survey__customer_name, i.survey__sc_no, i.survey__aadhar_linked_phone, i.survey__connection_type,
+            i.survey__phase, i.survey__roof_type, i.survey__agreed_amount,
+            full_name(i.updated_by__first_name, i.updated_by__last_name) if i.updated_by_id else 'Unknown',
+            i.timestamp.strftime("%Y-%m-%d %H:%M"),
+            i.inverter_make, i.inverter_phase, i.ac_cable_used, i.dc_cable_used,
+            i.la_cable_used, i.pipes_used, i.leftover_materials, i.dc_voltage, i.ac_voltage,
+            i.earthing_resistance, 'Yes' if i.warranty_claimed else 'No', 'Yes' if i.app_installation_status else 'No',
+            i.installer_remarks, i.customer_remarks, i.customer_rating,
+            i.survey__workflow_status,
+            # Materials Dispatched
+            *(getattr(i, f) for f in INSTALLER_MATERIAL_FIELDS),
+        ]
+
+
+# ==========================================
+# 3. ENQUIRIES REPORT
+# ==========================================
+ENQUIRIES_HEADERS = ['Name', 'Mobile', 'Email', 'Address', 'Remarks', 'Date Received']
+
+
+def enquiries_rows():
+    enquiries = Enquiry.objects.values_list(
+        'id', 'name', 'mobile_number', 'email', 'address', 'remarks', 'created_at', named=True,
+    )
+    for e in keyset_batches(enquiries, ['-created_at', '-id'], CHUNK_SIZE):
+        yield [
+            e.name, e.mobile_number, e.email, e.address, e.remarks or '',
+            e.created_at.strftime("%Y-%m-%d %H:%M")
+        ]
+
+
+# ==========================================
+# 4. USERS REPORT
+# ==========================================
+USERS_HEADERS = ['Username', 'Full Name', 'Mobile', 'Email', 'Role', 'Status', 'Date Joined']
+
+
+def users_rows():
+    profiles = UserProfile.objects.values_list(
+        'id', 'user__username', 'user__first_name', 'user__last_name', 'mobile_number', 'user__email',
+        'role', 'is_approved', 'user__date_joined', named=True,
+    )
+    for p in keyset_batches(profiles, ['-user__date_joined', '-id'], CHUNK_SIZE):
+        yield [
+            p.user__username, full_name(p.user__first_name, p.user__last_name), p.mobile_number, p.user__email,
+            p.role, 'Approved' if p.is_approved else 'Pending',
+            p.user__date_joined.strftime("%Y-%m-%d")
+        ]
+
+
+# ==========================================
+# 5. MATERIAL DISPATCH REPORT
+# ==========================================
+MATERIAL_DISPATCH_HEADERS = [
+    'Customer Name', 'Mobile Number', 'SC Number',
+    'Item', 'Dispatched', 'Used', 'Difference',
+    'Installation Date', 'Installer Name',
+]
+
+# (Item label, dispatched field, used field, is_text)
+MATERIAL_ITEMS = [
+    ('Panels', 'panels_count', 'panels_used', False),
+    ('Structure Kit Type', 'structure_kit_type', 'structure_kit_used', True),
+    ('Inverter (kW)', 'inverter_kw', 'inverter_kw_used', False),
+    ('Inverter Phase Type', 'inverter_phase_type', 'inverter_phase_type_used', True),
+    ('AC Cable Red (m)', 'ac_cable_red', 'ac_cable_red_used', False),
+    ('AC Cable Black (m)', 'ac_cable_black', 'ac_cable_black_used', False),
+    ('DC Cable Red & Black (m)', 'dc_cable_red_black', 'dc_cable_red_black_used', False),
+    ('LA Cable (m)', 'la_cable_mtrs', 'la_cable_mtrs_used', False),
+    ('Pipes', 'pipes_count', 'pipes_count_used', False),
+    ('Earthing Kit', 'earthing_kit_count', 'earthing_kit_count_used', False),
+    ('ACDB', 'acdb_count', 'acdb_count_used', False),
+    ('DCDB', 'dcdb_count', 'dcdb_count_used', False),
+    ('MC4 Connectors', 'mc4_connectors_count', 'mc4_connectors_count_used', False),
+    ('Long L Bands', 'long_l_bands_count', 'long_l_bands_count_used', False),
+    ('Short L Bands', 'short_l_bands_count', 'short_l_bands_count_used', False),
+    ('T Bands', 't_bands_count', 't_bands_count_used', False),
+    ('Tapes Red', 'tapes_red_count', 'tapes_red_count_used', False),
+    ('Tapes Black', 'tapes_black_count', 'tapes_black_count_used', False),
+    ('Tags', 'tags_count', 'tags_count_used', False),
+    ('Nail Clamps 2 Side', 'nail_clamps_2side_count', 'nail_clamps_2side_count_used', False),
+    ('Nail Clamps 1 Side', 'nail_clamps_1side_count', 'nail_clamps_1side_count_used', False),
+    ('Anchor Hardener', 'anchor_hardener_count', 'anchor_hardener_count_used', False),
+]
+
+
+def get_diff(disp, used):
+    try:
+        return float(disp or 0) - float(used or 0)
+    except ValueError:
+        return ''
+
+
+def material_dispatch_rows():
+    material_fields = [f for _, disp, used, _ in MATERIAL_ITEMS for f in (disp, used)]
+    installations = Installation.objects.values_list(
+        'id', 'survey__customer_name', 'survey__aadhar_linked_phone', 'survey__sc_no', 'timestamp',
+        'updated_by_id', 'updated_by__first_name', 'updated_by__last_name',
+        *material_fields,
+        named=True,
+    )
+    for i in keyset_batches(installations, ['survey__customer_name', 'id'], CHUNK_SIZE):
+        install_date = i.timestamp.strftime("%Y-%m-%d %H:%M")
+        installer_name = full_name(i.updated_by__first_name, i.updated_by__last_name) if i.updated_by_id else 'Unknown'
+        for item_name, disp_field, used_field, is_text in MATERIAL_ITEMS:
+            disp = getattr(i, disp_field)
+            used = getattr(i, used_field)
+            yield [
+                i.survey__customer_name,
+                i.survey__aadhar_linked_phone,
+                i.survey__sc_no,
+                item_name,
+                disp,
+                used,
+                '' if is_text else get_diff(disp, used),
+                install_date,
+                installer_name,
+            ]
+
+        # Blank row to separate customers for readability
+        yield []
+
+
+# ==========================================
+# 6. MASTER REPORT (Default) - ALL DATA FROM ALL TABLES
+# ==========================================
+MASTER_HEADERS = [
+    'Customer Name', 'SC No', 'Phone', 'Connection', 'Phase', 'Contracted Load (KW)', 'Feasibility KW',
+    'Aadhar No', 'PAN Card', 'Email', 'Aadhar Linked Phone', 'Bank Account No',
+    'Roof Type', 'Structure Type', 'Structure Height', 'Floors', 'Area', 'GPS Coordinates',
+    'Agreed Amount', 'Advance Paid', 'MEFMA Status', 'RP Name', 'RP Phone',
+    'FE Remarks', 'Reference Name', 'PMS Registration Number', 'Division', 'Registration Status',
+    'Discom Status', 'Net Metering Status', 'Subsidy Status', 'Office Remarks',
+    'Workflow Status', 'Installation Date', 'Field Engineer Name', 'Survey Date',
+    # Bank Details
+    'Parent Bank', 'Parent Bank A/C', 'Loan Applied Bank', 'Loan Applied IFSC', 'Loan Applied A/C',
+    'Manager Number', 'Loan Status', 'First Loan Amount', 'First Loan UTR', 'First Loan Date',
+    'Second Loan Amount', 'Second Loan UTR', 'Second Loan Date'
+]
+
+
+# BankDetails columns of the Master report, in header order
+MASTER_BANK_FIELDS = [
+    'parent_bank', 'parent_bank_ac_no', 'loan_applied_bank', 'loan_applied_ifsc', 'loan_applied_ac_no',
+    'manager_number', 'loan_pending_status', 'first_loan_amount', 'first_loan_utr', 'first_loan_date',
+    'second_loan_amount', 'second_loan_utr', 'second_loan_date',
+]
+
+
+def master_rows():
+    projects = CustomerSurvey.objects.values_list(
+        'id', 'customer_name', 'sc_no', 'aadhar_linked_phone', 'connection_type', 'phase', 'contracted_load', 'feasibility_kw',
+        'aadhar_no', 'pan_card', 'email', 'bank_account_no',
+        'roof_type', 'structure_type', 'structure_height', 'floors', 'area', 'gps_coordinates',
+        'agreed_amount', 'advance_paid', 'mefma_status', 'rp_name', 'rp_phone_number',
+        'fe_remarks', 'reference_name', 'pms_registration_number', 'division', 'registration_status',
+        'discom_status', 'net_metering_status', 'subsidy_status', 'office_remarks',
+        'workflow_status', 'installation_date', 'created_at',
+        'created_by_id', 'created_by__first_name', 'created_by__last_name',
+        'bank_details__id', *(f'bank_details__{f}' for f in MASTER_BANK_FIELDS),
+        named=True,
+    )
+    for p in keyset_batches(projects, ['id'], CHUNK_SIZE):
+        row = [
+            # FE / Survey Details
+            p.customer_name, p.sc_no, p.aadhar_linked_phone, p.connection_type, p.phase, p.contracted_load, p.feasibility_kw,
+            p.aadhar_no, p.pan_card, p.email, p.aadhar_linked_phone, p.bank_account_no,
+            p.roof_type, p.structure_type, p.structure_height, p.floors if p.floors is not None else '', p.area, p.gps_coordinates,
+            p.agreed_amount, p.advance_paid, 'Yes' if p.mefma_status else 'No', p.rp_name, p.rp_phone_number,
+            p.fe_remarks, p.reference_name, p.pms_registration_number, p.division, 'Yes' if p.registration_status else 'No',
+            p.discom_status, p.net_metering_status, p.subsidy_status, p.office_remarks,
+            p.workflow_status, fmt(p.installation_date, "%Y-%m-%d"),
+            full_name(p.created_by__first_name, p.created_by__last_name) if p.created_by_id else 'Unknown',
+            p.created_at.strftime("%Y-%m-%d %I:%M %p"),
+        ]
+
+        # Bank Details
+        if p.bank_details__id:
+            row.extend([
+                p.bank_details__parent_bank, p.bank_details__parent_bank_ac_no, p.bank_details__loan_applied_bank, p.bank_details__loan_applied_ifsc, p.bank_details__loan_applied_ac_no,
+                p.bank_details__manager_number, p.bank_details__loan_pending_status, p.bank_details__first_loan_amount, p.bank_details__first_loan_utr, fmt(p.bank_details__first_loan_date, "%Y-%m-%d"),
+                p.bank_details__second_loan_amount, p.bank_details__second_loan_utr, fmt(p.bank_details__second_loan_date, "%Y-%m-%d")
+            ])
+        else:
+            row.extend([''] * 13)  # 13 bank columns
+
+        yield row
+
+
+# report type -> (headers, row generator, expected data-row count for progress)
+REPORTS = {
+    'field_engineer': (FIELD_ENGINEER_HEADERS, field_engineer_rows, lambda: CustomerSurvey.objects.count()),
+    'installer': (INSTALLER_HEADERS, installer_rows, lambda: Installation.objects.count()),
+    'enquiries': (ENQUIRIES_HEADERS, enquiries_rows, lambda: Enquiry.objects.count()),
+    'users': (USERS_HEADERS, users_rows, lambda: UserProfile.objects.count()),
+    # one row per material item plus a blank separator per installation
+    'material_dispatch': (MATERIAL_DISPATCH_HEADERS, material_dispatch_rows, lambda: Installation.objects.count() * (len(MATERIAL_ITEMS) + 1)),
+    'master': (MASTER_HEADERS, master_rows, lambda: CustomerSurvey.objects.count()),
+}
+
+# Progress callbacks fire once per this many rows
+PROGRESS_EVERY = 1000
+
+
+# ==========================================
+# WORKBOOK WRITER
+# ==========================================
+def write_workbook(fileobj, title, headers, rows, progress=None):
+    """
+    Writes `headers` (bold) and `rows` into a write-only workbook saved to `fileobj`.
+    `rows` may be any iterable (typically a generator); it is consumed once.
+    `progress`, if given, is called with the number of rows written so far every PROGRESS_EVERY rows.
+    Returns the number of data rows written.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=title[:31])  # Excel caps sheet titles at 31 chars
+
+    header_font = Font(bold=True)
+    header_cells = []
+    for h in headers:
+        cell = WriteOnlyCell(ws, value=h)
+        cell.font = header_font
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+        if progress and count % PROGRESS_EVERY == 0:
+            progress(count)
+
+    wb.save(fileobj)
+    return count
+
+
+def report_filename(report_type, when=None):
+    timestamp = (when or datetime.now()).strftime("%Y-%m-%d_%H-%M")
+    return f"WeSolar_{report_type.title()}_Report_{timestamp}.xlsx"
+
+
+def build_report(report_type, fileobj=None, progress=None):
+    """
+    Builds the Excel report of `report_type` (unknown types fall back to master).
+    Writes into `fileobj` if given, else into a new SpooledTemporaryFile.
+    `progress`, if given, is called with a percentage (0-99) while rows are written.
+    Returns the file object rewound to the start.
+    """
+    headers, rows, row_count = REPORTS.get(report_type, REPORTS['master'])
+    if fileobj is None:
+        fileobj = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+    on_rows = None
+    if progress:
+        total = max(1, row_count())
+        on_rows = lambda done: progress(min(99, done * 100 // total))
+
+    write_workbook(fileobj, f"{report_type.title()} Report", headers, rows(), progress=on_rows)
+    fileobj.seek(0)
+    return fileobj
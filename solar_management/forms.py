@@ -327,6 +327,8 @@ class InstallationForm(forms.ModelForm):
     panel_serial_photo = MultipleFileField(required=False, label="Panel Serial Photo")
     site_photos_with_customer = MultipleFileField(required=False, label="Site Photo with Customer")
 
+    PHOTO_FIELDS = ['inverter_serial_photo', 'inverter_acdb_photo', 'panel_serial_photo', 'site_photos_with_customer', 'site_photos_multiple']
+
     class Meta:
         model = Installation
         fields = [
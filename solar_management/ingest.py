@@ -0,0 +1,137 @@
+"""
+Upload ingest: recompress photos before they are stored.
+
+Phone photos arrive as 4-12 MB JPEGs at full sensor resolution. When
+IMAGE_INGEST_ENABLED is on (it is off by default: the re-encoding is lossy),
+a new SurveyMedia / InstallationPhoto upload is, before it is written to storage:
+
+- downscaled to fit IMAGE_INGEST_MAX_DIMENSION,
+- rotated per its EXIF orientation, with EXIF/XMP metadata dropped,
+- re-encoded as IMAGE_INGEST_FORMAT (JPEG or WEBP) at IMAGE_INGEST_QUALITY.
+
+If the result isn't smaller (and no downscale was needed) the original is kept.
+PDFs and anything Pillow can't read pass through unchanged. Each row records
+original_bytes / stored_bytes so the savings can be measured (see ingest_savings()).
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Sum
+from PIL import Image, ImageOps
+
+from .thumbnails import IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+
+def _encode(img, fmt, quality, icc_profile=None):
+    if img.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        rgba = img.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        img = background
+    out = io.BytesIO()
+    options = {'quality': quality}
+    if icc_profile:
+        options['icc_profile'] = icc_profile  # keep colours right; it's only a few KB
+    if fmt == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    else:
+        options.update(method=4)
+    img.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def recompress_image(fh, max_dimension, quality, fmt='JPEG'):
+    """
+    Returns (bytes, resized) for the image in `fh`, or None if it can't be read.
+    `resized` tells whether the image had to be scaled down to fit `max_dimension`.
+    """
+    try:
+        img = Image.open(fh)
+        width, height = img.size
+        icc_profile = img.info.get('icc_profile')
+        bounds = (max_dimension, max_dimension)
+        img.draft('RGB', bounds)  # JPEG: decode straight at a reduced scale when possible
+        img = ImageOps.exif_transpose(img)
+        resized = width > max_dimension or height > max_dimension
+        if resized:
+            img.thumbnail(bounds, Image.LANCZOS)
+        return _encode(img, fmt, quality, icc_profile), resized
+    except Exception:
+        logger.exception('Image ingest skipped for %s', getattr(fh, 'name', 'an upload'))
+        return None
+
+
+def prepare_upload(field_file):
+    """
+    Recompresses an uncommitted upload in place (see module docstring).
+    Returns (original_bytes, stored_bytes).
+    """
+    original_size = field_file.size
+    if not settings.IMAGE_INGEST_ENABLED:
+        return original_size, original_size
+    base, ext = os.path.splitext(os.path.basename(field_file.name))
+    if ext.lower() not in IMAGE_EXTENSIONS:
+        return original_size, original_size
+
+    fmt = settings.IMAGE_INGEST_FORMAT.upper()
+    if fmt not in FORMAT_EXTENSIONS:
+        fmt = 'JPEG'
+    upload = field_file.file
+    upload.seek(0)
+    result = recompress_image(
+        upload, settings.IMAGE_INGEST_MAX_DIMENSION, settings.IMAGE_INGEST_QUALITY, fmt,
+    )
+    upload.seek(0)
+    if result is None:
+        return original_size, original_size
+
+    data, resized = result
+    if len(data) >= original_size and not resized:
+        return original_size, original_size
+
+    # Assigning a plain File leaves it uncommitted, so the field stores it as usual on save
+    setattr(field_file.instance, field_file.field.attname, ContentFile(data, name=base + FORMAT_EXTENSIONS[fmt]))
+    return original_size, len(data)
+
+
+def ingest_upload(instance, field_name):
+    """pre_save hook: processes `instance.<field_name>` if it is a new upload and records its sizes."""
+    field_file = getattr(instance, field_name)
+    if not field_file or field_file._committed:
+        return
+    instance.original_bytes, instance.stored_bytes = prepare_upload(field_file)
+
+
+def ingest_savings():
+    """
+    Totals of original_bytes / stored_bytes over all ingested uploads, for the
+    storage page. Cached until a SurveyMedia / InstallationPhoto row changes.
+    """
+    from .caching import cached
+    from .models import SurveyMedia, InstallationPhoto
+
+    return cached('ingest_savings', [SurveyMedia, InstallationPhoto], _ingest_totals)
+
+
+def _ingest_totals():
+    from .models import SurveyMedia, InstallationPhoto
+
+    original = stored = 0
+    for model in (SurveyMedia, InstallationPhoto):
+        totals = model.objects.filter(original_bytes__isnull=False).aggregate(
+            original=Sum('original_bytes'), stored=Sum('stored_bytes'),
+        )
+        original += totals['original'] or 0
+        stored += totals['stored'] or 0
+    return {
+        'ingest_original_bytes': original,
+        'ingest_stored_bytes': stored,
+        'ingest_saved_bytes': max(0, original - stored),
+    }
@@ -0,0 +1,22 @@
+"""
+Recomputes CustomerSurvey.media_count / media_bytes for every survey.
+Migration 0061 fills them in on deploy and signals keep them current; run this
+any time the numbers look off (e.g. after files were removed from MEDIA_ROOT by hand).
+Usage: python manage.py backfill_media_stats
+"""
+from django.core.management.base import BaseCommand
+
+from solar_management.models import CustomerSurvey
+from solar_management.storage import refresh_media_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-survey media_count and media_bytes from the stored files'
+
+    def handle(self, *args, **options):
+        survey_ids = CustomerSurvey.objects.values_list('id', flat=True).order_by('id')
+        count = 0
+        for survey_id in survey_ids.iterator(chunk_size=500):
+            refresh_media_stats(survey_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Refreshed media stats for {count} surveys.'))
@@ -0,0 +1,110 @@
+"""
+Measures peak memory of a real Excel export: exports.build_report() reading
+from the configured database, as the report worker runs it.
+Usage:
+    python manage.py benchmark_export --seed 200000     # insert 200k benchmark surveys, then exit
+    python manage.py benchmark_export                   # build the Master report, print peak RSS
+    python manage.py benchmark_export --report installer
+    python manage.py benchmark_export --cleanup         # delete the benchmark surveys again
+
+Seeding runs in its own invocation so its memory does not count toward the
+report's peak. Run it against a copy of the production database (MySQL): the
+point is to check the driver does not buffer whole result sets, which SQLite
+cannot show.
+"""
+import resource
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from solar_management.exports import REPORT_TYPES, build_report
+from solar_management.models import BankDetails, CustomerSurvey
+
+# pms_registration_number of the seeded surveys, so --cleanup can find them
+SEED_MARKER = 'BENCHMARK-EXPORT'
+
+SEED_BATCH = 2000
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def seed_surveys(count):
+    """Inserts `count` surveys, each with bank details, SEED_BATCH rows per statement."""
+    done = 0
+    while done < count:
+        size = min(SEED_BATCH, count - done)
+        with transaction.atomic():
+            CustomerSurvey.objects.bulk_create([
+                CustomerSurvey(
+                    customer_name=f'Benchmark Customer {n}', sc_no=f'{n:016d}', aadhar_linked_phone=f'9{n % 10**9:09d}',
+                    aadhar_linked_phone_digits=f'9{n % 10**9:09d}', connection_type='Domestic', phase='Single Phase',
+                    contracted_load=3.0, feasibility_kw=3.0, aadhar_no=f'{n % 10**12:012d}', pan_card='ABCDE1234F',
+                    email=f'customer{n}@example.com', bank_account_no=f'{n:012d}', roof_type='Normal',
+                    structure_type='Normal', structure_height=10.0, floors=2, area='Rajahmundry',
+                    gps_coordinates='17.0,81.8', agreed_amount=Decimal('150000.00'), advance_paid=Decimal('5000.00'),
+                    fe_remarks='Remarks for the site', pms_registration_number=SEED_MARKER,
+                )
+                for n in range(done, done + size)
+            ])
+            # bulk_create does not return ids on MySQL: pick up the surveys still without bank details
+            new_ids = CustomerSurvey.objects.filter(
+                pms_registration_number=SEED_MARKER, bank_details__isnull=True,
+            ).values_list('id', flat=True)
+            BankDetails.objects.bulk_create([
+                BankDetails(
+                    survey_id=survey_id, parent_bank='SBI', parent_bank_ac_no='12345678901', loan_applied_bank='SBI',
+                    loan_applied_ifsc='SBIN0000001', loan_applied_ac_no='10987654321',
+                    first_loan_amount=Decimal('100000.00'), first_loan_date=date.today(),
+                )
+                for survey_id in new_ids
+            ])
+        done += size
+    return done
+
+
+class Command(BaseCommand):
+    help = 'Benchmark peak RSS of a real Excel export (exports.build_report) against the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', default='master', choices=REPORT_TYPES)
+        parser.add_argument('--seed', type=int, metavar='N', help=f'Insert N benchmark surveys (marked {SEED_MARKER}) and exit.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark surveys and exit.')
+
+    def handle(self, *args, **options):
+        if options['seed'] is not None:
+            if options['seed'] <= 0:
+                raise CommandError('--seed needs a positive row count.')
+            started = time.monotonic()
+            count = seed_surveys(options['seed'])
+            self.stdout.write(f'Inserted {count} benchmark surveys in {time.monotonic() - started:.1f}s.')
+            return
+
+        if options['cleanup']:
+            deleted, _ = CustomerSurvey.objects.filter(pms_registration_number=SEED_MARKER).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark rows.')
+            return
+
+        report_type = options['report']
+        surveys = CustomerSurvey.objects.count()
+        base = peak_rss_mb()
+
+        started = time.monotonic()
+        fh = build_report(report_type)
+        try:
+            size_mb = fh.seek(0, 2) / (1024 * 1024)
+        finally:
+            fh.close()
+        elapsed = time.monotonic() - started
+        peak = peak_rss_mb()
+        self.stdout.write(
+            f'{report_type} report over {surveys} surveys: {size_mb:.1f} MB xlsx in {elapsed:.1f}s, '
+            f'peak RSS {peak:.0f} MB (+{peak - base:.0f} MB over baseline)'
+        )
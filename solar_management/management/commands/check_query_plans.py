@@ -0,0 +1,37 @@
+"""
+EXPLAINs the app's hot list / lookup queries and fails if any of them needs a
+full table scan or a separate sort step, i.e. lost its index.
+Usage:
+    python manage.py check_query_plans            # exits non-zero on a regression
+    python manage.py check_query_plans --verbose  # also print every plan
+
+Run it against a database with realistic row counts: on a near-empty table
+MySQL / PostgreSQL may rightly prefer a full scan and report a false alarm.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from solar_management.query_plans import explain, plan_problems, query_shapes
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot queries and fail if any of them stopped using an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        failures = 0
+        for name, queryset in query_shapes():
+            rows = explain(queryset)
+            problems = plan_problems(rows)
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'{name}: ' + '; '.join(problems)))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+            if options['verbose']:
+                for row in rows:
+                    self.stdout.write(f'    {row}')
+
+        if failures:
+            raise CommandError(f'{failures} query plan(s) without a usable index.')
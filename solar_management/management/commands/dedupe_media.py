@@ -0,0 +1,65 @@
+"""
+Moves SurveyMedia / InstallationPhoto files saved before deduplication into
+content-addressed storage: each file is hashed, stored once as a blob (or
+matched to an existing one) and the old copy is removed. Afterwards every
+blob's reference count is recomputed from the media rows.
+Usage: python manage.py dedupe_media [--dry-run]
+"""
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from solar_management.models import SurveyMedia, InstallationPhoto, MediaBlob, media_blob_storage
+
+# model -> name of its file field
+MEDIA_MODELS = [(SurveyMedia, 'file'), (InstallationPhoto, 'photo')]
+
+
+class Command(BaseCommand):
+    help = 'Move existing survey / installation media into deduplicated content-addressed storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the files that would be moved')
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        for model, field_name in MEDIA_MODELS:
+            rows = model.objects.exclude(**{f'{field_name}__startswith': 'blobs/'}).exclude(**{field_name: ''})
+            for row in rows.iterator(chunk_size=200):
+                field_file = getattr(row, field_name)
+                storage = field_file.storage
+                old_name = field_file.name
+                if not storage.exists(old_name):
+                    missing += 1
+                    continue
+                if options['dry_run']:
+                    moved += 1
+                    continue
+                with storage.open(old_name, 'rb') as fh:
+                    new_name = storage.save(old_name, File(fh))
+                model.objects.filter(pk=row.pk).update(**{field_name: new_name})
+                storage.delete(old_name)  # not a blob, so this removes the old copy outright
+                moved += 1
+
+        if not options['dry_run']:
+            self.recount()
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {moved} files into content-addressed storage ({missing} missing on disk skipped).'
+        ))
+
+    def recount(self):
+        """Sets MediaBlob.ref_count to the number of media rows that point at each blob; unused blobs are removed."""
+        counts = {}
+        for model, field_name in MEDIA_MODELS:
+            refs = model.objects.filter(**{f'{field_name}__startswith': 'blobs/'}).values(field_name).annotate(n=Count('id'))
+            for ref in refs:
+                counts[ref[field_name]] = counts.get(ref[field_name], 0) + ref['n']
+        storage = media_blob_storage()
+        for blob in MediaBlob.objects.all().iterator(chunk_size=500):
+            ref_count = counts.get(blob.name, 0)
+            if ref_count == 0:
+                storage.delete(blob.name)  # last reference: removes the blob and its file
+            elif ref_count != blob.ref_count:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=ref_count)
@@ -0,0 +1,66 @@
+"""
+Creates thumbnail / medium derivatives for existing SurveyMedia and
+InstallationPhoto rows (new uploads get them when they are saved).
+Only rows whose original changed since their last attempt (`derived_from`)
+are picked, so PDFs and unreadable images are not retried on every run.
+Images are decoded in a process pool, one row per task.
+Usage: python manage.py generate_thumbnails [--workers 4] [--force]
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import F
+
+from solar_management.models import SurveyMedia, InstallationPhoto
+
+# task key -> (model, original file field)
+MODELS = {'survey_media': (SurveyMedia, 'file'), 'installation_photo': (InstallationPhoto, 'photo')}
+
+
+def _init_worker():
+    # Forked workers must not share the parent's DB connections; spawned ones need Django set up
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _process(task):
+    from solar_management.thumbnails import generate_derivatives
+
+    key, pk, force = task
+    obj = MODELS[key][0].objects.filter(pk=pk).first()
+    return bool(obj and generate_derivatives(obj, force=force))
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and medium derivatives for existing survey / installation photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Worker processes')
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that are up to date, retry files that had none')
+
+    def handle(self, *args, **options):
+        force = options['force']
+        tasks = []
+        for key, (model, field) in MODELS.items():
+            rows = model.objects.all() if force else model.objects.exclude(derived_from=F(field))
+            tasks.extend((key, pk, force) for pk in rows.order_by('id').values_list('id', flat=True))
+
+        if not tasks:
+            self.stdout.write(self.style.SUCCESS('All photos are up to date.'))
+            return
+
+        # Close ours before forking so children open their own
+        connections.close_all()
+        created = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=_init_worker) as pool:
+            for i, done in enumerate(pool.map(_process, tasks, chunksize=16), start=1):
+                created += done
+                if i % 500 == 0:
+                    self.stdout.write(f'{i}/{len(tasks)} processed...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created derivatives for {created} of {len(tasks)} photos (the rest are not images or unreadable).'
+        ))
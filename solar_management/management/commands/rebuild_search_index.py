@@ -0,0 +1,15 @@
+"""
+Rebuilds the survey search index, batch by batch; searches keep working while it runs.
+Usage: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+
+from solar_management.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the customer survey search index (name / phone / SC No terms)'
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} surveys.'))
@@ -0,0 +1,44 @@
+"""
+Re-walks MEDIA_ROOT and corrects the storage ledger (StoredFile / StorageUsage)
+for any drift, e.g. files copied in or removed by hand.
+Usage:
+    python manage.py reconcile_storage               # run once
+    python manage.py reconcile_storage --every 60    # keep running, reconcile every 60 minutes
+"""
+from django.core.management.base import BaseCommand
+
+from solar_management.storage import reconcile_ledger
+
+
+class Command(BaseCommand):
+    help = 'Reconcile the media storage ledger with the files on disk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every', type=int, default=0, metavar='MINUTES',
+            help='Run in the foreground and reconcile every MINUTES minutes (for a systemd service).',
+        )
+
+    def handle(self, *args, **options):
+        every = options['every']
+        if not every:
+            self.reconcile()
+            return
+
+        from apscheduler.schedulers.blocking import BlockingScheduler
+
+        scheduler = BlockingScheduler()
+        scheduler.add_job(self.reconcile, 'interval', minutes=every, max_instances=1, coalesce=True)
+        self.stdout.write(self.style.SUCCESS(f'Reconciling storage every {every} minutes. Press Ctrl+C to stop.'))
+        self.reconcile()
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+
+    def reconcile(self):
+        result = reconcile_ledger()
+        self.stdout.write(
+            f"Storage reconciled: +{result['added']} / -{result['removed']} / ~{result['resized']} entries, "
+            f"drift {result['drift_bytes']} bytes."
+        )
@@ -0,0 +1,59 @@
+"""
+Background worker for report jobs (ReportJob).
+Polls for queued Excel exports, builds them, and purges expired report files
+and abandoned chunked uploads. Jobs whose worker died (no heartbeat for
+REPORT_JOB_STALE_MINUTES) are queued again; several workers can run side by side.
+Usage:
+    python manage.py run_report_worker               # keep running (systemd service)
+    python manage.py run_report_worker --once        # run queued jobs and exit
+"""
+from django.core.management.base import BaseCommand
+
+from solar_management.reports import purge_expired_reports, requeue_interrupted_jobs, run_pending_jobs
+from solar_management.uploads import purge_abandoned_uploads
+
+
+class Command(BaseCommand):
+    help = 'Run queued report jobs and purge expired report files / abandoned uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=2, help='Seconds between polls for new jobs (default 2).')
+        parser.add_argument('--once', action='store_true', help='Run queued jobs once and exit.')
+
+    def handle(self, *args, **options):
+        self.requeue()
+
+        if options['once']:
+            self.run_jobs()
+            self.purge()
+            return
+
+        from apscheduler.schedulers.blocking import BlockingScheduler
+
+        scheduler = BlockingScheduler()
+        scheduler.add_job(self.run_jobs, 'interval', seconds=options['interval'], max_instances=1, coalesce=True)
+        scheduler.add_job(self.purge, 'interval', minutes=10, max_instances=1, coalesce=True)
+        self.stdout.write(self.style.SUCCESS('Report worker started. Press Ctrl+C to stop.'))
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+
+    def run_jobs(self):
+        count = run_pending_jobs()
+        if count:
+            self.stdout.write(f'Ran {count} report job(s).')
+
+    def requeue(self):
+        count = requeue_interrupted_jobs()
+        if count:
+            self.stdout.write(self.style.WARNING(f'Re-queued {count} interrupted job(s).'))
+
+    def purge(self):
+        self.requeue()
+        count = purge_expired_reports()
+        if count:
+            self.stdout.write(f'Purged {count} expired report(s).')
+        count = purge_abandoned_uploads()
+        if count:
+            self.stdout.write(f'Removed {count} abandoned upload(s).')
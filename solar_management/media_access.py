@@ -0,0 +1,115 @@
+"""
+Authenticated serving of uploaded media (Aadhar / PAN / bank scans, site photos).
+
+Every MEDIA_URL request goes through the protected_media view: the file is
+matched to the survey(s) or user profile(s) it belongs to, the requester's role
+is checked against them (see views._can_view_media), and only then is the file
+sent. Django does not stream the bytes itself in production:
+
+    MEDIA_SENDFILE_BACKEND = 'x-accel-redirect'   nginx serves MEDIA_ACCEL_PREFIX + name
+                                                   (an `internal` location aliasing MEDIA_ROOT)
+    MEDIA_SENDFILE_BACKEND = 'x-sendfile'         Apache / lighttpd serve the absolute path
+    MEDIA_SENDFILE_BACKEND = ''                   Django streams it (local runs), via
+                                                   downloads.ranged_storage_response
+
+The web server handles Range / ETag / Last-Modified for the first two; the
+fallback implements them itself. Content-addressed blobs (`blobs/...`) never
+change under the same name, so they are cached as immutable.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import FileField, Q
+from django.http import Http404, HttpResponse
+
+from .downloads import ranged_storage_response
+
+# Content-hashed names: the bytes behind a name never change
+IMMUTABLE_PREFIX = 'blobs/'
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def _file_lookups(model, name):
+    """Q matching rows of `model` whose file fields could hold `name` (pruned by upload_to prefix)."""
+    from .storage import ContentAddressedStorage
+
+    query = Q()
+    for field in model._meta.get_fields():
+        if not isinstance(field, FileField):
+            continue
+        if isinstance(field.storage, ContentAddressedStorage):
+            prefixes = (IMMUTABLE_PREFIX, field.upload_to)
+        else:
+            prefixes = (field.upload_to,)
+        if any(isinstance(p, str) and name.startswith(p) for p in prefixes):
+            query |= Q(**{field.name: name})
+    return query
+
+
+def media_owners(name):
+    """
+    Returns (survey_ids, user_ids): the surveys and the profile owners a media
+    file belongs to. A deduplicated blob can belong to several surveys.
+    """
+    from .models import (
+        CustomerSurvey, Installation, SurveyMedia, InstallationPhoto, UserProfile, ProfileMedia,
+    )
+
+    # model -> lookup from that model to the owning survey / user
+    survey_models = [
+        (CustomerSurvey, 'pk'),
+        (Installation, 'survey_id'),
+        (SurveyMedia, 'survey_id'),
+        (InstallationPhoto, 'installation__survey_id'),
+    ]
+    profile_models = [
+        (UserProfile, 'user_id'),
+        (ProfileMedia, 'profile__user_id'),
+    ]
+
+    def owners(models):
+        ids = set()
+        for model, owner in models:
+            query = _file_lookups(model, name)
+            if query:
+                ids.update(model.objects.filter(query).values_list(owner, flat=True))
+        return ids
+
+    return owners(survey_models), owners(profile_models)
+
+
+def cache_control(name):
+    return IMMUTABLE_CACHE_CONTROL if name.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE_CONTROL
+
+
+def media_response(request, name):
+    """Sends MEDIA_ROOT/`name` through the configured backend. Raises Http404 if it does not exist."""
+    storage = default_storage
+    try:
+        if not storage.exists(name):
+            raise Http404('File not found')
+        path = storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    backend = settings.MEDIA_SENDFILE_BACKEND
+
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = ranged_storage_response(
+            request, storage, name, os.path.basename(name), content_type, as_attachment=False,
+        )
+
+    response['Cache-Control'] = cache_control(name)
+    return response
@@ -1,5 +1,13 @@
+import contextvars
+import json
+import logging
+import random
+import time
+
 from django.shortcuts import render
 from django.conf import settings
+from django.db import connection
+from django.template.base import Template
 
 
 class MaintenanceModeMiddleware:
@@ -14,7 +22,7 @@ class MaintenanceModeMiddleware:
 
     def __call__(self, request):
         # Import here to avoid AppRegistryNotReady errors at startup
-        from .models import SiteSettings
+        from .site_settings import get_site_settings
 
         # Paths that are always accessible regardless of maintenance mode
         exempt_paths = [
@@ -27,7 +35,7 @@ class MaintenanceModeMiddleware:
 
         if not is_exempt:
             try:
-                site_settings = SiteSettings.get_settings()
+                site_settings = get_site_settings()  # cached per worker, no query per request
                 if site_settings.maintenance_mode:
                     return render(request, 'solar/maintenance.html', status=503)
             except Exception:
@@ -35,3 +43,133 @@ class MaintenanceModeMiddleware:
 
         return self.get_response(request)
 
+
+
+# ==========================================
+# Request timing (Server-Timing header + log line)
+# ==========================================
+timing_logger = logging.getLogger('solar_management.timing')
+
+# RequestStats of the request being timed in this thread / task (None when not sampled)
+_current_stats = contextvars.ContextVar('request_timing_stats', default=None)
+_template_render = Template.render
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook: times every query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements.add(sql)
+
+    @property
+    def repeated(self):
+        """Queries whose SQL (before parameters) already ran in this request: the N in an N+1."""
+        return self.queries - len(self.statements)
+
+
+def _timed_template_render(self, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return _template_render(self, context)
+    # {% include %} renders templates inside templates: only time the outermost one
+    stats.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _template_render(self, context)
+    finally:
+        stats.template_depth -= 1
+        if stats.template_depth == 0:
+            stats.template_time += time.perf_counter() - start
+
+
+def _request_role(request):
+    """The role label for the log line, from what the request already loaded (no extra query)."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    roles = getattr(user, '_roles', None)  # set by roles.user_roles() if the view checked a role
+    if roles is not None:
+        if roles.profile_role:
+            return roles.profile_role
+        if roles.groups:
+            return sorted(roles.groups)[0]
+    return 'staff' if user.is_staff else 'user'
+
+
+class RequestTimingMiddleware:
+    """
+    Times a sample of requests (REQUEST_TIMING_SAMPLE_RATE): number of SQL
+    queries and time spent in them, template rendering time and total time.
+    Sampled requests get a log line on the `solar_management.timing` logger:
+
+        {"url_name": "office_workers_profiles", "role": "Admin", "status": 200,
+         "queries": 9, "repeated": 4, "db_ms": 6.1, "tpl_ms": 21.4, "app_ms": 3.2, "total_ms": 30.7, ...}
+
+    and, for staff users (or with DEBUG), a Server-Timing header that the
+    browser dev tools show under Network > Timing. `app` is the time spent
+    outside SQL and templates (Python in the view, openpyxl, ...); template
+    time includes the queries lazy querysets run while rendering.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        if self.sample_rate > 0 and Template.render is not _timed_template_render:
+            Template.render = _timed_template_render
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        total = time.perf_counter() - start
+
+        db_ms = stats.db_time * 1000
+        tpl_ms = stats.template_time * 1000
+        total_ms = total * 1000
+        app_ms = max(total_ms - db_ms - tpl_ms, 0.0)
+
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={db_ms:.1f};desc="{stats.queries} queries"',
+                f'tpl;dur={tpl_ms:.1f};desc="Templates"',
+                f'app;dur={app_ms:.1f};desc="Python"',
+                f'total;dur={total_ms:.1f}',
+            ])
+
+        match = getattr(request, 'resolver_match', None)
+        timing_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'url_name': match.view_name if match else None,
+            'role': _request_role(request),
+            'status': response.status_code,
+            'queries': stats.queries,
+            'repeated': stats.repeated,
+            'db_ms': round(db_ms, 1),
+            'tpl_ms': round(tpl_ms, 1),
+            'app_ms': round(app_ms, 1),
+            'total_ms': round(total_ms, 1),
+        }))
+        return response
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:20
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of the tokenizer as it was when this index was introduced (search.py
+# has changed since; migration 0060 re-indexes the rows the change affects).
+MAX_TERM_LENGTH = 32
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+
+def build_terms(customer_name, aadhar_linked_phone, sc_no):
+    terms = set()
+    for value in (customer_name, aadhar_linked_phone, sc_no):
+        for token in TOKEN_RE.findall(str(value or '').lower()):
+            for i in range(len(token)):
+                terms.add(token[i:i + MAX_TERM_LENGTH])
+    return terms
+
+
+def build_search_index(apps, schema_editor):
+    CustomerSurvey = apps.get_model('solar_management', 'CustomerSurvey')
+    SurveySearchTerm = apps.get_model('solar_management', 'SurveySearchTerm')
+    rows = CustomerSurvey.objects.values_list('id', 'customer_name', 'aadhar_linked_phone', 'sc_no')
+    pending = []
+    for pk, name, phone, sc_no in rows.iterator(chunk_size=500):
+        pending.extend(SurveySearchTerm(survey_id=pk, term=t) for t in build_terms(name, phone, sc_no))
+        if len(pending) >= 10000:
+            SurveySearchTerm.objects.bulk_create(pending, batch_size=1000)
+            pending = []
+    if pending:
+        SurveySearchTerm.objects.bulk_create(pending, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0046_customersurvey_property_tax_photo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveySearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='solar_management.customersurvey')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'survey'], name='survey_search_term_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0047_survey_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customersurvey',
+            name='media_bytes',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customersurvey',
+            name='media_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='customersurvey',
+            index=models.Index(fields=['media_bytes', 'media_count'], name='survey_media_bytes_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0050_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='params',
+            field=models.JSONField(blank=True, default=dict, help_text='Filters of a media archive job'),
+        ),
+    ]
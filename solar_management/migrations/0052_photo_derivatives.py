@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0051_reportjob_params'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='installationphoto',
+            name='medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='installations/site_additional/medium/'),
+        ),
+        migrations.AddField(
+            model_name='installationphoto',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='installations/site_additional/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='surveymedia',
+            name='medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='surveys/media/medium/'),
+        ),
+        migrations.AddField(
+            model_name='surveymedia',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='surveys/media/thumbs/'),
+        ),
+    ]
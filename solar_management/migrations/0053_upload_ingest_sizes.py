@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0052_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='installationphoto',
+            name='original_bytes',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='installationphoto',
+            name='stored_bytes',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='surveymedia',
+            name='original_bytes',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='surveymedia',
+            name='stored_bytes',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
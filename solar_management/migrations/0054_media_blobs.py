@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:37
+
+import solar_management.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0053_upload_ingest_sizes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Media rows pointing at this file')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='installationphoto',
+            name='photo',
+            field=models.ImageField(storage=solar_management.models.media_blob_storage, upload_to='installations/site_additional/'),
+        ),
+        migrations.AlterField(
+            model_name='surveymedia',
+            name='file',
+            field=models.FileField(storage=solar_management.models.media_blob_storage, upload_to='surveys/media/'),
+        ),
+    ]
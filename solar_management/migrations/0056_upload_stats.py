@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0055_staged_uploads'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('form_name', models.CharField(max_length=50)),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('original_bytes', models.BigIntegerField(help_text='Size of the files as picked on the device')),
+                ('sent_bytes', models.BigIntegerField(help_text='Size actually uploaded after compression')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
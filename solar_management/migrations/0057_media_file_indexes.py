@@ -0,0 +1,44 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:45
+
+import solar_management.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0056_upload_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='installationphoto',
+            name='medium',
+            field=models.ImageField(blank=True, db_index=True, editable=False, null=True, upload_to='installations/site_additional/medium/'),
+        ),
+        migrations.AlterField(
+            model_name='installationphoto',
+            name='photo',
+            field=models.ImageField(db_index=True, storage=solar_management.models.media_blob_storage, upload_to='installations/site_additional/'),
+        ),
+        migrations.AlterField(
+            model_name='installationphoto',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, editable=False, null=True, upload_to='installations/site_additional/thumbs/'),
+        ),
+        migrations.AlterField(
+            model_name='surveymedia',
+            name='file',
+            field=models.FileField(db_index=True, storage=solar_management.models.media_blob_storage, upload_to='surveys/media/'),
+        ),
+        migrations.AlterField(
+            model_name='surveymedia',
+            name='medium',
+            field=models.ImageField(blank=True, db_index=True, editable=False, null=True, upload_to='surveys/media/medium/'),
+        ),
+        migrations.AlterField(
+            model_name='surveymedia',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, editable=False, null=True, upload_to='surveys/media/thumbs/'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0057_media_file_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customersurvey',
+            name='survey_media_bytes_idx',
+        ),
+        migrations.AddIndex(
+            model_name='customersurvey',
+            index=models.Index(fields=['-media_bytes', 'id'], name='survey_media_bytes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customersurvey',
+            index=models.Index(fields=['created_at', 'id'], name='survey_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customersurvey',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='survey_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customersurvey',
+            index=models.Index(fields=['workflow_status', 'created_at', 'id'], name='survey_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customersurvey',
+            index=models.Index(fields=['aadhar_linked_phone', 'created_at'], name='survey_phone_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enquiry',
+            index=models.Index(fields=['created_at', 'id'], name='enquiry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='installation',
+            index=models.Index(fields=['timestamp', 'id'], name='installation_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['role', 'is_approved'], name='profile_role_approved_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.10 on 2026-10-18 08:56
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of phones.SURVEY_PHONE_FIELDS / PROFILE_PHONE_FIELDS / phone_digits as of this migration
+SURVEY_PHONE_FIELDS = {
+    'aadhar_linked_phone': 'aadhar_linked_phone_digits',
+    'phone_number': 'phone_number_digits',
+    'rp_phone_number': 'rp_phone_number_digits',
+}
+PROFILE_PHONE_FIELDS = {
+    'mobile_number': 'mobile_number_digits',
+}
+
+
+def phone_digits(value):
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) == 12 and digits.startswith('91'):
+        return digits[2:]
+    if len(digits) == 11 and digits.startswith('0'):
+        return digits[1:]
+    return digits
+
+
+def backfill_phone_digits(apps, schema_editor):
+    for model_name, fields in (('CustomerSurvey', SURVEY_PHONE_FIELDS), ('UserProfile', PROFILE_PHONE_FIELDS)):
+        model = apps.get_model('solar_management', model_name)
+        pending = []
+        for obj in model.objects.only('id', *fields).iterator(chunk_size=500):
+            for source, target in fields.items():
+                setattr(obj, target, phone_digits(getattr(obj, source)))
+            pending.append(obj)
+            if len(pending) >= 1000:
+                model.objects.bulk_update(pending, list(fields.values()))
+                pending = []
+        if pending:
+            model.objects.bulk_update(pending, list(fields.values()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0058_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customersurvey',
+            name='survey_phone_created_idx',
+        ),
+        migrations.AddField(
+            model_name='customersurvey',
+            name='aadhar_linked_phone_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='customersurvey',
+            name='phone_number_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='customersurvey',
+            name='rp_phone_number_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='mobile_number_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.AddIndex(
+            model_name='customersurvey',
+            index=models.Index(fields=['aadhar_linked_phone_digits', 'created_at'], name='survey_phone_created_idx'),
+        ),
+        migrations.RunPython(backfill_phone_digits, migrations.RunPython.noop),
+    ]
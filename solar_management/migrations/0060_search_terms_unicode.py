@@ -0,0 +1,59 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:02
+
+import unicodedata
+
+from django.db import migrations
+
+# Frozen copy of search.tokenize / build_terms as of this migration.
+MAX_TERM_LENGTH = 32
+
+
+def tokenize(text):
+    tokens, current = [], []
+    for char in unicodedata.normalize('NFC', str(text or '')).lower():
+        if char.isalnum() or (current and unicodedata.category(char).startswith('M')):
+            current.append(char)
+        elif current:
+            tokens.append(''.join(current))
+            current = []
+    if current:
+        tokens.append(''.join(current))
+    return tokens
+
+
+def build_terms(customer_name, aadhar_linked_phone, sc_no):
+    terms = set()
+    for value in (customer_name, aadhar_linked_phone, sc_no):
+        for token in tokenize(value):
+            for i in range(len(token)):
+                terms.add(token[i:i + MAX_TERM_LENGTH])
+    return terms
+
+
+def reindex_non_ascii(apps, schema_editor):
+    """
+    The tokenizer used to keep only [0-9a-z], dropping names written in Telugu
+    (or with accents) from the index. ASCII-only rows tokenize the same as
+    before, so only the others are re-indexed.
+    """
+    CustomerSurvey = apps.get_model('solar_management', 'CustomerSurvey')
+    SurveySearchTerm = apps.get_model('solar_management', 'SurveySearchTerm')
+    rows = CustomerSurvey.objects.values_list('id', 'customer_name', 'aadhar_linked_phone', 'sc_no')
+    for pk, name, phone, sc_no in rows.iterator(chunk_size=500):
+        if all((value or '').isascii() for value in (name, phone, sc_no)):
+            continue
+        SurveySearchTerm.objects.filter(survey_id=pk).delete()
+        SurveySearchTerm.objects.bulk_create(
+            [SurveySearchTerm(survey_id=pk, term=t) for t in build_terms(name, phone, sc_no)]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0059_phone_digits'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_non_ascii, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:08
+
+from collections import defaultdict
+
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations
+
+# Frozen copies of storage.SURVEY_FILE_FIELDS / INSTALLATION_FILE_FIELDS as of this migration
+SURVEY_FILE_FIELDS = [
+    'roof_photo', 'pan_card_photo', 'aadhar_photo', 'current_bill_photo',
+    'bank_account_photo', 'parent_bank_photo', 'property_tax_photo',
+]
+INSTALLATION_FILE_FIELDS = [
+    'inverter_serial_photo', 'inverter_acdb_photo', 'panel_serial_photo', 'site_photos_with_customer',
+]
+
+
+def backfill_media_stats(apps, schema_editor):
+    """
+    Fills CustomerSurvey.media_count / media_bytes (added empty in 0048), so the
+    storage page lists projects without a manual `backfill_media_stats` run.
+    """
+    CustomerSurvey = apps.get_model('solar_management', 'CustomerSurvey')
+    Installation = apps.get_model('solar_management', 'Installation')
+    SurveyMedia = apps.get_model('solar_management', 'SurveyMedia')
+    InstallationPhoto = apps.get_model('solar_management', 'InstallationPhoto')
+    storage = FileSystemStorage()  # MEDIA_ROOT, where every media file lives
+
+    def size(name):
+        try:
+            return storage.size(name)
+        except (OSError, ValueError):
+            return 0
+
+    stats = defaultdict(lambda: [0, 0])
+
+    def add(survey_id, names):
+        for name in names:
+            if name:
+                stats[survey_id][0] += 1
+                stats[survey_id][1] += size(name)
+
+    for survey_id, *names in CustomerSurvey.objects.values_list('id', *SURVEY_FILE_FIELDS).iterator(chunk_size=500):
+        add(survey_id, names)
+    for survey_id, *names in Installation.objects.values_list('survey_id', *INSTALLATION_FILE_FIELDS).iterator(chunk_size=500):
+        add(survey_id, names)
+    for survey_id, name in SurveyMedia.objects.values_list('survey_id', 'file').iterator(chunk_size=500):
+        add(survey_id, [name])
+    for survey_id, name in InstallationPhoto.objects.values_list('installation__survey_id', 'photo').iterator(chunk_size=500):
+        add(survey_id, [name])
+
+    stored = CustomerSurvey.objects.values_list('id', 'media_count', 'media_bytes')
+    for survey_id, count, total in stored.iterator(chunk_size=500):
+        new_count, new_total = stats.get(survey_id, (0, 0))
+        if (new_count, new_total) != (count, total):
+            CustomerSurvey.objects.filter(pk=survey_id).update(media_count=new_count, media_bytes=new_total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0060_search_terms_unicode'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_media_stats, migrations.RunPython.noop),
+    ]
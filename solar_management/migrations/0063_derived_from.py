@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:21
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_derivatives(apps, schema_editor):
+    """Rows that already have a thumbnail were made from their current original."""
+    SurveyMedia = apps.get_model('solar_management', 'SurveyMedia')
+    InstallationPhoto = apps.get_model('solar_management', 'InstallationPhoto')
+    SurveyMedia.objects.filter(thumbnail__isnull=False).exclude(thumbnail='').update(derived_from=F('file'))
+    InstallationPhoto.objects.filter(thumbnail__isnull=False).exclude(thumbnail='').update(derived_from=F('photo'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solar_management', '0062_reportjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='installationphoto',
+            name='derived_from',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='surveymedia',
+            name='derived_from',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(mark_existing_derivatives, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,13 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
 from django.dispatch import receiver
 
+from .phones import PROFILE_PHONE_FIELDS, SURVEY_PHONE_FIELDS, normalize_phone_fields
+from .storage import INSTALLATION_FILE_FIELDS, SURVEY_FILE_FIELDS
+
 class UserProfile(models.Model):
     ROLE_CHOICES = [
         ('Field Engineer', 'Field Engineer'),
@@ -14,6 +19,7 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     worker_id = models.CharField(max_length=20, unique=True, blank=True, null=True)
     mobile_number = models.CharField(max_length=15, unique=True)
+    mobile_number_digits = models.CharField(max_length=15, blank=True, default='', editable=False, db_index=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     is_approved = models.BooleanField(default=False)
     plain_password = models.CharField(max_length=128, blank=True, help_text="Stored for admin reference only")
@@ -21,8 +27,15 @@ class UserProfile(models.Model):
     pan_card_photo = models.FileField(upload_to='users/documents/', null=True, blank=True, help_text="Photo/Scan of PAN Card")
     pan_card = models.CharField(max_length=10, blank=True, null=True, help_text="PAN Card Number (10 Digits)")
 
+    class Meta:
+        indexes = [
+            # office_workers_profiles / pending_approvals: role + approval filters
+            models.Index(fields=['role', 'is_approved'], name='profile_role_approved_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        kwargs['update_fields'] = normalize_phone_fields(self, PROFILE_PHONE_FIELDS, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
         if is_new or not self.worker_id:
             self.worker_id = f"WS-USR-{self.id:04d}"
@@ -31,6 +44,9 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
+MEDIA_COUNTER_FIELDS = ('media_count', 'media_bytes')
+
+
 class CustomerSurvey(models.Model):
     # --- Field Engineer Section ---
     CONNECTION_CHOICES = [('Domestic', 'Domestic'), ('Commercial', 'Commercial'), ('GHS', 'GHS')]
@@ -51,6 +67,9 @@ class CustomerSurvey(models.Model):
     aadhar_linked_phone = models.CharField(max_length=10, default="0000000000", help_text="10 Digits")
     bank_account_no = models.CharField(max_length=30, blank=True) 
     phone_number = models.CharField(max_length=15, null=True, blank=True) # Restored for Office Search
+    # Normalized copies of the phone fields for exact lookups (see phones.py), set in save()
+    aadhar_linked_phone_digits = models.CharField(max_length=15, blank=True, default='', editable=False)
+    phone_number_digits = models.CharField(max_length=15, blank=True, default='', editable=False, db_index=True)
     
     # Roof & Structure
     roof_type = models.CharField(max_length=100, choices=ROOF_CHOICES)
@@ -81,6 +100,7 @@ class CustomerSurvey(models.Model):
     mefma_status = models.BooleanField(default=False, help_text="Yes if MEFMA, No if Not")
     rp_name = models.CharField(max_length=255, null=True, blank=True)
     rp_phone_number = models.CharField(max_length=15, null=True, blank=True)
+    rp_phone_number_digits = models.CharField(max_length=15, blank=True, default='', editable=False, db_index=True)
     co_name = models.CharField(max_length=255, null=True, blank=True)
     co_phone_number = models.CharField(max_length=15, null=True, blank=True)
     reference_name = models.CharField(max_length=255, null=True, blank=True, help_text="Reference Name if not MEFMA")
@@ -110,8 +130,35 @@ class CustomerSurvey(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
+    # Denormalized media totals (all photos/documents incl. installation), kept in sync by signals
+    media_count = models.PositiveIntegerField(default=0, editable=False)
+    media_bytes = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # manage_storage: largest first, keyset on (-media_bytes, id)
+            models.Index(fields=['-media_bytes', 'id'], name='survey_media_bytes_idx'),
+            # Keyset pagination order (created_at, id): office_dashboard, office_fe_data
+            models.Index(fields=['created_at', 'id'], name='survey_created_idx'),
+            # fe_dashboard: own surveys, newest first
+            models.Index(fields=['created_by', 'created_at', 'id'], name='survey_creator_created_idx'),
+            # installer_dashboard / admin_dashboard / status filter: workflow_status, newest first
+            models.Index(fields=['workflow_status', 'created_at', 'id'], name='survey_status_created_idx'),
+            # Phone lookups (get_survey_by_phone, get_customer_data, ...): normalized exact match, newest first
+            models.Index(fields=['aadhar_linked_phone_digits', 'created_at'], name='survey_phone_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # media_count / media_bytes are maintained with F() deltas (see storage.py); a full save of
+            # an instance loaded earlier must not write its stale copies back
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in MEDIA_COUNTER_FIELDS and f.attname not in deferred
+            ]
+        kwargs['update_fields'] = normalize_phone_fields(self, SURVEY_PHONE_FIELDS, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
         if is_new or not self.application_id:
             self.application_id = f"WS-APP-{self.id:05d}"
@@ -134,39 +181,33 @@ class CustomerSurvey(models.Model):
 
     @property
     def current_roof_photo_url(self):
-        if self.roof_photo: return self.roof_photo.url
-        m = self.media_files.filter(media_type='roof').first()
-        return m.file.url if m and m.file else None
+        from .media_urls import current_media_url
+        return current_media_url(self, 'roof')
 
     @property
     def current_pan_card_photo_url(self):
-        if self.pan_card_photo: return self.pan_card_photo.url
-        m = self.media_files.filter(media_type='pan_card').first()
-        return m.file.url if m and m.file else None
+        from .media_urls import current_media_url
+        return current_media_url(self, 'pan_card')
 
     @property
     def current_aadhar_photo_url(self):
-        if self.aadhar_photo: return self.aadhar_photo.url
-        m = self.media_files.filter(media_type='aadhar').first()
-        return m.file.url if m and m.file else None
+        from .media_urls import current_media_url
+        return current_media_url(self, 'aadhar')
 
     @property
     def current_bill_photo_url(self):
-        if self.current_bill_photo: return self.current_bill_photo.url
-        m = self.media_files.filter(media_type='current_bill').first()
-        return m.file.url if m and m.file else None
+        from .media_urls import current_media_url
+        return current_media_url(self, 'current_bill')
 
     @property
     def current_bank_account_photo_url(self):
-        if self.bank_account_photo: return self.bank_account_photo.url
-        m = self.media_files.filter(media_type='bank_account').first()
-        return m.file.url if m and m.file else None
+        from .media_urls import current_media_url
+        return current_media_url(self, 'bank_account')
 
     @property
     def current_property_tax_photo_url(self):
-        if self.property_tax_photo: return self.property_tax_photo.url
-        m = self.media_files.filter(media_type='property_tax').first()
-        return m.file.url if m and m.file else None
+        from .media_urls import current_media_url
+        return current_media_url(self, 'property_tax')
 
     @property
     def has_installation(self):
@@ -259,8 +300,20 @@ class Installation(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            # office_installer_data / admin_dashboard: newest first, keyset on (timestamp, id)
+            models.Index(fields=['timestamp', 'id'], name='installation_timestamp_idx'),
+        ]
+
     def __str__(self):
         return f"Installation for {self.survey.customer_name}"
+def media_blob_storage():
+    """Content-addressed storage for SurveyMedia / InstallationPhoto uploads (identical files are stored once)."""
+    from .storage import ContentAddressedStorage
+    return ContentAddressedStorage()
+
+
 class InstallationPhoto(models.Model):
     PHOTO_TYPE_CHOICES = [
         ('inverter_serial', 'Inverter Serial'),
@@ -270,13 +323,25 @@ class InstallationPhoto(models.Model):
         ('additional', 'Additional Site Photos'),
     ]
     installation = models.ForeignKey(Installation, on_delete=models.CASCADE, related_name='additional_photos')
-    photo = models.ImageField(upload_to='installations/site_additional/')
+    photo = models.ImageField(upload_to='installations/site_additional/', storage=media_blob_storage, db_index=True)
     photo_type = models.CharField(max_length=50, choices=PHOTO_TYPE_CHOICES, default='additional')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Derivatives of `photo` (see thumbnails.py). File names are indexed for the media access check (media_access.py)
+    thumbnail = models.ImageField(upload_to='installations/site_additional/thumbs/', null=True, blank=True, editable=False, db_index=True)
+    medium = models.ImageField(upload_to='installations/site_additional/medium/', null=True, blank=True, editable=False, db_index=True)
+    # Original name the derivatives were last made (or found impossible) for; differs when the file is replaced
+    derived_from = models.CharField(max_length=255, blank=True, default='', editable=False)
+    # Upload size before / after ingest recompression (see ingest.py)
+    original_bytes = models.BigIntegerField(null=True, blank=True, editable=False)
+    stored_bytes = models.BigIntegerField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.get_photo_type_display()} for {self.installation.survey.customer_name}"
 
+    def sized_url(self, size='thumb'):
+        from .thumbnails import derivative_url
+        return derivative_url(self, size)
+
 class SurveyMedia(models.Model):
     MEDIA_TYPE_CHOICES = [
         ('roof', 'Roof Photos'),
@@ -288,13 +353,25 @@ class SurveyMedia(models.Model):
         ('property_tax', 'Property Tax'),
     ]
     survey = models.ForeignKey(CustomerSurvey, on_delete=models.CASCADE, related_name='media_files')
-    file = models.FileField(upload_to='surveys/media/')
+    file = models.FileField(upload_to='surveys/media/', storage=media_blob_storage, db_index=True)
     media_type = models.CharField(max_length=50, choices=MEDIA_TYPE_CHOICES)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Derivatives of `file` when it is an image (see thumbnails.py). File names are indexed for the media access check (media_access.py)
+    thumbnail = models.ImageField(upload_to='surveys/media/thumbs/', null=True, blank=True, editable=False, db_index=True)
+    medium = models.ImageField(upload_to='surveys/media/medium/', null=True, blank=True, editable=False, db_index=True)
+    # Original name the derivatives were last made (or found impossible) for; differs when the file is replaced
+    derived_from = models.CharField(max_length=255, blank=True, default='', editable=False)
+    # Upload size before / after ingest recompression (see ingest.py)
+    original_bytes = models.BigIntegerField(null=True, blank=True, editable=False)
+    stored_bytes = models.BigIntegerField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.get_media_type_display()} for {self.survey.customer_name}"
 
+    def sized_url(self, size='thumb'):
+        from .thumbnails import derivative_url
+        return derivative_url(self, size)
+
 class ProfileMedia(models.Model):
     MEDIA_TYPE_CHOICES = [
         ('aadhar', 'Aadhar Card'),
@@ -344,6 +421,12 @@ class Enquiry(models.Model):
     remarks = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # enquiry_list: newest first, keyset on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='enquiry_created_idx'),
+        ]
+
     def __str__(self):
         return f"Enquiry from {self.name} ({self.mobile_number})"
 
@@ -361,4 +444,289 @@ class SiteSettings(models.Model):
     @classmethod
     def get_settings(cls):
         obj, _ = cls.objects.get_or_create(pk=1)
-        return obj
\ No newline at end of file
+        return obj
+
+class StorageUsage(models.Model):
+    """Singleton running total of everything stored under MEDIA_ROOT (see storage.py)."""
+    total_bytes = models.BigIntegerField(default=0)
+    file_count = models.IntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True, help_text="Last time the ledger was checked against the disk")
+
+    class Meta:
+        verbose_name = "Storage Usage"
+        verbose_name_plural = "Storage Usage"
+
+    def __str__(self):
+        return f"{self.file_count} files, {self.total_bytes} bytes"
+
+    @classmethod
+    def get_usage(cls):
+        obj, _ = cls.objects.get_or_create(pk=1)
+        return obj
+
+
+class StoredFile(models.Model):
+    """Storage ledger entry: one file saved under MEDIA_ROOT and its size."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class MediaBlob(models.Model):
+    """
+    One stored file in content-addressed storage (see storage.ContentAddressedStorage),
+    shared by every media row that uploaded the same bytes.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0, help_text="Media rows pointing at this file")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} (x{self.ref_count})"
+
+
+class StagedUpload(models.Model):
+    """A file being uploaded in chunks, before it is attached to a survey / installation (see uploads.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='staged_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Total size declared by the client")
+    received = models.BigIntegerField(default=0, help_text="Bytes acknowledged so far")
+    complete = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='staged_upload_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
+class UploadStats(models.Model):
+    """Browser-side compression totals of one form submission (static/js/image_compress.js)."""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_stats')
+    form_name = models.CharField(max_length=50)
+    file_count = models.PositiveIntegerField(default=0)
+    original_bytes = models.BigIntegerField(help_text="Size of the files as picked on the device")
+    sent_bytes = models.BigIntegerField(help_text="Size actually uploaded after compression")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.form_name}: {self.original_bytes} -> {self.sent_bytes} bytes"
+
+
+def report_storage():
+    """Generated reports live outside MEDIA_ROOT so the web server never serves them directly."""
+    from django.conf import settings
+    from django.core.files.storage import FileSystemStorage
+    return FileSystemStorage(location=settings.REPORTS_ROOT)
+
+
+class ReportJob(models.Model):
+    """A background Excel export or bulk media archive (see reports.py). Identical in-flight requests share one job."""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Running', 'Running'),
+        ('Completed', 'Completed'),
+        ('Failed', 'Failed'),
+    ]
+    report_type = models.CharField(max_length=30)
+    params = models.JSONField(default=dict, blank=True, help_text="Filters of a media archive job")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete (0-100)")
+    file = models.FileField(storage=report_storage, null=True, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last sign of life from the worker running the job")
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'report_type'], name='report_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} report ({self.status}, {self.progress}%)"
+
+
+class SurveySearchTerm(models.Model):
+    """Search index row: one normalized term (token suffix) of a survey's name / phone / SC No."""
+    survey = models.ForeignKey(CustomerSurvey, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=32)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'survey'], name='survey_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.survey_id}"
+
+
+SEARCH_INDEXED_FIELDS = {'customer_name', 'aadhar_linked_phone', 'sc_no'}
+
+
+@receiver(post_save, sender=CustomerSurvey)
+def update_survey_search_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Keep the search index in sync. Deletes are handled by the FK cascade."""
+    if raw:
+        return
+    if update_fields is not None and not SEARCH_INDEXED_FIELDS.intersection(update_fields):
+        return
+    from .search import index_survey
+    index_survey(instance)
+
+
+# ------------------------------------------------------------------
+# Media totals (media_count / media_bytes) on CustomerSurvey
+# ------------------------------------------------------------------
+# Which file fields each model contributes to its survey's media totals
+MEDIA_FILE_FIELDS = {
+    CustomerSurvey: SURVEY_FILE_FIELDS,
+    Installation: INSTALLATION_FILE_FIELDS,
+    SurveyMedia: ['file'],
+    InstallationPhoto: ['photo'],
+}
+
+
+def _media_survey_filter(instance):
+    """CustomerSurvey filter matching the survey a SurveyMedia / InstallationPhoto belongs to."""
+    if isinstance(instance, SurveyMedia):
+        return {'pk': instance.survey_id}
+    return {'pk__in': Installation.objects.filter(pk=instance.installation_id).values('survey_id')}
+
+
+@receiver(post_init, sender=CustomerSurvey)
+@receiver(post_init, sender=Installation)
+@receiver(post_init, sender=SurveyMedia)
+@receiver(post_init, sender=InstallationPhoto)
+def remember_file_names(sender, instance, **kwargs):
+    """Keeps the stored file names as loaded, to tell on save which file fields changed."""
+    from .storage import loaded_file_names
+    instance._loaded_file_names = loaded_file_names(instance, MEDIA_FILE_FIELDS[sender])
+
+
+@receiver(post_save, sender=CustomerSurvey)
+def survey_files_changed(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    fields = MEDIA_FILE_FIELDS[CustomerSurvey]
+    if update_fields is not None and not set(fields).intersection(update_fields):
+        return
+    from .storage import file_fields_saved
+    file_fields_saved(instance, fields, instance.pk, created)
+
+
+@receiver(post_save, sender=Installation)
+def installation_files_changed(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    from .storage import file_fields_saved
+    file_fields_saved(instance, MEDIA_FILE_FIELDS[Installation], instance.survey_id, created)
+
+
+@receiver(post_delete, sender=Installation)
+def installation_deleted(sender, instance, **kwargs):
+    # Its files are usually deleted just before the row, so their sizes can't be subtracted
+    from .storage import refresh_media_stats
+    refresh_media_stats(instance.survey_id)
+
+
+@receiver(post_save, sender=SurveyMedia)
+@receiver(post_save, sender=InstallationPhoto)
+def media_row_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    from .storage import add_media_stats, changed_file_fields, loaded_file_names, media_row_size, refresh_media_stats
+    fields = MEDIA_FILE_FIELDS[sender]
+    if created:
+        add_media_stats(_media_survey_filter(instance), 1, media_row_size(instance))
+    elif changed_file_fields(instance, fields):
+        survey_id = CustomerSurvey.objects.filter(**_media_survey_filter(instance)).values_list('pk', flat=True).first()
+        if survey_id:
+            refresh_media_stats(survey_id)
+    instance._loaded_file_names = loaded_file_names(instance, fields)
+
+
+@receiver(post_delete, sender=SurveyMedia)
+@receiver(post_delete, sender=InstallationPhoto)
+def media_row_deleted(sender, instance, **kwargs):
+    from .storage import add_media_stats, media_row_size
+    add_media_stats(_media_survey_filter(instance), -1, -media_row_size(instance))
+
+
+# ------------------------------------------------------------------
+# Upload ingest (recompression) and thumbnails of uploaded photos
+# ------------------------------------------------------------------
+@receiver(pre_save, sender=SurveyMedia)
+def ingest_survey_media(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .ingest import ingest_upload
+    ingest_upload(instance, 'file')
+
+
+@receiver(pre_save, sender=InstallationPhoto)
+def ingest_installation_photo(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .ingest import ingest_upload
+    ingest_upload(instance, 'photo')
+
+
+@receiver(post_save, sender=SurveyMedia)
+@receiver(post_save, sender=InstallationPhoto)
+def create_photo_derivatives(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .thumbnails import generate_derivatives
+    generate_derivatives(instance)
+
+
+@receiver(post_delete, sender=SurveyMedia)
+@receiver(post_delete, sender=InstallationPhoto)
+def delete_photo_files(sender, instance, **kwargs):
+    """Drops the row's derivatives and its reference to the shared original (unlinked when unused)."""
+    from .storage import delete_stored_file
+    from .thumbnails import delete_derivatives, source_file
+    delete_derivatives(instance)
+    delete_stored_file(source_file(instance))
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+def site_settings_changed(sender, instance, **kwargs):
+    """Makes every worker reload its cached SiteSettings once the change is committed."""
+    from django.db import transaction
+    from .site_settings import invalidate_site_settings
+    transaction.on_commit(invalidate_site_settings)
+
+
+@receiver(post_save, sender=CustomerSurvey)
+@receiver(post_delete, sender=CustomerSurvey)
+@receiver(post_save, sender=Installation)
+@receiver(post_delete, sender=Installation)
+@receiver(post_save, sender=BankDetails)
+@receiver(post_delete, sender=BankDetails)
+@receiver(post_save, sender=SurveyMedia)
+@receiver(post_delete, sender=SurveyMedia)
+@receiver(post_save, sender=InstallationPhoto)
+@receiver(post_delete, sender=InstallationPhoto)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_cache_version(sender, **kwargs):
+    """Invalidates cached values computed from `sender` once the change is committed (see caching.py)."""
+    from django.db import transaction
+    from .caching import bump_version
+    transaction.on_commit(lambda: bump_version(sender))
@@ -0,0 +1,202 @@
+"""
+Keyset (cursor) pagination.
+
+Paginator runs COUNT(*) over the whole filtered set and then LIMIT/OFFSET,
+so page 500 makes the database walk 5000 rows first. KeysetPaginator instead
+remembers the sort key of the last row shown and asks for the rows after it:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC LIMIT per_page + 1
+
+which costs the same on every page given an index on the ordering columns.
+Pages are addressed by opaque cursors (`?cursor=...`) instead of numbers; a
+total is only counted on request, and capped (`total_limit`), so it stays cheap.
+
+    paginator = KeysetPaginator(surveys, 10)                   # (-created_at, -id)
+    page = paginator.page(request.GET.get('cursor'))
+    page.next_cursor / page.previous_cursor / page.to_json(row_fn)
+
+The ordering columns must be non-null and the last one unique (the pk). Rows
+may be model instances or .values() dicts that include the ordering columns.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _plain(value):
+    # Full precision: DjangoJSONEncoder would cut datetimes to milliseconds and break the key comparison
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    return str(value)  # Decimal, UUID
+
+
+def keyset_after(ordering, values, forward=True):
+    """Q for rows strictly after `values` in `ordering` (before them when not `forward`)."""
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, values):
+        descending, name = name.startswith('-'), name.lstrip('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_batches(queryset, ordering, batch_size):
+    """
+    Every row of a `.values()` / `.values_list(named=True)` queryset in `ordering`,
+    read `batch_size` rows per query, each batch starting after the last row of
+    the one before. Unlike `.iterator()` this bounds memory on MySQL too, whose
+    driver buffers a whole result set client-side. The rows must include the
+    ordering columns under their lookup names (e.g. `survey__customer_name`),
+    and the last ordering column must be unique.
+    """
+    names = [name.lstrip('-') for name in ordering]
+    queryset = queryset.order_by(*ordering)
+    batch = list(queryset[:batch_size])
+    while batch:
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+        values = [last[name] if isinstance(last, dict) else getattr(last, name) for name in names]
+        batch = list(queryset.filter(keyset_after(ordering, values))[:batch_size])
+
+
+class KeysetPage:
+    """One page of rows plus the cursors to its neighbours."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, total=None, total_capped=False):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+        self.total_capped = total_capped
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def to_json(self, row):
+        """Payload for the infinite-scroll JSON variant; `row(obj)` serializes one object."""
+        return {
+            'results': [row(obj) for obj in self.object_list],
+            'next': self.next_cursor,
+            'previous': self.previous_cursor,
+            'total': self.total,
+            'total_capped': self.total_capped,
+        }
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING, total_limit=None):
+        """
+        `total_limit`: also count the rows, but stop at this many (the page then
+        reports total=total_limit, total_capped=True). None skips counting.
+        """
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.total_limit = total_limit
+        model = queryset.model
+        self._fields = [
+            (name.lstrip('-'), name.startswith('-'), model._meta.get_field(name.lstrip('-')))
+            for name in self.ordering
+        ]
+
+    # -- cursors -------------------------------------------------------
+
+    def _encode(self, obj, direction):
+        if isinstance(obj, dict):  # a .values() queryset
+            key = [_plain(obj[name]) for name, _, _ in self._fields]
+        else:
+            key = [_plain(getattr(obj, field.attname)) for _, _, field in self._fields]
+        raw = json.dumps({'d': direction, 'k': key}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, key = data['d'], data['k']
+            if direction not in ('n', 'p') or len(key) != len(self._fields):
+                raise InvalidCursor(cursor)
+            values = [field.to_python(value) for (_, _, field), value in zip(self._fields, key)]
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    # -- queries -------------------------------------------------------
+
+    def _after(self, values, forward):
+        return keyset_after(self.ordering, values, forward)
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _count(self):
+        if self.total_limit is None:
+            return None, False
+        count = self.queryset.order_by()[:self.total_limit + 1].count()
+        if count > self.total_limit:
+            return self.total_limit, True
+        return count, False
+
+    def page(self, cursor=None):
+        """The page a cursor points at; a missing or malformed cursor gives the first page."""
+        direction, values = 'n', None
+        if cursor:
+            try:
+                direction, values = self._decode(cursor)
+            except InvalidCursor:
+                direction, values = 'n', None
+
+        forward = direction == 'n'
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, forward))
+        queryset = queryset.order_by(*(self.ordering if forward else self._reversed_ordering()))
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = more, values is not None
+        else:
+            has_next, has_previous = True, more
+        if not rows:
+            # Ran off the end (e.g. rows deleted since the cursor was made): start over
+            return self.page() if values is not None else KeysetPage([], None, None, *self._count())
+
+        next_cursor = self._encode(rows[-1], 'n') if has_next else None
+        previous_cursor = self._encode(rows[0], 'p') if has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor, *self._count())
@@ -0,0 +1,50 @@
+"""
+Phone number normalization.
+
+Numbers reach us as "+91 98765 43210", "098765-43210", "9876543210" ... so
+the lookup APIs used to fall back to substring scans. Every stored phone now
+has a `<field>_digits` twin holding its canonical form (the 10-digit Indian
+national number), filled in on save, and lookups normalize their input the
+same way and compare with `=` against an indexed column.
+"""
+import re
+
+NATIONAL_LENGTH = 10
+COUNTRY_CODE = '91'
+
+# Phone field -> its normalized twin, per model
+SURVEY_PHONE_FIELDS = {
+    'aadhar_linked_phone': 'aadhar_linked_phone_digits',
+    'phone_number': 'phone_number_digits',
+    'rp_phone_number': 'rp_phone_number_digits',
+}
+PROFILE_PHONE_FIELDS = {
+    'mobile_number': 'mobile_number_digits',
+}
+
+
+def phone_digits(value):
+    """
+    Canonical form of a phone number: its digits without the +91 / 0 prefix.
+    Numbers that are not Indian mobiles / landlines are kept as plain digits.
+    """
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) == NATIONAL_LENGTH + len(COUNTRY_CODE) and digits.startswith(COUNTRY_CODE):
+        return digits[len(COUNTRY_CODE):]
+    if len(digits) == NATIONAL_LENGTH + 1 and digits.startswith('0'):
+        return digits[1:]
+    return digits
+
+
+def normalize_phone_fields(instance, fields, update_fields=None):
+    """
+    Sets the `_digits` twins on `instance` before it is saved. Returns the
+    update_fields to save with (the twins added next to their phone fields).
+    """
+    for source, target in fields.items():
+        setattr(instance, target, phone_digits(getattr(instance, source)))
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    update_fields.update(target for source, target in fields.items() if source in update_fields)
+    return update_fields
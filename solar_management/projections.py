@@ -0,0 +1,147 @@
+"""
+Declarative field projections for JSON responses.
+
+A Projection lists the keys of a JSON object and, for each, the `.values()`
+fields it is built from. A view selects the keys it was asked for
+(`?fields=a,b`, default: all), queries exactly the fields those keys need in
+one `.values()` query, and serializes each row:
+
+    selected = SURVEY_DETAIL.select(request.GET.get('fields'))
+    row = CustomerSurvey.objects.filter(pk=pk).values(*sources(selected)).first()
+    return JsonResponse(SURVEY_DETAIL.serialize(row, selected))
+
+The lookup APIs (get_survey_by_phone, get_survey_by_phone_all,
+get_survey_by_id, get_bank_details_by_phone) use the projections below;
+datatables.Column is a Field with sorting / filtering on top.
+"""
+
+
+def text(value):
+    """None -> '' (nullable CharFields)."""
+    return value or ''
+
+
+def string(value):
+    """Decimals / floats as strings, as the forms expect them."""
+    return str(value)
+
+
+def yes_no(value):
+    return 'Yes' if value else 'No'
+
+
+def date_format(fmt):
+    return lambda value: value.strftime(fmt) if value else ''
+
+
+class Field:
+    """
+    One JSON key. `fields` are the .values() fields it needs (default: its own
+    name); the value is `render(row)`, or `format(row[fields[0]])`, or the raw value.
+    """
+
+    def __init__(self, name, fields=None, render=None, format=None):
+        self.name = name
+        self.fields = tuple(fields or (name,))
+        if render is None:
+            source = self.fields[0]
+            render = (lambda row: format(row[source])) if format else (lambda row: row[source])
+        self.render = render
+
+
+class Projection:
+    def __init__(self, *fields):
+        self.fields = fields
+        self._by_name = {field.name: field for field in fields}
+
+    def select(self, requested=None):
+        """The Fields named in `requested` ('a,b,c'); all of them when none of the names is known."""
+        names = [name for name in (requested or '').split(',') if name in self._by_name]
+        return [self._by_name[name] for name in names] or list(self.fields)
+
+    def serialize(self, row, selected=None):
+        return {field.name: field.render(row) for field in (selected or self.fields)}
+
+
+def sources(*selections):
+    """The .values() fields needed to render every Field in `selections`."""
+    needed = set()
+    for selected in selections:
+        for field in selected:
+            needed.update(field.fields)
+    return sorted(needed)
+
+
+# -- Lookup API shapes -------------------------------------------------
+
+# Installer auto-fill: get_survey_by_phone (single match) and get_survey_by_id
+SURVEY_DETAIL = Projection(
+    Field('survey_id', ('id',)),
+    Field('customer_name'),
+    Field('connection_type'),
+    Field('sc_no'),
+    Field('phase'),
+    Field('feasibility_kw', format=string),
+    Field('aadhar_no'),
+    Field('pan_card'),
+    Field('email'),
+    Field('phone_number', ('aadhar_linked_phone',), format=text),
+    Field('area'),
+    Field('gps_coordinates'),
+    Field('roof_type'),
+    Field('structure_type'),
+    Field('structure_height', format=string),
+    Field('agreed_amount', format=string),
+    Field('advance_paid', format=lambda value: str(value) if value else '0'),
+    Field('mefma_status', format=yes_no),
+    Field('rp_name', format=text),
+    Field('rp_phone_number', format=text),
+    Field('fe_remarks', format=text),
+    Field('reference_name', format=text),
+    Field('pms_registration_number', format=text),
+    Field('division', format=text),
+    Field('registration_status', format=yes_no),
+)
+
+# get_survey_by_phone: one row per selectable application
+SURVEY_RECORD = Projection(
+    Field('id'),
+    Field('customer_name'),
+    Field('sc_no'),
+    Field('phase'),
+    Field('area'),
+    Field('feasibility_kw', format=string),
+    Field('agreed_amount', format=string),
+    Field('roof_type'),
+    Field('connection_type'),
+    Field('created_at', format=date_format('%Y-%m-%d')),
+)
+
+# get_survey_by_phone_all (office): single match / one row per application
+OFFICE_SURVEY = Projection(
+    Field('survey_id', ('id',)),
+    Field('customer_name'),
+    Field('sc_no'),
+    Field('phase'),
+    Field('area', format=text),
+    Field('agreed_amount', format=string),
+    Field('workflow_status'),
+    Field('phone_number', ('aadhar_linked_phone',), format=text),
+)
+OFFICE_SURVEY_RECORD = Projection(
+    Field('id'),
+    Field('customer_name'),
+    Field('sc_no'),
+    Field('phase'),
+    Field('area', format=text),
+    Field('agreed_amount', format=string),
+    Field('workflow_status'),
+    Field('created_at', format=date_format('%d %b %Y')),
+)
+
+# get_bank_details_by_phone
+BANK_DETAILS = Projection(
+    Field('parent_bank', ('bank_details__parent_bank',)),
+    Field('parent_bank_ac_no', ('bank_details__parent_bank_ac_no',)),
+    Field('customer_name'),
+)
@@ -0,0 +1,69 @@
+"""
+EXPLAIN checks for the app's hot list / lookup queries.
+
+query_shapes() lists the queries the indexes in migration 0058 are meant to
+serve; plan_problems(explain(queryset)) names any full table scan or separate
+sort step in a plan, i.e. a query that lost its index. The test suite runs
+them on SQLite; `manage.py check_query_plans` runs them on a real database.
+"""
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+
+
+def query_shapes():
+    """(name, queryset) for each query shape the indexes in migration 0058 are meant to serve."""
+    from .models import CustomerSurvey, Enquiry, Installation, UserProfile
+
+    moment = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    after = Q(created_at__lt=moment) | Q(created_at=moment, id__lt=1000)
+    newest = ('-created_at', '-id')
+    return [
+        ('office_dashboard', CustomerSurvey.objects.order_by(*newest)[:11]),
+        ('office_dashboard (next page)', CustomerSurvey.objects.filter(after).order_by(*newest)[:11]),
+        ('fe_dashboard', CustomerSurvey.objects.filter(created_by_id=1).order_by(*newest)[:11]),
+        ('fe_dashboard (next page)', CustomerSurvey.objects.filter(after, created_by_id=1).order_by(*newest)[:11]),
+        ('installer_dashboard', CustomerSurvey.objects.filter(workflow_status='Approved').annotate(
+            installed=Exists(Installation.objects.filter(survey_id=OuterRef('pk')))
+        ).filter(installed=False).order_by(*newest)[:10]),
+        ('get_survey_by_phone', CustomerSurvey.objects.filter(aadhar_linked_phone_digits='9876543210').order_by('-created_at')),
+        ('manage_storage', CustomerSurvey.objects.filter(media_count__gt=0).order_by('-media_bytes', 'id')[:21]),
+        ('office_installer_data', Installation.objects.order_by('-timestamp', '-id')[:26]),
+        ('enquiry_list', Enquiry.objects.order_by(*newest)[:26]),
+        ('office_workers_profiles', UserProfile.objects.filter(role='Installer', is_approved=True)),
+        ('profile by mobile', UserProfile.objects.filter(mobile_number_digits='9876543210')),
+    ]
+
+
+def explain(queryset):
+    """The raw plan rows of `queryset` for the current database."""
+    sql, params = queryset.query.sql_with_params()
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def plan_problems(rows):
+    """Full scans / extra sort steps found in a plan (empty list when it is fine)."""
+    problems = []
+    for row in rows:
+        if connection.vendor == 'sqlite':
+            detail = row['detail']
+            if detail.startswith('SCAN ') and ' USING ' not in detail:
+                problems.append(detail)
+            elif 'TEMP B-TREE FOR' in detail and 'ORDER BY' in detail:
+                problems.append(detail)
+        elif connection.vendor == 'mysql':
+            extra = row.get('Extra') or ''
+            if row.get('type') == 'ALL':
+                problems.append(f"full scan of {row.get('table')}")
+            if 'Using filesort' in extra:
+                problems.append(f"filesort on {row.get('table')}")
+        else:
+            line = next(iter(row.values()))
+            if 'Seq Scan' in line or line.lstrip(' ->').startswith('Sort '):
+                problems.append(line.strip())
+    return problems
@@ -0,0 +1,181 @@
+"""
+Background report jobs.
+
+Office/Admin users ask for a report with request_report(); the job row is
+picked up by the worker (`python manage.py run_report_worker`), which builds
+the workbook with exports.build_report(), records progress on the row and
+stores the file under REPORTS_ROOT. The browser polls the job until it is
+Completed and then downloads it. Finished files are purged after
+REPORT_RETENTION_HOURS.
+
+A running job's heartbeat_at is touched as it makes progress. Several workers
+(or a cron `--once` run next to the service) can share the queue: a Running job
+is only handed to another worker once its heartbeat is older than
+REPORT_JOB_STALE_MINUTES, i.e. its worker died.
+
+Bulk media archives (archives.MEDIA_ARCHIVE) run through the same queue; their
+filters are kept in ReportJob.params and the ZIP is streamed straight into
+REPORTS_ROOT.
+"""
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .archives import build_archive, archive_filename, MEDIA_ARCHIVE
+from .exports import build_report, report_filename, REPORT_TYPES, OFFICE_REPORT_TYPES
+from .roles import user_roles
+
+ACTIVE_STATUSES = ('Pending', 'Running')
+
+# A running job writes a heartbeat at least this often, even while its progress stays put
+HEARTBEAT_SECONDS = 30
+
+
+def can_export(user, report_type):
+    """Staff/Admin may export every report; Office users only OFFICE_REPORT_TYPES and media archives."""
+    if user.is_staff:
+        return True
+    is_office = user_roles(user).profile_role == 'Office'
+    return is_office and (report_type in OFFICE_REPORT_TYPES or report_type == MEDIA_ARCHIVE)
+
+
+def request_report(report_type, user):
+    """
+    Returns the job that will produce `report_type`.
+    If the same report is already queued or running, that job is returned instead of a new one.
+    """
+    from .models import ReportJob
+
+    if report_type not in REPORT_TYPES:
+        report_type = 'master'
+
+    existing = ReportJob.objects.filter(report_type=report_type, status__in=ACTIVE_STATUSES).order_by('id').first()
+    if existing:
+        return existing
+
+    job = ReportJob.objects.create(report_type=report_type, requested_by=user)
+    # Two requests may have raced past the check above; the oldest active job wins.
+    oldest = ReportJob.objects.filter(report_type=report_type, status__in=ACTIVE_STATUSES).order_by('id').first()
+    if oldest and oldest.pk != job.pk:
+        job.delete()
+        return oldest
+    return job
+
+
+def request_media_archive(params, user):
+    """
+    Returns the job that will build a media archive for `params`
+    (see archives.clean_archive_params). An active job with the same filters is reused.
+    """
+    from .models import ReportJob
+
+    active = ReportJob.objects.filter(report_type=MEDIA_ARCHIVE, status__in=ACTIVE_STATUSES).order_by('id')
+    for job in active:
+        if job.params == params:
+            return job
+    return ReportJob.objects.create(report_type=MEDIA_ARCHIVE, params=params, requested_by=user)
+
+
+def claim_next_job():
+    """Atomically moves the oldest Pending job to Running and returns it (or None)."""
+    from .models import ReportJob
+
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update().filter(status='Pending').order_by('id').first()
+        if job is None:
+            return None
+        job.status = 'Running'
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def _write_archive(job, progress):
+    """Streams the job's media archive directly into report storage (no temp copy)."""
+    storage = job.file.storage
+    name = storage.get_available_name(archive_filename(timezone.localtime()))
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path, 'wb') as fh:
+            build_archive(job.params, fh, progress=progress)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    job.file.name = name
+
+
+def run_job(job):
+    """Builds the report for `job` and stores the file. Never raises."""
+    from .models import ReportJob
+
+    last = {'progress': -1, 'beat': time.monotonic()}
+
+    def on_progress(percent):
+        # Only write when the percentage moves, or the heartbeat is due
+        now = time.monotonic()
+        if percent != last['progress'] or now - last['beat'] >= HEARTBEAT_SECONDS:
+            last['progress'], last['beat'] = percent, now
+            ReportJob.objects.filter(pk=job.pk).update(progress=percent, heartbeat_at=timezone.now())
+
+    try:
+        if job.report_type == MEDIA_ARCHIVE:
+            _write_archive(job, on_progress)
+        else:
+            with tempfile.TemporaryFile() as fh:
+                build_report(job.report_type, fileobj=fh, progress=on_progress)
+                job.file.save(report_filename(job.report_type, timezone.localtime()), File(fh), save=False)
+        job.status = 'Completed'
+        job.progress = 100
+        job.error = ''
+    except Exception as e:
+        job.status = 'Failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.expires_at = job.finished_at + timedelta(hours=settings.REPORT_RETENTION_HOURS)
+    job.save()
+    return job
+
+
+def run_pending_jobs():
+    """Runs queued jobs until none are left. Returns how many were run."""
+    count = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
+
+
+def requeue_interrupted_jobs():
+    """
+    Jobs left Running by a worker that died (no heartbeat for REPORT_JOB_STALE_MINUTES)
+    are queued again. Jobs another live worker is running are left alone.
+    """
+    from .models import ReportJob
+
+    stale_before = timezone.now() - timedelta(minutes=settings.REPORT_JOB_STALE_MINUTES)
+    return ReportJob.objects.filter(status='Running', heartbeat_at__lt=stale_before).update(
+        status='Pending', progress=0, started_at=None, heartbeat_at=None,
+    )
+
+
+def purge_expired_reports():
+    """Deletes finished jobs (and their files) past their retention time."""
+    from .models import ReportJob
+
+    count = 0
+    for job in ReportJob.objects.filter(expires_at__lt=timezone.now()):
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
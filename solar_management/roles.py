@@ -0,0 +1,70 @@
+"""
+Per-request role resolution.
+
+The role checks (is_field_engineer, is_installer, ... in views.py, the
+@user_passes_test decorators, the templates) used to query the user's groups
+and profile every time; a dashboard hit ran the same lookups 5-8 times.
+user_roles() loads the groups and the profile role together in one query
+and keeps the result on the user object, which lives for one request.
+Templates get it as `roles` (see context_processors.roles).
+"""
+
+
+class Roles:
+    """Immutable snapshot of a user's groups, profile role and staff flags."""
+    __slots__ = ('groups', 'profile_role', 'is_staff', 'is_superuser')
+
+    def __init__(self, groups=(), profile_role='', is_staff=False, is_superuser=False):
+        object.__setattr__(self, 'groups', frozenset(groups))
+        object.__setattr__(self, 'profile_role', profile_role or '')
+        object.__setattr__(self, 'is_staff', is_staff)
+        object.__setattr__(self, 'is_superuser', is_superuser)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Roles is immutable')
+
+    def __repr__(self):
+        return f"<Roles groups={sorted(self.groups)} profile_role={self.profile_role!r} staff={self.is_staff}>"
+
+    @property
+    def field_engineer(self):
+        return 'Field_Engineers' in self.groups or self.is_staff
+
+    @property
+    def installer(self):
+        return 'Installers' in self.groups or self.is_staff
+
+    @property
+    def bank_user(self):
+        return 'Bank_Users' in self.groups or self.is_staff
+
+    @property
+    def office_staff(self):
+        return 'Office_Staff' in self.groups or self.profile_role == 'Admin' or self.is_staff
+
+    @property
+    def loan_officer(self):
+        return 'Loan_Officers' in self.groups or self.profile_role in ('Loan', 'Admin') or self.is_staff
+
+    @property
+    def admin(self):
+        return self.is_superuser or self.profile_role == 'Admin'
+
+
+ANONYMOUS_ROLES = Roles()
+
+
+def user_roles(user):
+    """The Roles of `user`, loaded with a single query the first time per request."""
+    if not user.is_authenticated:
+        return ANONYMOUS_ROLES
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        from django.contrib.auth.models import User
+
+        rows = User.objects.filter(pk=user.pk).values_list('groups__name', 'userprofile__role')
+        groups = {group for group, _ in rows if group}
+        profile_role = next((role for _, role in rows if role), '')
+        roles = Roles(groups, profile_role, user.is_staff, user.is_superuser)
+        user._roles = roles
+    return roles
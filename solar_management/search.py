@@ -0,0 +1,115 @@
+"""
+Indexed search for Customer Surveys.
+
+Every search box in the app (live search in base.html, and the `q` filter on the
+FE / Installer / Office / Admin dashboards) matches a survey by customer name,
+phone or SC number. A plain `icontains` becomes a leading-wildcard LIKE that
+MySQL cannot serve from an index, so instead we keep a small term table
+(`SurveySearchTerm`) holding every suffix of every normalized token.
+A substring match is then just a prefix match (`term LIKE 'abc%'`),
+which is an index range scan.
+"""
+import unicodedata
+
+from django.db import transaction
+
+# Longest term we store; anything typed beyond this is truncated before matching.
+MAX_TERM_LENGTH = 32
+
+
+def tokenize(text):
+    """
+    Lowercase `text` and split it into tokens of letters and digits, in any script.
+    Combining marks stay in their token: Telugu vowel signs (ి in రవి) are marks, not letters.
+    """
+    if not text:
+        return []
+    tokens, current = [], []
+    for char in unicodedata.normalize('NFC', str(text)).lower():
+        if char.isalnum() or (current and unicodedata.category(char).startswith('M')):
+            current.append(char)
+        elif current:
+            tokens.append(''.join(current))
+            current = []
+    if current:
+        tokens.append(''.join(current))
+    return tokens
+
+
+def build_terms(customer_name, aadhar_linked_phone, sc_no):
+    """
+    Returns the set of index terms for a survey.
+    Each token contributes all of its suffixes so that `startswith` on a term
+    behaves like the old `icontains` on the source column.
+    """
+    terms = set()
+    for value in (customer_name, aadhar_linked_phone, sc_no):
+        for token in tokenize(value):
+            for i in range(len(token)):
+                terms.add(token[i:i + MAX_TERM_LENGTH])
+    return terms
+
+
+def index_survey(survey):
+    """(Re)build the search terms for a single survey."""
+    from .models import SurveySearchTerm
+
+    terms = build_terms(survey.customer_name, survey.aadhar_linked_phone, survey.sc_no)
+    with transaction.atomic():
+        SurveySearchTerm.objects.filter(survey_id=survey.pk).delete()
+        SurveySearchTerm.objects.bulk_create(
+            [SurveySearchTerm(survey_id=survey.pk, term=t) for t in terms]
+        )
+
+
+def rebuild_index(batch_size=500):
+    """
+    Rebuild the whole index, `batch_size` surveys at a time. Each batch's terms
+    are replaced in one transaction, so searches keep finding every survey while
+    a rebuild runs, and a failed rebuild leaves the rest with their old terms.
+    Returns the number of surveys indexed.
+    """
+    from .models import CustomerSurvey, SurveySearchTerm
+
+    rows = CustomerSurvey.objects.order_by('pk').values_list('id', 'customer_name', 'aadhar_linked_phone', 'sc_no')
+    count, last_pk = 0, 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return count
+        ids = [pk for pk, _, _, _ in batch]
+        with transaction.atomic():
+            SurveySearchTerm.objects.filter(survey_id__in=ids).delete()
+            SurveySearchTerm.objects.bulk_create([
+                SurveySearchTerm(survey_id=pk, term=t)
+                for pk, name, phone, sc_no in batch for t in build_terms(name, phone, sc_no)
+            ], batch_size=1000)
+        count += len(batch)
+        last_pk = ids[-1]
+
+
+def search_surveys(query, queryset=None):
+    """
+    Filters `queryset` (default: all surveys) down to those matching `query`.
+    Every token of the query must match the start of some indexed term.
+    An empty query returns `queryset` unchanged, one without any letter or
+    digit (punctuation only) matches nothing.
+    """
+    from .models import CustomerSurvey, SurveySearchTerm
+
+    if queryset is None:
+        queryset = CustomerSurvey.objects.all()
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none() if query and query.strip() else queryset
+    for token in tokens:
+        matching = SurveySearchTerm.objects.filter(
+            term__startswith=token[:MAX_TERM_LENGTH]
+        ).values('survey_id')
+        queryset = queryset.filter(id__in=matching)
+    return queryset
+
+
+def search_survey_ids(query):
+    """Subquery of matching survey ids, for filtering related models (Installation, BankDetails)."""
+    return search_surveys(query).values('id')
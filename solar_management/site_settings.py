@@ -0,0 +1,68 @@
+"""
+Process-local cache of the SiteSettings singleton.
+
+MaintenanceModeMiddleware needs the settings on every request. Each worker
+keeps the row in memory instead of querying for it: it is reloaded when
+SITE_SETTINGS_CACHE_TTL runs out, or sooner when another worker saved it.
+Saving SiteSettings (toggle_maintenance_mode, the admin) bumps the mtime of
+SITE_SETTINGS_STAMP_FILE; workers stat that file at most once per
+SITE_SETTINGS_CHECK_INTERVAL, so a toggle reaches every gunicorn worker
+within about a second, at no database cost.
+"""
+import os
+import time
+
+from django.conf import settings
+
+_cached = None      # (site_settings, loaded_at, stamp)
+_checked_at = 0.0
+
+
+def _stamp():
+    try:
+        return os.stat(settings.SITE_SETTINGS_STAMP_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _load():
+    from .models import SiteSettings
+
+    # Plain read in the normal case; get_or_create only the very first time
+    return SiteSettings.objects.filter(pk=1).first() or SiteSettings.get_settings()
+
+
+def get_site_settings():
+    """The SiteSettings row, from this process's cache when it is still current."""
+    global _cached, _checked_at
+
+    now = time.monotonic()
+    if _cached is not None:
+        site_settings, loaded_at, stamp = _cached
+        if now - loaded_at < settings.SITE_SETTINGS_CACHE_TTL:
+            if now - _checked_at < settings.SITE_SETTINGS_CHECK_INTERVAL:
+                return site_settings
+            _checked_at = now
+            if _stamp() == stamp:
+                return site_settings
+
+    stamp = _stamp()  # read before loading, so a save during the load is not missed
+    site_settings = _load()
+    _cached = (site_settings, now, stamp)
+    _checked_at = now
+    return site_settings
+
+
+def invalidate_site_settings():
+    """Drops this process's copy and tells the other workers to reload theirs."""
+    global _cached
+    _cached = None
+
+    path = settings.SITE_SETTINGS_STAMP_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    previous = _stamp()
+    with open(path, 'a'):
+        pass
+    # Always move the mtime forward, even on filesystems with coarse timestamps
+    stamp = max(time.time_ns(), previous + 1_000_000_000)
+    os.utime(path, ns=(stamp, stamp))
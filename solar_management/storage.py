@@ -0,0 +1,383 @@
+"""
+Media storage accounting.
+
+Each CustomerSurvey carries denormalized `media_count` / `media_bytes` columns
+covering its legacy file fields, its Installation's file fields, its SurveyMedia
+rows and its InstallationPhoto rows, so the storage page can list projects with
+media without joining four tables. Signals (see models.py) keep them current: a
+media row added or removed applies its own count / size as a delta (one UPDATE),
+a newly filled file field adds its file, and only replacing or clearing a file
+field (or deleting an Installation) recomputes that one survey from disk.
+`backfill_media_stats` recomputes every survey.
+
+It also keeps a storage ledger (StoredFile / StorageUsage): every file written
+through LedgerFileSystemStorage is credited and every delete is debited, so the
+dashboards can show used storage without walking MEDIA_ROOT on each request.
+
+SurveyMedia / InstallationPhoto files go through ContentAddressedStorage: each
+distinct file is stored once under `blobs/<sha256 shards>/` and reference-counted
+(MediaBlob), so repeat uploads of the same Aadhar / PAN / bill scan cost nothing.
+"""
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import BigIntegerField, F, Sum
+from django.utils import timezone
+
+from .caching import bump_version
+
+# Legacy single-file fields on CustomerSurvey
+SURVEY_FILE_FIELDS = [
+    'roof_photo', 'pan_card_photo', 'aadhar_photo', 'current_bill_photo',
+    'bank_account_photo', 'parent_bank_photo', 'property_tax_photo',
+]
+
+# Legacy single-file fields on Installation
+INSTALLATION_FILE_FIELDS = [
+    'inverter_serial_photo', 'inverter_acdb_photo', 'panel_serial_photo', 'site_photos_with_customer',
+]
+
+
+def file_size(field_file):
+    """Size in bytes of a FieldFile, or 0 if it is empty or missing on disk."""
+    if not field_file:
+        return 0
+    try:
+        return field_file.storage.size(field_file.name)
+    except (OSError, ValueError, NotImplementedError):
+        return 0
+
+
+def iter_survey_files(survey):
+    """Yields every non-empty FieldFile that belongs to `survey`."""
+    from .models import Installation
+
+    for name in SURVEY_FILE_FIELDS:
+        f = getattr(survey, name)
+        if f:
+            yield f
+    for sm in survey.media_files.all():
+        if sm.file:
+            yield sm.file
+
+    installation = Installation.objects.filter(survey_id=survey.pk).first()
+    if installation:
+        for name in INSTALLATION_FILE_FIELDS:
+            f = getattr(installation, name)
+            if f:
+                yield f
+        for ip in installation.additional_photos.all():
+            if ip.photo:
+                yield ip.photo
+
+
+def compute_media_stats(survey):
+    """Returns (media_count, media_bytes) for `survey`, read from disk."""
+    count = 0
+    total = 0
+    for f in iter_survey_files(survey):
+        count += 1
+        total += file_size(f)
+    return count, total
+
+
+def media_row_size(instance):
+    """Stored size of a SurveyMedia / InstallationPhoto file (recorded on ingest, else read from disk)."""
+    from .thumbnails import source_file
+
+    if instance.stored_bytes is not None:
+        return instance.stored_bytes
+    return file_size(source_file(instance))
+
+
+def loaded_file_names(instance, field_names):
+    """{field: stored file name} of the file fields loaded on `instance` (deferred ones are skipped)."""
+    names = {}
+    for name in field_names:
+        if name in instance.__dict__:
+            value = instance.__dict__[name]
+            names[name] = getattr(value, 'name', value) or ''
+    return names
+
+
+def changed_file_fields(instance, field_names):
+    """
+    {field: name it had when loaded} for the file fields of `instance` that
+    now hold another file (a new upload, a replacement, or cleared).
+    """
+    original = getattr(instance, '_loaded_file_names', {})
+    changed = {}
+    for name, current in loaded_file_names(instance, field_names).items():
+        field_file = getattr(instance, name)
+        if current != original.get(name, '') or (field_file and not field_file._committed):
+            changed[name] = original.get(name, '')
+    return changed
+
+
+def add_media_stats(survey_filter, count, size):
+    """Adds `count` files / `size` bytes to the survey(s) matching `survey_filter`, in one UPDATE."""
+    from .models import CustomerSurvey
+
+    if not count and not size:
+        return
+    CustomerSurvey.objects.filter(**survey_filter).update(
+        media_count=F('media_count') + count, media_bytes=F('media_bytes') + size,
+    )
+    transaction.on_commit(lambda: bump_version(CustomerSurvey))
+
+
+def file_fields_saved(instance, field_names, survey_id, created=False):
+    """
+    post_save of a CustomerSurvey / Installation: books the file fields that changed.
+    Newly filled fields are added as a delta; a replaced or cleared file (its old
+    size may already be gone from disk) recomputes the survey.
+    """
+    if created:
+        changed = {name: '' for name in field_names if getattr(instance, name)}
+    else:
+        changed = changed_file_fields(instance, field_names)
+    if changed:
+        if any(changed.values()):
+            refresh_media_stats(survey_id)
+        else:
+            files = [getattr(instance, name) for name in changed if getattr(instance, name)]
+            add_media_stats({'pk': survey_id}, len(files), sum(file_size(f) for f in files))
+    instance._loaded_file_names = loaded_file_names(instance, field_names)
+
+
+def refresh_media_stats(survey_id):
+    """Recomputes and stores media_count / media_bytes for one survey (reads all its files' sizes)."""
+    from .models import CustomerSurvey
+
+    survey = CustomerSurvey.objects.filter(pk=survey_id).first()
+    if survey is None:
+        return  # Survey is being deleted (cascade); nothing to update
+    count, total = compute_media_stats(survey)
+    if count != survey.media_count or total != survey.media_bytes:
+        # .update() so that no post_save fires for the survey itself, hence the explicit cache bump
+        CustomerSurvey.objects.filter(pk=survey_id).update(media_count=count, media_bytes=total)
+        transaction.on_commit(lambda: bump_version(CustomerSurvey))
+
+
+# ------------------------------------------------------------------
+# Storage ledger: running total of bytes under MEDIA_ROOT
+# ------------------------------------------------------------------
+# Hard storage cap shown on the admin dashboard / storage page
+STORAGE_LIMIT_BYTES = 5 * 1024 * 1024 * 1024
+
+
+class LedgerFileSystemStorage(FileSystemStorage):
+    """
+    FileSystemStorage that books every saved file into the StoredFile ledger
+    and keeps StorageUsage totals up to date, so usage can be read in O(1)
+    instead of walking MEDIA_ROOT.
+    """
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        try:
+            size = self.size(name)
+        except OSError:
+            size = 0
+        record_file(name, size)
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        forget_file(name)
+
+
+class ContentAddressedStorage(LedgerFileSystemStorage):
+    """
+    Stores each distinct file once, named after its SHA-256:
+    `blobs/ab/cd/abcd...<ext>`. Saving a file that is already stored only adds a
+    reference; deleting drops one and unlinks the file with the last reference.
+    Files saved before deduplication (plain paths) are deleted as usual.
+
+    The MediaBlob row is the lock for its file. Dropping the last reference
+    leaves the row at ref_count 0; the file is unlinked once that commits, and
+    only if no save took the row back in the meantime (a rolled back delete
+    never touches the file).
+    """
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        digest, size = hash_content(content)
+        ext = os.path.splitext(name)[1].lower()[:10]
+        blob_name = f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+        with transaction.atomic():
+            blob, _ = MediaBlob.objects.select_for_update().get_or_create(
+                sha256=digest, defaults={'name': blob_name, 'size': size},
+            )
+            if not self.exists(blob.name):
+                self._write_blob(blob.name, content)
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        return blob.name
+
+    def _write_blob(self, name, content):
+        """
+        Writes `content` under a temporary name and renames it to `name`, so a
+        half-written blob is never visible and the hashed name needs no
+        get_available_name() (whoever renames last wrote the same bytes).
+        """
+        content.seek(0)
+        temp_name = FileSystemStorage._save(self, f"blobs/tmp/{uuid.uuid4().hex}", content)
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.path(temp_name), path)
+        record_file(name, self.size(name))
+
+    def delete(self, name):
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                super().delete(name)  # stored before deduplication
+                return
+            MediaBlob.objects.filter(pk=blob.pk, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+            if blob.ref_count <= 1:
+                transaction.on_commit(lambda: self._delete_if_unreferenced(name))
+
+    def _delete_if_unreferenced(self, name):
+        """After a commit that dropped the last reference: unlinks the file unless it was saved again since."""
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None or blob.ref_count > 0:
+                return
+            blob.delete()
+            super().delete(name)
+
+
+def hash_content(content):
+    """Returns (sha256 hex digest, size in bytes) of a File, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def dedup_savings():
+    """Bytes not written thanks to deduplication: every reference beyond the first of each blob."""
+    from .models import MediaBlob
+
+    totals = MediaBlob.objects.filter(ref_count__gt=1).aggregate(
+        saved=Sum((F('ref_count') - 1) * F('size'), output_field=BigIntegerField()),
+    )
+    return {'dedup_saved_bytes': totals['saved'] or 0}
+
+
+def record_file(name, size):
+    """Credits a newly written file to the ledger."""
+    from .models import StoredFile, StorageUsage
+
+    entry = StoredFile.objects.filter(name=name).first()
+    if entry is None:
+        StoredFile.objects.create(name=name, size=size)
+        delta_bytes, delta_count = size, 1
+    else:
+        # Overwrite of a name we already track
+        delta_bytes, delta_count = size - entry.size, 0
+        StoredFile.objects.filter(pk=entry.pk).update(size=size)
+    StorageUsage.objects.filter(pk=StorageUsage.get_usage().pk).update(
+        total_bytes=F('total_bytes') + delta_bytes, file_count=F('file_count') + delta_count,
+    )
+
+
+def forget_file(name):
+    """Debits a deleted file from the ledger."""
+    from .models import StoredFile, StorageUsage
+
+    entry = StoredFile.objects.filter(name=name).first()
+    if entry is None:
+        return
+    entry.delete()
+    StorageUsage.objects.filter(pk=StorageUsage.get_usage().pk).update(
+        total_bytes=F('total_bytes') - entry.size, file_count=F('file_count') - 1,
+    )
+
+
+def delete_stored_file(field_file):
+    """Removes a FieldFile from disk through its storage (so the ledger is debited)."""
+    if not field_file:
+        return
+    try:
+        field_file.storage.delete(field_file.name)
+    except Exception as e:
+        print(f"Error deleting file: {e}")
+
+
+def storage_usage_context():
+    """Template context for the storage usage widgets (admin dashboard, storage page)."""
+    from .models import StorageUsage
+
+    used_storage_bytes = max(0, StorageUsage.get_usage().total_bytes)
+    used_storage_gb = used_storage_bytes / (1024 * 1024 * 1024)
+    limit_gb = STORAGE_LIMIT_BYTES / (1024 * 1024 * 1024)
+    return {
+        'used_storage_gb': round(used_storage_gb, 2),
+        'remaining_storage_gb': round(max(0, limit_gb - used_storage_gb), 2),
+        'storage_percentage': round(min(100, (used_storage_bytes / STORAGE_LIMIT_BYTES) * 100), 1),
+    }
+
+
+def walk_media_root(media_root=None):
+    """Returns {relative name: size} for every regular file under MEDIA_ROOT."""
+    media_root = media_root or settings.MEDIA_ROOT
+    files = {}
+    if not media_root or not os.path.isdir(media_root):
+        return files
+    for dirpath, _, filenames in os.walk(media_root):
+        for f in filenames:
+            fp = os.path.join(dirpath, f)
+            # skip if it is symbolic link
+            if os.path.islink(fp):
+                continue
+            try:
+                size = os.path.getsize(fp)
+            except OSError:
+                continue
+            files[os.path.relpath(fp, media_root).replace(os.sep, '/')] = size
+    return files
+
+
+def reconcile_ledger(media_root=None):
+    """
+    Re-walks MEDIA_ROOT and corrects the ledger to match the disk.
+    Returns a dict with the number of entries added / removed / resized and the drift in bytes.
+    """
+    from .models import StoredFile, StorageUsage
+
+    on_disk = walk_media_root(media_root)
+    before = StorageUsage.get_usage().total_bytes
+
+    ledger = dict(StoredFile.objects.values_list('name', 'size'))
+    missing = [StoredFile(name=n, size=s) for n, s in on_disk.items() if n not in ledger]
+    stale = [n for n in ledger if n not in on_disk]
+    resized = [(n, s) for n, s in on_disk.items() if n in ledger and ledger[n] != s]
+
+    StoredFile.objects.bulk_create(missing, batch_size=1000)
+    for i in range(0, len(stale), 1000):
+        StoredFile.objects.filter(name__in=stale[i:i + 1000]).delete()
+    for n, s in resized:
+        StoredFile.objects.filter(name=n).update(size=s)
+
+    total = sum(on_disk.values())
+    StorageUsage.objects.filter(pk=StorageUsage.get_usage().pk).update(
+        total_bytes=total, file_count=len(on_disk), reconciled_at=timezone.now(),
+    )
+    return {
+        'added': len(missing),
+        'removed': len(stale),
+        'resized': len(resized),
+        'drift_bytes': total - before,
+    }
@@ -29,3 +29,14 @@ def sub(value, arg):
         return int(res) if res.is_integer() else round(res, 2)
     except (ValueError, TypeError):
         return 0
+
+@register.filter(name='sized_url')
+def sized_url(value, size='thumb'):
+    """
+    URL of a photo at a given size: "thumb", "medium" or "original".
+    Works on SurveyMedia / InstallationPhoto rows and on plain file fields
+    (which only have the original).
+    Usage: {{ media|sized_url:"thumb" }}
+    """
+    from solar_management.thumbnails import derivative_url
+    return derivative_url(value, size)
@@ -1,3 +1,808 @@
-from django.test import TestCase
+"""
+Run with:
+    python manage.py test solar_management --settings=wesolar_web.test_settings
+"""
+import importlib
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import exports
+from .ingest import ingest_savings
+from .models import (
+    BankDetails, CustomerSurvey, Enquiry, Installation, InstallationPhoto, MediaBlob, ReportJob, StagedUpload,
+    SurveyMedia, SurveySearchTerm, UploadStats, UserProfile,
+)
+from .pagination import KeysetPaginator
+from .query_plans import explain, plan_problems, query_shapes
+from .reports import claim_next_job, requeue_interrupted_jobs
+from .roles import user_roles
+from .search import rebuild_index, search_surveys, tokenize
+from .site_settings import get_site_settings
+from .storage import ContentAddressedStorage, compute_media_stats
+from .thumbnails import generate_derivatives
+from .uploads import record_upload_stats, upload_savings
+
+_phone_seq = iter(range(9000000000, 9999999999))
+
+
+def make_user(username, group=None, role=None, **kwargs):
+    """A user, optionally in `group` and with a UserProfile of `role`."""
+    user = User.objects.create_user(username, password='pass', **kwargs)
+    if group:
+        user.groups.add(Group.objects.get_or_create(name=group)[0])
+    if role:
+        UserProfile.objects.create(user=user, role=role, is_approved=True, mobile_number=str(next(_phone_seq)))
+    return user
+
+
+def make_survey(created_by=None, **fields):
+    values = dict(
+        customer_name='Ravi Kumar', aadhar_linked_phone='9876543210', sc_no='1234567890123456',
+        connection_type='Domestic', phase='Single Phase', feasibility_kw=3, aadhar_no='123412341234',
+        pan_card='ABCDE1234F', email='ravi@example.com', roof_type='Normal', structure_type='Normal',
+        structure_height=10, gps_coordinates='17.0,81.8', area='Kovvur', agreed_amount=100000,
+        created_by=created_by,
+    )
+    values.update(fields)
+    return CustomerSurvey.objects.create(**values)
+
+
+def upload(name='scan.pdf', size=100, fill=b'x'):
+    return SimpleUploadedFile(name, fill * size, content_type='application/pdf')
+
+
+def jpeg_upload(name='roof.jpg', width=1200, height=800):
+    import io
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(out, 'JPEG', quality=95)
+    return SimpleUploadedFile(name, out.getvalue(), content_type='image/jpeg')
+
+
+# ==========================================
+# SEARCH (search.py)
+# ==========================================
+class TokenizeTests(TestCase):
+    def test_ascii(self):
+        self.assertEqual(tokenize("O'Brien, Ravi-Kumar 98765"), ['o', 'brien', 'ravi', 'kumar', '98765'])
+
+    def test_telugu_keeps_vowel_signs(self):
+        self.assertEqual(tokenize('కుమార్ రవి'), ['కుమార్', 'రవి'])
+
+    def test_accents_and_punctuation(self):
+        self.assertEqual(tokenize('José_M.'), ['josé', 'm'])
+        self.assertEqual(tokenize('-- / --'), [])
+
+
+class SearchSurveysTests(TestCase):
+    def setUp(self):
+        self.ravi = make_survey(customer_name='Ravi Kumar', aadhar_linked_phone='9876543210', sc_no='1111222233334444')
+        self.telugu = make_survey(customer_name='రవి కుమార్', aadhar_linked_phone='9123456780', sc_no='5555666677778888')
+
+    def search(self, query):
+        return set(search_surveys(query).values_list('id', flat=True))
+
+    def test_substring_of_name_phone_and_sc_no(self):
+        self.assertEqual(self.search('avi'), {self.ravi.id})
+        self.assertEqual(self.search('4321'), {self.ravi.id})
+        self.assertEqual(self.search('66667777'), {self.telugu.id})
+
+    def test_every_token_must_match(self):
+        self.assertEqual(self.search('ravi 9876'), {self.ravi.id})
+        self.assertEqual(self.search('ravi 9123'), set())
+
+    def test_telugu_name(self):
+        self.assertEqual(self.search('రవి'), {self.telugu.id})
+        self.assertEqual(self.search('మార్'), {self.telugu.id})
+
+    def test_empty_and_punctuation_only_queries(self):
+        self.assertEqual(self.search(''), {self.ravi.id, self.telugu.id})
+        self.assertEqual(self.search('  '), {self.ravi.id, self.telugu.id})
+        self.assertEqual(self.search('?!'), set())
+
+    def test_index_follows_edits_and_deletes(self):
+        self.ravi.customer_name = 'Suresh'
+        self.ravi.save()
+        self.assertEqual(self.search('ravi'), set())
+        self.assertEqual(self.search('sures'), {self.ravi.id})
+        self.ravi.delete()
+        self.assertFalse(SurveySearchTerm.objects.filter(survey_id=self.ravi.id).exists())
+
+    def test_rebuild_index(self):
+        SurveySearchTerm.objects.all().delete()
+        self.assertEqual(rebuild_index(), 2)
+        self.assertEqual(self.search('రవి'), {self.telugu.id})
+        self.assertEqual(self.search('kumar'), {self.ravi.id})
+
+    def test_failed_rebuild_keeps_the_old_terms(self):
+        from unittest import mock
+
+        with mock.patch('solar_management.search.build_terms', side_effect=[{'ravi'}, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                rebuild_index(batch_size=1)
+        self.assertEqual(self.search('ravi'), {self.ravi.id})
+        self.assertEqual(self.search('రవి'), {self.telugu.id})
+
+
+class SearchBackfillMigrationTests(TestCase):
+    """The index backfills in migrations 0047 / 0060 (run against the current models)."""
+
+    def test_initial_backfill_and_unicode_reindex(self):
+        ravi = make_survey(customer_name='Ravi')
+        telugu = make_survey(customer_name='రవి')
+        SurveySearchTerm.objects.all().delete()
+
+        importlib.import_module('solar_management.migrations.0047_survey_search_index').build_search_index(apps, None)
+        self.assertEqual(set(search_surveys('ravi').values_list('id', flat=True)), {ravi.id})
+        self.assertFalse(search_surveys('రవి').exists())
+
+        importlib.import_module('solar_management.migrations.0060_search_terms_unicode').reindex_non_ascii(apps, None)
+        self.assertEqual(set(search_surveys('రవి').values_list('id', flat=True)), {telugu.id})
+        self.assertEqual(set(search_surveys('ravi').values_list('id', flat=True)), {ravi.id})
+
+
+# ==========================================
+# MEDIA TOTALS (media_count / media_bytes)
+# ==========================================
+class MediaStatsTests(TestCase):
+    def setUp(self):
+        self.survey = make_survey()
+
+    def stats(self):
+        self.survey.refresh_from_db(fields=['media_count', 'media_bytes'])
+        return self.survey.media_count, self.survey.media_bytes
+
+    def add_media(self, size, fill=b'x'):
+        return SurveyMedia.objects.create(survey=self.survey, media_type='aadhar', file=upload(size=size, fill=fill))
+
+    def test_media_rows_apply_deltas(self):
+        first = self.add_media(100, b'a')
+        self.add_media(250, b'b')
+        self.assertEqual(self.stats(), (2, 350))
+        first.delete()
+        self.assertEqual(self.stats(), (1, 250))
+        self.assertEqual(self.stats(), compute_media_stats(self.survey))
+
+    def test_adding_media_costs_the_same_for_the_tenth_file(self):
+        def queries_for_one_more(fill):
+            with CaptureQueriesContext(connection) as ctx:
+                self.add_media(10, fill)
+            return len(ctx)
+
+        self.add_media(10, b'0')  # creates the StorageUsage row
+        second = queries_for_one_more(b'1')
+        for i in range(2, 9):
+            self.add_media(10, bytes([ord('a') + i]))
+        self.assertEqual(queries_for_one_more(b'z'), second)
+        self.assertEqual(self.stats(), (10, 100))
+
+    def test_installation_photos(self):
+        installation = Installation.objects.create(survey=self.survey, inverter_make='Growatt')
+        photo = InstallationPhoto.objects.create(installation=installation, photo=upload('site.pdf', 40))
+        self.assertEqual(self.stats(), (1, 40))
+        photo.delete()
+        self.assertEqual(self.stats(), (0, 0))
+
+    def test_survey_file_fields(self):
+        self.survey.aadhar_photo = upload(size=30)
+        self.survey.save()
+        self.assertEqual(self.stats(), (1, 30))
+
+        survey = CustomerSurvey.objects.get(pk=self.survey.pk)
+        SurveyMedia.objects.create(survey=self.survey, media_type='roof', file=upload(size=20, fill=b'r'))
+        survey.office_remarks = 'checked'
+        with CaptureQueriesContext(connection) as ctx:
+            survey.save()  # must neither recompute nor write back its stale totals
+        self.assertFalse([q for q in ctx.captured_queries if 'media_count' in q['sql']])
+        self.assertEqual(self.stats(), (2, 50))
+
+        survey.aadhar_photo.delete(save=False)
+        survey.aadhar_photo = None
+        survey.save()
+        self.assertEqual(self.stats(), (1, 20))
+
+    def test_backfill_migration(self):
+        self.add_media(70)
+        self.survey.pan_card_photo = upload(size=5)
+        self.survey.save()
+        CustomerSurvey.objects.update(media_count=0, media_bytes=0)
+
+        importlib.import_module('solar_management.migrations.0061_backfill_media_stats').backfill_media_stats(apps, None)
+        self.assertEqual(self.stats(), (2, 75))
+
+
+# ==========================================
+# CONTENT-ADDRESSED MEDIA (storage.ContentAddressedStorage)
+# ==========================================
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.storage = ContentAddressedStorage()
+
+    def save(self, data=b'aadhar scan'):
+        return self.storage.save('surveys/media/scan.pdf', SimpleUploadedFile('scan.pdf', data))
+
+    def blob(self, name):
+        return MediaBlob.objects.filter(name=name).first()
+
+    def test_identical_files_share_one_blob(self):
+        first, second = self.save(), self.save()
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/'))
+        self.assertEqual(self.blob(first).ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertIsNone(self.blob(first))
+
+    def test_file_is_only_unlinked_after_commit(self):
+        name = self.save()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.storage.delete(name)
+            self.assertTrue(self.storage.exists(name))
+            raise RuntimeError('rolled back')
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.blob(name).ref_count, 1)
+
+    def test_saved_again_before_the_delete_commits(self):
+        name = self.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+            self.assertEqual(self.save(), name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.blob(name).ref_count, 1)
+
+    def test_blob_file_left_on_disk_without_its_row(self):
+        name = self.save(b'left over')
+        MediaBlob.objects.filter(name=name).delete()
+        self.assertEqual(self.save(b'left over'), name)
+        self.assertEqual(self.blob(name).ref_count, 1)
+        with self.storage.open(name) as fh:
+            self.assertEqual(fh.read(), b'left over')
+
+
+# ==========================================
+# UPLOAD INGEST (ingest.py)
+# ==========================================
+class IngestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.survey = make_survey()
+
+    def test_uploads_are_stored_untouched_by_default(self):
+        photo = jpeg_upload()
+        size = photo.size
+        media = SurveyMedia.objects.create(survey=self.survey, media_type='roof', file=photo)
+        self.assertEqual((media.original_bytes, media.stored_bytes), (size, size))
+        self.assertEqual(media.file.size, size)
+
+    @override_settings(IMAGE_INGEST_ENABLED=True, IMAGE_INGEST_MAX_DIMENSION=400)
+    def test_enabled_ingest_downscales_images_only(self):
+        media = SurveyMedia.objects.create(survey=self.survey, media_type='roof', file=jpeg_upload())
+        self.assertLess(media.stored_bytes, media.original_bytes)
+        from PIL import Image
+        with media.file.open('rb') as fh:
+            self.assertEqual(max(Image.open(fh).size), 400)
+
+        pdf = SurveyMedia.objects.create(survey=self.survey, media_type='aadhar', file=upload(size=50))
+        self.assertEqual((pdf.original_bytes, pdf.stored_bytes), (50, 50))
+
+    @override_settings(IMAGE_INGEST_ENABLED=True)
+    def test_unreadable_image_is_stored_as_is_and_logged(self):
+        with self.assertLogs('solar_management', 'ERROR') as logs:  # the thumbnails fail too
+            media = SurveyMedia.objects.create(survey=self.survey, media_type='roof',
+                                               file=upload('roof.jpg', size=60, fill=b'z'))
+        self.assertIn('ERROR:solar_management.ingest:Image ingest skipped for roof.jpg', logs.output[0])
+        self.assertEqual((media.original_bytes, media.stored_bytes), (60, 60))
+
+    @override_settings(IMAGE_INGEST_ENABLED=True, IMAGE_INGEST_MAX_DIMENSION=400)
+    def test_savings_are_cached_until_media_changes(self):
+        self.assertEqual(ingest_savings()['ingest_saved_bytes'], 0)
+        with self.assertNumQueries(0):
+            ingest_savings()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            media = SurveyMedia.objects.create(survey=self.survey, media_type='roof', file=jpeg_upload())
+        self.assertEqual(ingest_savings()['ingest_saved_bytes'], media.original_bytes - media.stored_bytes)
+
+
+# ==========================================
+# PHOTO DERIVATIVES (thumbnails.py)
+# ==========================================
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.survey = make_survey()
+
+    def test_images_get_derivatives_once(self):
+        media = SurveyMedia.objects.create(survey=self.survey, media_type='roof', file=jpeg_upload(width=2000))
+        media.refresh_from_db()
+        self.assertTrue(media.thumbnail and media.medium)
+        self.assertEqual(media.derived_from, media.file.name)
+        self.assertFalse(generate_derivatives(media))
+
+    def test_files_without_derivatives_are_not_retried(self):
+        from unittest import mock
+
+        pdf = SurveyMedia.objects.create(survey=self.survey, media_type='aadhar', file=upload())
+        with self.assertLogs('solar_management.thumbnails', 'ERROR'):
+            broken = SurveyMedia.objects.create(survey=self.survey, media_type='roof', file=upload('roof.jpg', fill=b'y'))
+        for media in (pdf, broken):
+            media.refresh_from_db()
+            self.assertFalse(media.thumbnail)
+            self.assertEqual(media.derived_from, media.file.name)
+
+        with mock.patch('solar_management.thumbnails.render_derivatives') as render:
+            call_command('generate_thumbnails', workers=1, stdout=io.StringIO())
+            self.assertFalse(generate_derivatives(broken))
+        render.assert_not_called()
+
+    def test_replaced_original_gets_new_derivatives(self):
+        media = SurveyMedia.objects.create(survey=self.survey, media_type='roof', file=jpeg_upload(width=2000))
+        media.refresh_from_db()
+        old_thumb = media.thumbnail.name
+
+        media.file = jpeg_upload('other.jpg', width=600, height=900)
+        media.save()
+        media.refresh_from_db()
+        self.assertEqual(media.derived_from, media.file.name)
+        self.assertNotEqual(media.thumbnail.name, old_thumb)
+        self.assertFalse(media.medium)  # the new original is already small
+
+        media.file = upload()
+        media.save()
+        media.refresh_from_db()
+        self.assertFalse(media.thumbnail)  # a PDF now: the photo's derivatives are gone
+
+
+# ==========================================
+# EXCEL EXPORTS (exports.py)
+# ==========================================
+class ExportQueryCountTests(TestCase):
+    """Every report is one SELECT per CHUNK_SIZE rows, read in keyset batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.engineer = make_user('fe', group='Field_Engineers', role='Field Engineer', first_name='Sita', last_name='Rao')
+        cls.installer = make_user('inst', group='Installers', role='Installer', first_name='Anil')
+
+    def add_projects(self, count):
+        for i in range(count):
+            survey = make_survey(self.engineer, customer_name=f'Customer {i}')
+            SurveyMedia.objects.create(survey=survey, media_type='property_tax', file=upload(fill=bytes([i % 250 + 1])))
+            Installation.objects.create(survey=survey, inverter_make='Growatt', updated_by=self.installer)
+            BankDetails.objects.create(survey=survey, parent_bank='SBI', parent_bank_ac_no='1', loan_applied_bank='SBI',
+                                       loan_applied_ifsc='SBIN0000001', loan_applied_ac_no='2')
+            Enquiry.objects.create(name=f'Caller {i}', mobile_number='9876543210', address='Kovvur')
+        make_survey(None, customer_name='No engineer')
+
+    def assert_one_query_per_report(self):
+        for report_type, (headers, rows, _) in exports.REPORTS.items():
+            with self.subTest(report_type=report_type), self.assertNumQueries(1):
+                data = [row for row in rows() if row]
+            for row in data:
+                self.assertEqual(len(row), len(headers), report_type)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_projects(2)
+        self.assert_one_query_per_report()
+        self.add_projects(10)
+        self.assert_one_query_per_report()
+
+    def test_batches_cover_every_row_in_order(self):
+        from unittest import mock
+
+        self.add_projects(6)
+        expected = {report_type: list(rows()) for report_type, (_, rows, _) in exports.REPORTS.items()}
+        with mock.patch.object(exports, 'CHUNK_SIZE', 4):
+            for report_type, (_, rows, _) in exports.REPORTS.items():
+                with self.subTest(report_type=report_type):
+                    self.assertEqual(list(rows()), expected[report_type])
+            with self.assertNumQueries(2):  # 7 surveys: a batch of 4, then the last 3
+                list(exports.master_rows())
+
+    def test_projected_values(self):
+        self.add_projects(1)
+        fe_rows = {row[0]: row for row in exports.field_engineer_rows()}
+        self.assertEqual(fe_rows['Customer 0'][12], 'Uploaded')
+        self.assertEqual(fe_rows['Customer 0'][-2], 'Sita Rao')
+        self.assertEqual(fe_rows['No engineer'][12], 'Not Uploaded')
+        self.assertEqual(fe_rows['No engineer'][-2], 'Unknown')
+
+        master = {row[0]: row for row in exports.master_rows()}
+        self.assertEqual(master['Customer 0'][36:38], ['SBI', '1'])
+        self.assertEqual(master['No engineer'][36:], [''] * 13)
+
+    def test_build_report_writes_every_row(self):
+        import openpyxl
+
+        self.add_projects(3)
+        with self.assertNumQueries(2):  # the rows, plus the count behind the progress percentage
+            fh = exports.build_report('master', progress=lambda percent: None)
+        sheet = openpyxl.load_workbook(fh, read_only=True).active
+        self.assertEqual(len(list(sheet.iter_rows())), 1 + CustomerSurvey.objects.count())
+
+
+# ==========================================
+# KEYSET PAGINATION (pagination.py)
+# ==========================================
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now()
+        for i in range(23):
+            survey = make_survey(customer_name=f'Customer {i}')
+            # Pairs of rows share a created_at, so the id has to break the tie
+            CustomerSurvey.objects.filter(pk=survey.pk).update(created_at=base - timedelta(minutes=i // 2))
+
+    def expected(self, *ordering):
+        return list(CustomerSurvey.objects.order_by(*ordering).values_list('id', flat=True))
+
+    def ids(self, page):
+        return [row['id'] if isinstance(row, dict) else row.id for row in page]
+
+    def walk(self, paginator, page):
+        """Pages from `page` to the end and back again, as lists of ids."""
+        forward = [self.ids(page)]
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            forward.append(self.ids(page))
+        backward = [self.ids(page)]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backward.append(self.ids(page))
+        return forward, backward
+
+    def test_next_and_previous_cursors_cover_every_row_once(self):
+        for ordering in (('-created_at', '-id'), ('created_at', 'id')):
+            with self.subTest(ordering=ordering):
+                paginator = KeysetPaginator(CustomerSurvey.objects.all(), 5, ordering)
+                first = paginator.page()
+                self.assertFalse(first.has_previous())
+                forward, backward = self.walk(paginator, first)
+
+                self.assertEqual([len(ids) for ids in forward], [5, 5, 5, 5, 3])
+                self.assertEqual(sum(forward, []), self.expected(*ordering))
+                self.assertEqual(backward, forward[::-1])
+
+    def test_values_rows(self):
+        paginator = KeysetPaginator(CustomerSurvey.objects.values('id', 'created_at'), 10)
+        forward, _ = self.walk(paginator, paginator.page())
+        self.assertEqual(sum(forward, []), self.expected('-created_at', '-id'))
+
+    def test_each_page_is_one_query(self):
+        paginator = KeysetPaginator(CustomerSurvey.objects.all(), 5)
+        cursor = paginator.page().next_cursor
+        with self.assertNumQueries(1):
+            list(paginator.page(cursor))
+
+    def test_total_is_capped(self):
+        qs = CustomerSurvey.objects.all()
+        self.assertIsNone(KeysetPaginator(qs, 5).page().total)
+        page = KeysetPaginator(qs, 5, total_limit=100).page()
+        self.assertEqual((page.total, page.total_capped), (23, False))
+        page = KeysetPaginator(qs, 5, total_limit=10).page()
+        self.assertEqual((page.total, page.total_capped), (10, True))
+
+    def test_bad_or_stale_cursor_gives_the_first_page(self):
+        paginator = KeysetPaginator(CustomerSurvey.objects.all(), 10)
+        first = paginator.page()
+        self.assertEqual(self.ids(paginator.page('not-a-cursor')), self.ids(first))
+
+        # The last page's rows are deleted before its cursor is followed
+        to_last = paginator.page(first.next_cursor).next_cursor
+        CustomerSurvey.objects.filter(pk__in=self.ids(paginator.page(to_last))).delete()
+        self.assertEqual(self.ids(paginator.page(to_last)), self.ids(first))
+
+
+# ==========================================
+# OFFICE DATA TABLES (datatables.py)
+# ==========================================
+class DataTableTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('boss', is_staff=True)
+        engineer = make_user('fe', first_name='Sita', last_name='Rao')
+        names = ['Ravi Kumar', 'Anil Varma', 'Sunita Devi', 'Kiran Babu', 'Lakshmi Rao', 'Gopal Reddy', 'Bhavani Sri']
+        for i, name in enumerate(names):
+            survey = make_survey(engineer, customer_name=name, sc_no=f'{i:016d}',
+                                 workflow_status='Completed' if i % 3 == 0 else 'Pending')
+            if i % 2 == 0:
+                Installation.objects.create(survey=survey, inverter_make=f'Make {i}')
+        Enquiry.objects.create(name='Ramesh', mobile_number='9876500001', address='Kovvur')
+        Enquiry.objects.create(name='Padma', mobile_number='9876500002', address='Nidadavole', email='padma@example.com')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def fetch(self, url_name, **params):
+        return self.client.get(reverse(url_name), dict(params, format='json')).json()
+
+    def fetch_all(self, url_name, **params):
+        """Every row, following the next cursors."""
+        data = self.fetch(url_name, **params)
+        rows = data['results']
+        while data['next']:
+            data = self.fetch(url_name, **dict(params, cursor=data['next']))
+            rows += data['results']
+        return rows
+
+    def test_columns_limits_the_payload(self):
+        data = self.fetch('office_fe_data', columns='customer_name,submitted_by,bogus')
+        self.assertEqual(data['total'], 7)
+        self.assertEqual(set(data['results'][0]), {'customer_name', 'submitted_by'})
+        self.assertEqual(data['results'][0]['submitted_by'], 'Sita Rao')
+        # Unknown names only: every column
+        self.assertIn('view_url', self.fetch('office_fe_data', columns='bogus')['results'][0])
+
+    def test_sort_in_both_directions_across_pages(self):
+        names = sorted(CustomerSurvey.objects.values_list('customer_name', flat=True))
+        for sort, expected in (('customer_name', names), ('-customer_name', names[::-1])):
+            with self.subTest(sort=sort):
+                rows = self.fetch_all('office_fe_data', sort=sort, per_page=3, columns='customer_name')
+                self.assertEqual([row['customer_name'] for row in rows], expected)
+
+    def test_unknown_sort_falls_back_to_the_default(self):
+        self.assertEqual(self.fetch('office_fe_data', sort='application_id')['sort'], '-created_at')
+        self.assertEqual(self.fetch('office_installer_data', sort='-nope')['sort'], '-timestamp')
+
+    def test_filter_and_search(self):
+        rows = self.fetch_all('office_fe_data', workflow_status='Completed', columns='customer_name,workflow_status')
+        self.assertEqual({row['workflow_status'] for row in rows}, {'Completed'})
+        self.assertEqual(len(rows), 3)
+
+        rows = self.fetch_all('office_fe_data', q='sunita', columns='customer_name')
+        self.assertEqual([row['customer_name'] for row in rows], ['Sunita Devi'])
+
+        rows = self.fetch_all('office_installer_data', q='ravi', columns='customer_name,inverter_make')
+        self.assertEqual(rows, [{'customer_name': 'Ravi Kumar', 'inverter_make': 'Make 0'}])
+
+        rows = self.fetch_all('enquiry_list', q='padma', columns='name,email')
+        self.assertEqual(rows, [{'name': 'Padma', 'email': 'padma@example.com'}])
+
+    def test_pages_cost_the_same_queries(self):
+        first = self.fetch('office_fe_data', per_page=3)
+        # session + user, the page and the capped count
+        with self.assertNumQueries(4):
+            self.client.get(reverse('office_fe_data'), {'format': 'json', 'per_page': 3, 'cursor': first['next']})
+
+
+# ==========================================
+# DASHBOARDS (roles.user_roles)
+# ==========================================
+class DashboardQueryCountTests(TestCase):
+    """The dashboards' query counts stay flat as surveys grow, and roles cost one query per request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.engineer = make_user('fe', group='Field_Engineers', role='Field Engineer')
+        cls.installer = make_user('inst', group='Installers', role='Installer')
+        cls.office = make_user('office', group='Office_Staff', role='Office')
+        cls.loan = make_user('loan', group='Loan_Officers', role='Loan')
+
+    def setUp(self):
+        cache.clear()
+        get_site_settings()  # cached after the first request of a process
+
+    def add_projects(self, count):
+        for i in range(count):
+            survey = make_survey(self.engineer, customer_name=f'Customer {i}', workflow_status='Approved')
+            SurveyMedia.objects.create(survey=survey, media_type='roof', file=upload(fill=bytes([i % 250 + 1])))
+            if i % 2:
+                installation = Installation.objects.create(survey=survey, inverter_make='Growatt', updated_by=self.installer)
+                InstallationPhoto.objects.create(installation=installation, photo_type='additional',
+                                                 photo=upload(fill=bytes([i % 250 + 2])))
+            BankDetails.objects.create(survey=survey, parent_bank='SBI', parent_bank_ac_no='1')
+        return survey
+
+    def assert_queries(self, user, url, expected):
+        self.client.force_login(user)
+        with self.subTest(url=url, user=user.username), self.assertNumQueries(expected) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        role_queries = [q for q in ctx.captured_queries if 'auth_user_groups' in q['sql']]
+        self.assertEqual(len(role_queries), 1, url)
+
+    def assert_pages(self, survey):
+        # session + user + roles, then the page's own queries
+        self.assert_queries(self.engineer, reverse('dashboard'), 4)
+        self.assert_queries(self.installer, reverse('dashboard'), 7)  # two tables, each counted and paged
+        self.assert_queries(self.office, reverse('office_dashboard'), 4)
+        self.assert_queries(self.loan, reverse('loan_dashboard'), 4)
+        self.assert_queries(self.engineer, reverse('site_detail', args=[survey.pk]), 7)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.assert_pages(self.add_projects(2))
+        self.assert_pages(self.add_projects(10))
+
+    def test_user_roles_is_one_query_per_request(self):
+        user = User.objects.get(pk=self.office.pk)
+        with self.assertNumQueries(1):
+            roles = user_roles(user)
+            self.assertTrue(user_roles(user).office_staff)
+        self.assertIs(user_roles(user), roles)
+        self.assertEqual(roles.groups, {'Office_Staff'})
+        self.assertEqual(roles.profile_role, 'Office')
+
+
+# ==========================================
+# QUERY PLANS (query_plans.py)
+# ==========================================
+class QueryPlanTests(TestCase):
+    """Every hot query is served by an index: no full scan, no separate sort step."""
+
+    def test_hot_queries_use_their_indexes(self):
+        for name, queryset in query_shapes():
+            with self.subTest(query=name):
+                self.assertEqual(plan_problems(explain(queryset)), [])
+
+    def test_a_missing_index_is_reported(self):
+        # customer_name has no index, so this sorts the whole table
+        queryset = CustomerSurvey.objects.order_by('customer_name')[:10]
+        self.assertNotEqual(plan_problems(explain(queryset)), [])
+
+
+# ==========================================
+# LOOKUP APIS
+# ==========================================
+class CustomerLookupTests(TestCase):
+    def test_customer_data_needs_a_login(self):
+        make_survey()
+        url = reverse('get_customer_data')
+        response = self.client.get(url, {'phone': '9876543210'})
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn(b'Ravi', response.content)
+
+        self.client.force_login(make_user('inst', group='Installers'))
+        self.assertEqual(self.client.get(url, {'phone': '+91 98765 43210'}).json()['customer_name'], 'Ravi Kumar')
+
+
+class PhoneDigitsMigrationTests(TestCase):
+    """The phone digits backfill in migration 0059 (run against the current models)."""
+
+    def test_backfill_normalizes_every_phone(self):
+        survey = make_survey(aadhar_linked_phone='09876543210', rp_phone_number='+91 91234 56780')
+        user = make_user('fe', role='Field Engineer')
+        UserProfile.objects.filter(user=user).update(mobile_number='+91-99887-76655', mobile_number_digits='')
+        CustomerSurvey.objects.filter(pk=survey.pk).update(aadhar_linked_phone_digits='', rp_phone_number_digits='')
+
+        importlib.import_module('solar_management.migrations.0059_phone_digits').backfill_phone_digits(apps, None)
+        survey.refresh_from_db()
+        self.assertEqual((survey.aadhar_linked_phone_digits, survey.rp_phone_number_digits), ('9876543210', '9123456780'))
+        self.assertEqual(UserProfile.objects.get(user=user).mobile_number_digits, '9988776655')
+
+
+# ==========================================
+# REPORT JOBS (reports.py)
+# ==========================================
+@override_settings(REPORT_JOB_STALE_MINUTES=10)
+class ReportJobQueueTests(TestCase):
+    def test_claim_sets_heartbeat(self):
+        ReportJob.objects.create(report_type='master')
+        job = claim_next_job()
+        self.assertEqual(job.status, 'Running')
+        self.assertIsNotNone(job.heartbeat_at)
+
+    def test_requeue_only_jobs_without_a_recent_heartbeat(self):
+        now = timezone.now()
+        live = ReportJob.objects.create(report_type='master', status='Running', started_at=now - timedelta(hours=1),
+                                        heartbeat_at=now - timedelta(minutes=1))
+        dead = ReportJob.objects.create(report_type='installer', status='Running', started_at=now - timedelta(hours=1),
+                                        heartbeat_at=now - timedelta(minutes=11), progress=40)
+
+        self.assertEqual(requeue_interrupted_jobs(), 1)
+        live.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual(live.status, 'Running')
+        self.assertEqual((dead.status, dead.progress, dead.heartbeat_at), ('Pending', 0, None))
+
+    def test_status_payload_carries_its_poll_url(self):
+        admin = make_user('boss', is_staff=True)
+        self.client.force_login(admin)
+        job = ReportJob.objects.create(report_type='master')
+        data = self.client.get(reverse('report_job_status', args=[job.pk])).json()
+        self.assertEqual(data['status_url'], reverse('report_job_status', args=[job.pk]))
+
+
+# ==========================================
+# CHUNKED UPLOADS (uploads.py)
+# ==========================================
+SURVEY_POST = dict(
+    customer_name='Ravi Kumar', connection_type='Domestic', sc_no='1234567890123456', phase='Single Phase',
+    contracted_load='3', feasibility_kw='3', aadhar_no='123412341234', pan_card='ABCDE1234F', email='ravi@example.com',
+    aadhar_linked_phone='9876543210', area='Kovvur', gps_coordinates='17.0,81.8', roof_type='Normal',
+    structure_type='Normal', structure_height='10', agreed_amount='100000', advance_paid='0', mefma_status='False',
+    registration_status='False', parent_bank='State Bank', parent_bank_ac_no='1234567890',
+)
+
+
+class StagedUploadFormTests(TestCase):
+    def setUp(self):
+        self.fe = make_user('fe', group='Field_Engineers')
+        self.client.force_login(self.fe)
+
+    def stage(self, name, data=b'%PDF-1.4 scan'):
+        """Sends `data` through the chunked upload endpoints, as chunked_upload.js does."""
+        upload_id = self.client.post(reverse('upload_start'), {'filename': name, 'size': len(data)}).json()['upload_id']
+        self.client.generic('PUT', reverse('upload_chunk', args=[upload_id]), data,
+                            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0')
+        self.assertTrue(self.client.post(reverse('upload_complete', args=[upload_id])).json()['complete'])
+        return upload_id
+
+    def test_new_survey_with_only_staged_photos(self):
+        post = dict(SURVEY_POST)
+        for field in ('roof_photo', 'pan_card_photo', 'aadhar_photo', 'current_bill_photo', 'property_tax_photo'):
+            post[f'{field}_upload_ids'] = [self.stage(f'{field}.pdf')]
+
+        response = self.client.post(reverse('create_survey'), post, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertEqual(response.json().get('errors'), None)
+        survey = CustomerSurvey.objects.get()
+        self.assertEqual(
+            sorted(SurveyMedia.objects.filter(survey=survey).values_list('media_type', flat=True)),
+            ['aadhar', 'current_bill', 'pan_card', 'property_tax', 'roof'],
+        )
+        self.assertFalse(StagedUpload.objects.exists())
+
+    def test_invalid_submit_keeps_staged_uploads(self):
+        post = dict(SURVEY_POST, roof_photo_upload_ids=[self.stage('roof.pdf')])
+
+        response = self.client.post(reverse('create_survey'), post, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        errors = response.json()['errors']
+        self.assertIn('pan_card_photo', errors)
+        self.assertNotIn('roof_photo', errors)
+        self.assertFalse(CustomerSurvey.objects.exists())
+        self.assertEqual(StagedUpload.objects.count(), 1)
+
+
+# ==========================================
+# UPLOAD COMPRESSION STATS (uploads.record_upload_stats)
+# ==========================================
+class UploadStatsTests(TestCase):
+    def setUp(self):
+        self.fe = make_user('fe')
+
+    def post(self, **data):
+        request = RequestFactory().post('/survey/new/', data)
+        request.user = self.fe
+        return request
+
+    def test_records_the_totals_sent_with_a_form(self):
+        request = self.post(upload_original_bytes='5000000', upload_sent_bytes='800000', upload_file_count='4')
+        stats = record_upload_stats(request, 'survey')
+        self.assertEqual(
+            (stats.user, stats.form_name, stats.file_count, stats.original_bytes, stats.sent_bytes),
+            (self.fe, 'survey', 4, 5000000, 800000),
+        )
+
+    def test_ignores_missing_or_bad_totals(self):
+        for data in ({}, {'upload_original_bytes': 'abc', 'upload_sent_bytes': '1'},
+                     {'upload_original_bytes': '0', 'upload_sent_bytes': '0'}):
+            self.assertIsNone(record_upload_stats(self.post(**data), 'survey'))
+        self.assertFalse(UploadStats.objects.exists())
+
+    def test_sent_never_exceeds_original(self):
+        stats = record_upload_stats(self.post(upload_original_bytes='1000', upload_sent_bytes='1500'), 'survey')
+        self.assertEqual(stats.sent_bytes, 1000)
+
+    def test_savings_sum_every_submission(self):
+        self.assertEqual(upload_savings(), {'client_original_bytes': 0, 'client_sent_bytes': 0, 'client_saved_bytes': 0})
+        UploadStats.objects.create(form_name='survey', original_bytes=5000, sent_bytes=1000)
+        UploadStats.objects.create(form_name='installation', original_bytes=3000, sent_bytes=3000)
+        self.assertEqual(upload_savings(), {
+            'client_original_bytes': 8000, 'client_sent_bytes': 4000, 'client_saved_bytes': 4000,
+        })
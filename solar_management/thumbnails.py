@@ -0,0 +1,136 @@
+"""
+Image derivatives for SurveyMedia / InstallationPhoto.
+
+Phones upload 4-12 MB originals, but pages show them as small tiles. When a
+photo is saved we render two derivatives with Pillow and record them on the
+row:
+
+    thumb   - fits THUMB_SIZE, for tiles and lists
+    medium  - fits MEDIUM_SIZE, for galleries
+    original - the uploaded file itself
+
+derivative_url(obj, size) (and the `sized_url` template filter) returns the
+best available URL for a size, falling back to the original when a derivative
+doesn't exist (PDFs, unreadable images, rows not backfilled yet).
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .caching import bump_version
+
+logger = logging.getLogger(__name__)
+
+SIZES = ('thumb', 'medium', 'original')
+THUMB_SIZE = (320, 320)
+MEDIUM_SIZE = (1280, 1280)
+JPEG_QUALITY = 82
+
+# Extensions Pillow can read here; everything else (PDF, HEIC, ...) keeps only its original
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+
+def source_file(obj):
+    """The original FieldFile of a SurveyMedia / InstallationPhoto."""
+    return obj.photo if hasattr(obj, 'photo') else obj.file
+
+
+def derivative_url(obj, size='thumb'):
+    """
+    URL of `obj` at `size` ('thumb', 'medium' or 'original').
+    `obj` may be a SurveyMedia, an InstallationPhoto or a plain FieldFile
+    (legacy single-file fields, which only have an original).
+    """
+    if obj is None:
+        return ''
+    if not hasattr(obj, 'thumbnail'):
+        return obj.url if obj else ''
+    if size == 'thumb' and obj.thumbnail:
+        return obj.thumbnail.url
+    if size in ('thumb', 'medium') and obj.medium:
+        return obj.medium.url
+    original = source_file(obj)
+    return original.url if original else ''
+
+
+def _to_jpeg(img):
+    if img.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        rgba = img.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        img = background
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def render_derivatives(fh):
+    """
+    Reads an image from `fh` and returns {'thumb': bytes, 'medium': bytes or None}.
+    `medium` is None when the original is already no larger than MEDIUM_SIZE.
+    """
+    img = Image.open(fh)
+    full_width, full_height = img.size
+    # JPEG only: let the decoder scale down by 1/2..1/8 while reading, far cheaper than a full decode
+    img.draft('RGB', MEDIUM_SIZE)
+    img = ImageOps.exif_transpose(img)
+
+    medium = None
+    if full_width > MEDIUM_SIZE[0] or full_height > MEDIUM_SIZE[1]:
+        img.thumbnail(MEDIUM_SIZE, Image.LANCZOS)
+        medium = _to_jpeg(img)
+    img.thumbnail(THUMB_SIZE, Image.LANCZOS)
+    return {'thumb': _to_jpeg(img), 'medium': medium}
+
+
+def generate_derivatives(obj, force=False):
+    """
+    Renders and stores the derivatives of one SurveyMedia / InstallationPhoto.
+    Skipped when `derived_from` shows they were already made from the current
+    original (unless `force`). An original that can't have any (PDF, unreadable
+    image) is recorded the same way so it isn't retried, and a replaced
+    original loses the derivatives of the old one.
+    Saved with .update() so no post_save fires again. Returns True if derivatives were written.
+    """
+    original = source_file(obj)
+    if not original:
+        return False
+    if obj.derived_from == original.name and not force:
+        return False
+
+    rendered = None
+    if os.path.splitext(original.name)[1].lower() in IMAGE_EXTENSIONS:
+        try:
+            with original.open('rb') as fh:
+                rendered = render_derivatives(fh)
+        except Exception:
+            logger.exception('Could not create thumbnails for %s', original.name)
+
+    changed = bool(rendered or obj.thumbnail or obj.medium)
+    delete_derivatives(obj)
+    if rendered:
+        base = os.path.splitext(os.path.basename(original.name))[0]
+        obj.thumbnail.save(f"{base}_thumb.jpg", ContentFile(rendered['thumb']), save=False)
+        if rendered['medium']:
+            obj.medium.save(f"{base}_medium.jpg", ContentFile(rendered['medium']), save=False)
+    obj.derived_from = original.name
+    type(obj).objects.filter(pk=obj.pk).update(
+        thumbnail=obj.thumbnail.name or None, medium=obj.medium.name or None, derived_from=obj.derived_from,
+    )
+    if changed:
+        transaction.on_commit(lambda: bump_version(type(obj)))
+    return bool(rendered)
+
+
+def delete_derivatives(obj):
+    """Removes the derivative files of `obj` from storage (the original is left alone)."""
+    from .storage import delete_stored_file
+
+    for field_file in (obj.thumbnail, obj.medium):
+        if field_file:
+            delete_stored_file(field_file)
+            field_file.name = None
@@ -0,0 +1,226 @@
+"""
+Resumable chunked uploads for the survey / installation forms.
+
+On a weak connection a single multipart POST carrying every photo fails as a
+whole. Instead the browser (static/js/chunked_upload.js) sends each file on
+its own, in chunks:
+
+    POST /uploads/                 {filename, size}     -> {upload_id, offset, chunk_size}
+    PUT  /uploads/<id>/            raw bytes, header Upload-Offset: <n>  -> {offset}
+    GET  /uploads/<id>/            -> {offset, size, complete}   (to resume)
+    POST /uploads/<id>/complete/   -> {complete: true}
+
+Chunks are appended to a staging file under UPLOAD_STAGING_ROOT; a chunk is
+only acknowledged once it is on disk, so an interrupted upload resumes from the
+last acknowledged offset. The final form POST carries `<field>_upload_ids`,
+which the views turn into files with StagedFiles. Uploads not used within
+UPLOAD_STAGING_TTL_HOURS are removed by purge_abandoned_uploads().
+"""
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+# How much of the request body is read at a time when writing a chunk
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or upload request that cannot be accepted."""
+
+
+def staging_path(upload):
+    return os.path.join(settings.UPLOAD_STAGING_ROOT, f"{upload.id}.part")
+
+
+def start_upload(user, filename, size):
+    """Creates a StagedUpload (and its empty staging file) for a file of `size` bytes."""
+    from .models import StagedUpload
+
+    filename = os.path.basename(filename or '').strip()[:255]
+    if not filename:
+        raise UploadError('A file name is required.')
+    if size < 0 or size > settings.UPLOAD_MAX_BYTES:
+        raise UploadError(f'Files must be under {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB.')
+    upload = StagedUpload.objects.create(user=user, filename=filename, size=size)
+    os.makedirs(settings.UPLOAD_STAGING_ROOT, exist_ok=True)
+    open(staging_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Appends `length` bytes read from `stream` at `offset`, which must equal the
+    bytes received so far (a resent chunk that was already stored is accepted as-is).
+    Returns the new offset.
+    """
+    from .models import StagedUpload
+
+    with transaction.atomic():
+        # Lock the row so a retried chunk can't race the original request
+        upload.received = StagedUpload.objects.select_for_update().values_list('received', flat=True).get(pk=upload.pk)
+        if upload.complete:
+            raise UploadError('Upload is already complete.')
+        if length > settings.UPLOAD_CHUNK_SIZE:
+            raise UploadError('Chunk is too large.')
+        if offset + length > upload.size:
+            raise UploadError('Chunk goes past the end of the file.')
+        if offset + length <= upload.received:
+            return upload.received  # Duplicate of a chunk we already have (ack was lost)
+        if offset != upload.received:
+            raise UploadError(f'Expected offset {upload.received}.')
+
+        written = 0
+        with open(staging_path(upload), 'r+b') as fh:
+            fh.seek(offset)
+            fh.truncate()  # drop any half-written tail of a failed chunk
+            while written < length:
+                data = stream.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                fh.write(data)
+                written += len(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        if written != length:
+            raise UploadError('Chunk was cut short.')
+
+        upload.received = offset + length
+        StagedUpload.objects.filter(pk=upload.pk).update(received=upload.received, updated_at=timezone.now())
+    return upload.received
+
+
+def complete_upload(upload):
+    """Marks an upload whose bytes have all arrived as ready to be attached to a form."""
+    from .models import StagedUpload
+
+    if upload.received != upload.size:
+        raise UploadError(f'Upload is incomplete ({upload.received} of {upload.size} bytes).')
+    upload.complete = True
+    StagedUpload.objects.filter(pk=upload.pk).update(complete=True, updated_at=timezone.now())
+    return upload
+
+
+def discard_upload(upload):
+    try:
+        os.remove(staging_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+class StagedFiles:
+    """
+    The completed uploads a form submit refers to, via `<field>_upload_ids` POST values.
+    They are merged into the form's files so required photo fields validate:
+        staged = StagedFiles(request)
+        form = SurveyForm(request.POST, staged.merged(request.FILES, SurveyForm.IMAGE_FIELDS))
+        if form.is_valid():
+            ...                 # files are in form.cleaned_data
+            staged.finish()     # after the media rows are saved
+        staged.close()          # an invalid submit keeps its uploads for the retry
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._used = []
+        self._handles = []
+
+    def files(self, field):
+        from .models import StagedUpload
+
+        ids = []
+        for value in self.request.POST.getlist(f'{field}_upload_ids'):
+            try:
+                ids.append(uuid.UUID(value))
+            except ValueError:
+                continue  # malformed id
+        if not ids:
+            return []
+        uploads = StagedUpload.objects.filter(id__in=ids, user=self.request.user, complete=True)
+        files = []
+        for upload in uploads:
+            try:
+                fh = open(staging_path(upload), 'rb')
+            except FileNotFoundError:
+                continue
+            self._handles.append(fh)
+            self._used.append(upload)
+            files.append(File(fh, name=upload.filename))
+        return files
+
+    def merged(self, files, fields):
+        """A copy of `files` (request.FILES) with each field's staged uploads appended."""
+        merged = files.copy()
+        for field in fields:
+            for f in self.files(field):
+                merged.appendlist(field, f)
+        return merged
+
+    def close(self):
+        """Closes the staged file handles; the uploads stay for another submit."""
+        for fh in self._handles:
+            fh.close()
+        self._handles = []
+
+    def finish(self):
+        """Closes and removes every staged file handed out by files()."""
+        self.close()
+        for upload in self._used:
+            discard_upload(upload)
+        self._used = []
+
+
+def record_upload_stats(request, form_name, user=None):
+    """
+    Stores the compression totals image_compress.js sends with a form
+    (upload_original_bytes / upload_sent_bytes / upload_file_count).
+    Returns the UploadStats row, or None when the submit carried no totals.
+    """
+    from .models import UploadStats
+
+    try:
+        original = int(request.POST.get('upload_original_bytes', ''))
+        sent = int(request.POST.get('upload_sent_bytes', ''))
+        count = int(request.POST.get('upload_file_count', 0))
+    except ValueError:
+        return None
+    if original <= 0 or sent < 0:
+        return None
+    if user is None and request.user.is_authenticated:
+        user = request.user
+    return UploadStats.objects.create(
+        user=user, form_name=form_name, file_count=max(count, 0),
+        original_bytes=original, sent_bytes=min(sent, original),
+    )
+
+
+def upload_savings():
+    """Bytes picked vs. bytes actually uploaded, over all recorded form submissions."""
+    from django.db.models import Sum
+    from .models import UploadStats
+
+    totals = UploadStats.objects.aggregate(original=Sum('original_bytes'), sent=Sum('sent_bytes'))
+    original = totals['original'] or 0
+    sent = totals['sent'] or 0
+    return {
+        'client_original_bytes': original,
+        'client_sent_bytes': sent,
+        'client_saved_bytes': max(0, original - sent),
+    }
+
+
+def purge_abandoned_uploads():
+    """Removes staged uploads untouched for UPLOAD_STAGING_TTL_HOURS. Returns how many were removed."""
+    from .models import StagedUpload
+
+    cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_STAGING_TTL_HOURS)
+    count = 0
+    for upload in StagedUpload.objects.filter(updated_at__lt=cutoff):
+        discard_upload(upload)
+        count += 1
+    return count
@@ -52,6 +52,14 @@ urlpatterns = [
     
     # Export & API
     path('export/csv/', views.export_solar_data, name='export_solar_data'),
+    path('reports/generate/', views.generate_report, name='generate_report'),
+    path('reports/<int:job_id>/status/', views.report_job_status, name='report_job_status'),
+    path('reports/<int:job_id>/download/', views.download_report, name='download_report'),
+
+    # Chunked (resumable) uploads
+    path('uploads/', views.upload_start, name='upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_complete, name='upload_complete'),
     path('api/get-customer-data/', views.get_customer_data, name='get_customer_data'),
     path('api/get-bank-details/', views.get_bank_details_by_phone, name='get_bank_details_by_phone'),
     path('api/get-survey-by-phone/', views.get_survey_by_phone, name='get_survey_by_phone'),
@@ -1,24 +1,38 @@
 import csv
-import io
-import re
 import openpyxl
 from openpyxl.styles import Font
 import sys
-import zipfile
 import os
-from datetime import datetime
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse, Http404
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import Group, User
 
-from .models import CustomerSurvey, Installation, BankDetails, UserProfile, Enquiry, SiteSettings, InstallationPhoto, SurveyMedia, ProfileMedia
+from .models import CustomerSurvey, Installation, BankDetails, UserProfile, Enquiry, SiteSettings, InstallationPhoto, SurveyMedia, ProfileMedia, ReportJob, StagedUpload
+from .search import search_surveys, search_survey_ids
+from .phones import phone_digits
+from .projections import (
+    BANK_DETAILS, OFFICE_SURVEY, OFFICE_SURVEY_RECORD, SURVEY_DETAIL, SURVEY_RECORD, sources,
+)
+from .storage import delete_stored_file, storage_usage_context, dedup_savings
+from .exports import build_report, report_filename, XLSX_CONTENT_TYPE
+from .reports import can_export, request_report, request_media_archive
+from .archives import stream_zip, survey_entries, clean_archive_params, MEDIA_ARCHIVE
+from .downloads import ranged_file_response
+from .media_access import media_owners, media_response
+from .site_settings import get_site_settings
+from .roles import user_roles
+from .caching import cache_json
+from .pagination import KeysetPaginator, DEFAULT_ORDERING
+from .datatables import SurveyTable, InstallationTable, EnquiryTable
+from .ingest import ingest_savings
+from .uploads import StagedFiles, UploadError, start_upload, append_chunk, complete_upload, record_upload_stats, upload_savings
 from .forms import SurveyForm, InstallationForm, BankDetailsForm, SignUpForm, LoginForm, EnquiryForm, OfficeStatusForm, FEUpdateForm, OfficeBankDetailsForm
 import json
 
@@ -80,9 +94,9 @@ def custom_login_view(request):
             # --- 1. Authenticate User ---
             # Try finding user by Profile first (Mobile -> User -> Auth)
             try:
-                profile = UserProfile.objects.select_related('user').get(mobile_number=mobile)
+                profile = UserProfile.objects.select_related('user').get(mobile_number_digits=phone_digits(mobile))
                 user = authenticate(username=profile.user.username, password=password)
-            except UserProfile.DoesNotExist:
+            except (UserProfile.DoesNotExist, UserProfile.MultipleObjectsReturned):
                 # Fallback: Try direct mobile auth (for Superusers/Office who might use mobile as username)
                 user = authenticate(username=mobile, password=password)
 
@@ -174,9 +188,9 @@ def admin_login_view(request):
 
             # 3. If not, try looking up via UserProfile (for regular Office staff)
             try:
-                profile = UserProfile.objects.select_related('user').get(mobile_number=mobile)
+                profile = UserProfile.objects.select_related('user').get(mobile_number_digits=phone_digits(mobile))
                 user = authenticate(username=profile.user.username, password=password)
-            except UserProfile.DoesNotExist:
+            except (UserProfile.DoesNotExist, UserProfile.MultipleObjectsReturned):
                 pass
                 
             if user:
@@ -225,6 +239,7 @@ def signup_view(request):
                 files = form.cleaned_data.get(field) or []
                 for f in files:
                     ProfileMedia.objects.create(profile=profile, file=f, media_type=m_type)
+            record_upload_stats(request, 'signup', user=user)
 
             # Send Email Notification
             subject = 'Welcome to WeSolar - Account Created'
@@ -302,20 +317,24 @@ def logout_view(request):
 # ==========================================
 # 0. ROLE CHECK HELPERS (Existing)
 # ==========================================
+# All of these read the per-request Roles snapshot (see roles.py): one query per request, not per check
 def is_field_engineer(user):
-    return user.groups.filter(name='Field_Engineers').exists() or user.is_staff
+    return user_roles(user).field_engineer
 
 def is_installer(user):
-    return user.groups.filter(name='Installers').exists() or user.is_staff
+    return user_roles(user).installer
 
 def is_bank_user(user):
-    return user.groups.filter(name='Bank_Users').exists() or user.is_staff
+    return user_roles(user).bank_user
 
 def is_office_staff(user):
-    return user.groups.filter(name='Office_Staff').exists() or (hasattr(user, 'userprofile') and user.userprofile.role == 'Admin') or user.is_staff
+    return user_roles(user).office_staff
 
 def is_loan_officer(user):
-    return user.groups.filter(name='Loan_Officers').exists() or (hasattr(user, 'userprofile') and user.userprofile.role == 'Loan') or (hasattr(user, 'userprofile') and user.userprofile.role == 'Admin') or user.is_staff
+    return user_roles(user).loan_officer
+
+def is_admin(user):
+    return user_roles(user).admin
 
 # ==========================================
 # 0.5 GLOBAL SEARCH
@@ -354,11 +373,7 @@ def api_global_search(request):
     
     # 1. Field Engineer (Own Surveys)
     if is_field_engineer(request.user):
-        surveys = CustomerSurvey.objects.filter(created_by=request.user).filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query) |
-            Q(sc_no__icontains=query)
-        )[:5]
+        surveys = search_surveys(query, CustomerSurvey.objects.filter(created_by=request.user))[:5]
         for s in surveys:
             results.append({
                 'title': s.customer_name,
@@ -369,11 +384,7 @@ def api_global_search(request):
 
     # 2. Installer (FE Data + Installer Data)
     elif is_installer(request.user):
-        surveys = CustomerSurvey.objects.filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query) |
-            Q(sc_no__icontains=query)
-        ).select_related('installation')[:8]
+        surveys = search_surveys(query).select_related('installation')[:8]
         
         for s in surveys:
             # Determine if this is "Installer Data" (Active/Completed) or "FE Data" (Pending Claim)
@@ -398,11 +409,7 @@ def api_global_search(request):
 
     # 3. Office Staff (All Surveys) - Default View
     elif is_office_staff(request.user):
-        surveys = CustomerSurvey.objects.filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query) |
-            Q(sc_no__icontains=query)
-        )[:5]
+        surveys = search_surveys(query)[:5]
         for s in surveys:
             results.append({
                 'title': s.customer_name,
@@ -413,11 +420,7 @@ def api_global_search(request):
 
     # 4. Loan Officer (All Surveys)
     elif is_loan_officer(request.user):
-        surveys = CustomerSurvey.objects.filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query) |
-            Q(sc_no__icontains=query)
-        )[:5]
+        surveys = search_surveys(query)[:5]
         for s in surveys:
             results.append({
                 'title': s.customer_name,
@@ -442,10 +445,7 @@ def api_global_search(request):
             })
             
         # B. FE Data (Surveys without installation or general lookup)
-        surveys = CustomerSurvey.objects.filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query)
-        ).select_related('installation')[:5]
+        surveys = search_surveys(query).select_related('installation', 'installation__updated_by', 'created_by')[:5]
         
         for s in surveys:
             has_install = hasattr(s, 'installation')
@@ -468,34 +468,27 @@ def api_global_search(request):
             
     return JsonResponse({'results': results})
 
+@login_required
 def get_bank_details_by_phone(request):
     """
     API to fetch bank details based on phone number.
-    Looks up CustomerSurvey by phone_number or aadhar_linked_phone.
-    Returns parent_bank and parent_bank_ac_no if found.
+    Looks up the most recent CustomerSurvey by aadhar_linked_phone (normalized).
+    Returns parent_bank and parent_bank_ac_no if found (`?fields=` to pick keys).
     """
     phone = request.GET.get('phone')
     if not phone:
         return JsonResponse({'error': 'Phone number required'}, status=400)
 
-    # Search in both phone fields
-    survey = CustomerSurvey.objects.filter(
-        Q(aadhar_linked_phone__icontains=phone)
-    ).order_by('-created_at').first() # Get most recent
+    selected = BANK_DETAILS.select(request.GET.get('fields'))
+    row = CustomerSurvey.objects.filter(
+        aadhar_linked_phone_digits=phone_digits(phone)
+    ).order_by('-created_at').values('bank_details__id', *sources(selected)).first() # Get most recent
 
-    if survey:
-        try:
-            bank_details = survey.bank_details
-            return JsonResponse({
-                'found': True,
-                'parent_bank': bank_details.parent_bank,
-                'parent_bank_ac_no': bank_details.parent_bank_ac_no,
-                'customer_name': survey.customer_name # Optional verification for user
-            })
-        except BankDetails.DoesNotExist:
-             return JsonResponse({'found': False, 'message': 'Survey found but no bank details linked.'})
-    
-    return JsonResponse({'found': False, 'message': 'No survey found with this phone number.'})
+    if row is None:
+        return JsonResponse({'found': False, 'message': 'No survey found with this phone number.'})
+    if row['bank_details__id'] is None:
+        return JsonResponse({'found': False, 'message': 'Survey found but no bank details linked.'})
+    return JsonResponse({'found': True, **BANK_DETAILS.serialize(row, selected)})
 
 
 # ==========================================
@@ -525,23 +518,39 @@ def master_dashboard(request):
     
     return redirect('login')
 
+def _survey_row(survey):
+    """Compact survey record for the JSON (infinite scroll) list variants."""
+    return {
+        'id': survey.id,
+        'application_id': survey.application_id,
+        'customer_name': survey.customer_name,
+        'sc_no': survey.sc_no,
+        'phone_number': survey.aadhar_linked_phone,
+        'workflow_status': survey.workflow_status,
+        'created_at': survey.created_at.isoformat(),
+        'media_count': survey.media_count,
+        'media_bytes': survey.media_bytes,
+        'url': reverse('site_detail', args=[survey.id]),
+    }
+
+def _keyset_json(request, queryset, per_page, ordering=DEFAULT_ORDERING):
+    """`?format=json&cursor=...` variant of a keyset-paginated survey list."""
+    page = KeysetPaginator(queryset, per_page, ordering, total_limit=1000).page(request.GET.get('cursor'))
+    return JsonResponse(page.to_json(_survey_row))
+
 @login_required
 @user_passes_test(is_field_engineer)
 def fe_dashboard(request):
     """Field Engineer: Only own records."""
     query = request.GET.get('q', '')
     if query:
-        my_surveys = CustomerSurvey.objects.filter(created_by=request.user).filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query) |
-            Q(sc_no__icontains=query)
-        ).order_by('-created_at')
+        my_surveys = search_surveys(query, CustomerSurvey.objects.filter(created_by=request.user))
     else:
-        my_surveys = CustomerSurvey.objects.filter(created_by=request.user).order_by('-created_at')
-    
-    paginator = Paginator(my_surveys, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        my_surveys = CustomerSurvey.objects.filter(created_by=request.user)
+
+    if request.GET.get('format') == 'json':
+        return _keyset_json(request, my_surveys, 10)
+    page_obj = KeysetPaginator(my_surveys, 10).page(request.GET.get('cursor'))
     
     return render(request, 'solar/fe_dashboard.html', {'surveys': page_obj, 'query': query})
 
@@ -552,27 +561,20 @@ def installer_dashboard(request):
     """Installer: View basic details of all surveys (uploaded by FE)."""
     # Spec: "installer can see the basic details in the table which was entered from the form(which the field engineer uploaded)"
     query = request.GET.get('q', '')
-    if query:
-        all_surveys = CustomerSurvey.objects.filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query) |
-            Q(sc_no__icontains=query)
-        ).select_related('installation').order_by('-created_at')
-    else:
-        all_surveys = CustomerSurvey.objects.all().select_related('installation').order_by('-created_at')
+    surveys = search_surveys(query) if query else CustomerSurvey.objects.all()
+
+    # Split and paginate in SQL, loading only the columns the tables show
+    surveys = surveys.annotate(
+        installed=Exists(Installation.objects.filter(survey_id=OuterRef('pk')))
+    ).only(
+        'id', 'application_id', 'customer_name', 'sc_no', 'phase', 'roof_type', 'created_at',
+    ).order_by('-created_at', '-id')
+
+    # Claimed/started installations
+    completed_installations = surveys.filter(installed=True)
+    # Only shown to installers after Office accepts
+    pending_installations = surveys.filter(installed=False, workflow_status='Approved')
 
-    
-    pending_installations = []
-    completed_installations = []
-    
-    for survey in all_surveys:
-        if hasattr(survey, 'installation'):
-            # It has been claimed/started.
-            completed_installations.append(survey)
-        elif survey.workflow_status == 'Approved':
-            # Only show to installer after Office accepts
-            pending_installations.append(survey)
-            
     pending_paginator = Paginator(pending_installations, 10)
     pending_page = request.GET.get('pending_page')
     pending_page_obj = pending_paginator.get_page(pending_page)
@@ -606,21 +608,6 @@ def pending_approvals(request):
     return render(request, 'solar/pending_approvals.html', context)
 
 
-def get_directory_size(directory):
-    """Returns the `directory` size in bytes."""
-    total_size = 0
-    try:
-        for dirpath, _, filenames in os.walk(directory):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                # skip if it is symbolic link
-                if not os.path.islink(fp):
-                    total_size += os.path.getsize(fp)
-    except Exception as e:
-        print(f"Error calculating directory size: {e}")
-    return total_size
-
-
 @staff_member_required
 def admin_dashboard(request):
     """
@@ -635,27 +622,19 @@ def admin_dashboard(request):
     if query:
         
         # 2. FE Data (All Surveys)
-        fe_data = CustomerSurvey.objects.filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query)
-        ).select_related('created_by').order_by('-created_at')
+        fe_data = search_surveys(query).select_related('created_by').order_by('-created_at')
         
         # 3. Installer Data (All Installations)
         installer_data = Installation.objects.filter(
-            Q(survey__customer_name__icontains=query) |
-            Q(survey__aadhar_linked_phone__icontains=query)
+            survey_id__in=search_survey_ids(query)
         ).select_related('survey', 'updated_by').order_by('-timestamp')
         
         # 4. Office Data (Surveys with Status Tracking)
-        office_data = CustomerSurvey.objects.filter(
-            Q(customer_name__icontains=query) |
-            Q(aadhar_linked_phone__icontains=query)
-        ).exclude(workflow_status='Pending').order_by('-created_at')[:5]
+        office_data = search_surveys(query).exclude(workflow_status='Pending').order_by('-created_at')[:5]
         
         # 5. Loan Data (Bank Details)
         loan_data = BankDetails.objects.filter(
-            Q(survey__customer_name__icontains=query) |
-            Q(survey__aadhar_linked_phone__icontains=query)
+            survey_id__in=search_survey_ids(query)
         ).select_related('survey').order_by('-id')[:5]
     else:
         
@@ -671,26 +650,16 @@ def admin_dashboard(request):
         # 5. Loan Data (Recent 5 loan applications)
         loan_data = BankDetails.objects.all().select_related('survey').order_by('-id')[:5]
     
-    # Calculate Storage Limit (5GB)
-    total_limit_bytes = 5 * 1024 * 1024 * 1024  # 5 GB in bytes
-    used_storage_bytes = get_directory_size(settings.MEDIA_ROOT)
-    
-    # Calculate percentages and readable formats
-    used_storage_gb = used_storage_bytes / (1024 * 1024 * 1024)
-    remaining_storage_gb = max(0, 5.0 - used_storage_gb)
-    storage_percentage = min(100, (used_storage_bytes / total_limit_bytes) * 100)
-
     context = {
         'fe_data': fe_data,
         'installer_data': installer_data,
         'office_data': office_data,
         'loan_data': loan_data,
         'query': query,
-        'used_storage_gb': round(used_storage_gb, 2),
-        'remaining_storage_gb': round(remaining_storage_gb, 2),
-        'storage_percentage': round(storage_percentage, 1),
-        'maintenance_mode': SiteSettings.get_settings().maintenance_mode,
+        'maintenance_mode': get_site_settings().maintenance_mode,
     }
+    # Storage usage comes from the ledger (O(1)), not a walk of MEDIA_ROOT
+    context.update(storage_usage_context())
     return render(request, 'solar/admin_dashboard.html', context)
 
 
@@ -700,70 +669,22 @@ def download_images(request, survey_id):
     Download all images for a given CustomerSurvey as a ZIP file.
     Includes roof_photo, and all installation photos if an installation exists.
     """
-    if not (request.user.is_superuser or request.user.is_staff or getattr(request.user.userprofile, 'role', '') in ['Admin', 'Office', 'Field Engineer']):
+    roles = user_roles(request.user)
+    if not (roles.is_superuser or roles.is_staff or roles.profile_role in ['Admin', 'Office', 'Field Engineer']):
         messages.error(request, 'You do not have permission to download these files.')
         return redirect('dashboard')
 
     survey = get_object_or_404(CustomerSurvey, pk=survey_id)
 
-    # Collect all (label, image_field) pairs
-    images = []
-
-    if survey.roof_photo:
-        images.append((f'roof_photo{os.path.splitext(survey.roof_photo.name)[1]}', survey.roof_photo))
-
-    # New Multi-file Uploads from SurveyMedia
-    for sm in survey.media_files.all():
-        if sm.file:
-            images.append((f"{sm.media_type}_{sm.id}{os.path.splitext(sm.file.name)[1]}", sm.file))
-
-    # Legacy Document photos uploaded by Field Engineer
-    if survey.pan_card_photo:
-        images.append((f'pan_card{os.path.splitext(survey.pan_card_photo.name)[1]}', survey.pan_card_photo))
-    if survey.aadhar_photo:
-        images.append((f'aadhar_card{os.path.splitext(survey.aadhar_photo.name)[1]}', survey.aadhar_photo))
-    if survey.current_bill_photo:
-        images.append((f'current_bill{os.path.splitext(survey.current_bill_photo.name)[1]}', survey.current_bill_photo))
-    if getattr(survey, 'bank_account_photo', None):
-        images.append((f'bank_account{os.path.splitext(survey.bank_account_photo.name)[1]}', survey.bank_account_photo))
-    if getattr(survey, 'parent_bank_photo', None):
-        images.append((f'parent_bank{os.path.splitext(survey.parent_bank_photo.name)[1]}', survey.parent_bank_photo))
-    if getattr(survey, 'property_tax_photo', None):
-        images.append((f'property_tax{os.path.splitext(survey.property_tax_photo.name)[1]}', survey.property_tax_photo))
-
-    if hasattr(survey, 'installation'):
-        inst = survey.installation
-        if inst.inverter_serial_photo:
-            images.append((f'inverter_serial{os.path.splitext(inst.inverter_serial_photo.name)[1]}', inst.inverter_serial_photo))
-        if inst.inverter_acdb_photo:
-            images.append((f'inverter_acdb{os.path.splitext(inst.inverter_acdb_photo.name)[1]}', inst.inverter_acdb_photo))
-        if inst.panel_serial_photo:
-            images.append((f'panel_serial{os.path.splitext(inst.panel_serial_photo.name)[1]}', inst.panel_serial_photo))
-        if inst.site_photos_with_customer:
-            images.append((f'site_with_customer{os.path.splitext(inst.site_photos_with_customer.name)[1]}', inst.site_photos_with_customer))
-            
-        # Additional single/multi photos
-        for add_photo in inst.additional_photos.all():
-            if add_photo.photo:
-                images.append((f"{add_photo.photo_type}_{add_photo.id}{os.path.splitext(add_photo.photo.name)[1]}", add_photo.photo))
+    images = survey_entries(survey)
 
     if not images:
         messages.warning(request, f'No images found for {survey.customer_name}.')
         return redirect('site_detail', pk=survey_id)
 
-    # Build ZIP in memory
-    buffer = io.BytesIO()
+    # Stream the ZIP as it is written; only one file chunk is in memory at a time
     safe_name = survey.customer_name.replace(' ', '_').replace('/', '-')
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for filename, image_field in images:
-            try:
-                with image_field.open('rb') as img_file:
-                    zf.writestr(filename, img_file.read())
-            except Exception:
-                pass  # Skip any files that can't be read
-
-    buffer.seek(0)
-    response = HttpResponse(buffer.read(), content_type='application/zip')
+    response = StreamingHttpResponse(stream_zip(images), content_type='application/zip')
     response['Content-Disposition'] = f'attachment; filename="{safe_name}_images.zip"'
     return response
 
@@ -778,17 +699,13 @@ def office_dashboard(request):
     """
     query = request.GET.get('q', '')
     if query:
-        surveys = CustomerSurvey.objects.filter(
-            Q(aadhar_linked_phone__icontains=query) | 
-            Q(customer_name__icontains=query) |
-            Q(sc_no__icontains=query)
-        ).select_related('installation').order_by('-created_at')
+        surveys = search_surveys(query).select_related('installation')
     else:
-        surveys = CustomerSurvey.objects.all().select_related('installation').order_by('-created_at')
-        
-    paginator = Paginator(surveys, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        surveys = CustomerSurvey.objects.all().select_related('installation')
+
+    if request.GET.get('format') == 'json':
+        return _keyset_json(request, surveys, 10)
+    page_obj = KeysetPaginator(surveys, 10).page(request.GET.get('cursor'))
         
     return render(request, 'solar/office_dashboard.html', {'surveys': page_obj, 'query': query})
 
@@ -852,54 +769,33 @@ def office_update_home(request):
 
 @login_required
 @user_passes_test(is_office_staff)
+@cache_json([CustomerSurvey])
 def get_survey_by_phone_all(request):
     """
     API Endpoint: Fetch ALL customer surveys by phone number (for Office use).
     Unlike the installer API, this does NOT filter out surveys with installations.
-    Returns JSON with matching survey(s) info.
+    Returns JSON with matching survey(s) info, in one query (`?fields=` to pick keys).
     """
     phone = request.GET.get('phone', '')
 
     if not phone:
         return JsonResponse({'found': False, 'message': 'Phone number is required.'})
 
-    surveys = CustomerSurvey.objects.filter(
-        Q(aadhar_linked_phone=phone)
-    ).order_by('-created_at')
+    single = OFFICE_SURVEY.select(request.GET.get('fields'))
+    record = OFFICE_SURVEY_RECORD.select(request.GET.get('fields'))
+    rows = list(CustomerSurvey.objects.filter(
+        aadhar_linked_phone_digits=phone_digits(phone)
+    ).order_by('-created_at').values(*sources(single, record)))
 
-    if not surveys.exists():
+    if not rows:
         return JsonResponse({'found': False, 'message': 'No customer found with this phone number.'})
 
-    if surveys.count() == 1:
-        survey = surveys.first()
-        return JsonResponse({
-            'found': True,
-            'count': 1,
-            'survey_id': survey.id,
-            'customer_name': survey.customer_name,
-            'sc_no': survey.sc_no,
-            'phase': survey.phase,
-            'area': survey.area or '',
-            'agreed_amount': str(survey.agreed_amount),
-            'workflow_status': survey.workflow_status,
-            'phone_number': survey.aadhar_linked_phone or '',
-        })
+    if len(rows) == 1:
+        return JsonResponse({'found': True, 'count': 1, **OFFICE_SURVEY.serialize(rows[0], single)})
 
     # Multiple surveys found — return list
-    records = []
-    for s in surveys:
-        records.append({
-            'id': s.id,
-            'customer_name': s.customer_name,
-            'sc_no': s.sc_no,
-            'phase': s.phase,
-            'area': s.area or '',
-            'agreed_amount': str(s.agreed_amount),
-            'workflow_status': s.workflow_status,
-            'created_at': s.created_at.strftime('%d %b %Y'),
-        })
-
-    return JsonResponse({'found': True, 'count': surveys.count(), 'records': records})
+    records = [OFFICE_SURVEY_RECORD.serialize(row, record) for row in rows]
+    return JsonResponse({'found': True, 'count': len(records), 'records': records})
 
 @login_required
 @user_passes_test(is_loan_officer)
@@ -921,10 +817,10 @@ def loan_dashboard(request):
         if site_id:
             customer = get_object_or_404(CustomerSurvey, pk=site_id)
         else:
-            # Search by Phone Number (including Aadhar linked as backup)
+            # Search by Phone Number (normalized, so "+91 98..." / "098..." match too)
             customer = CustomerSurvey.objects.filter(
-                Q(aadhar_linked_phone__icontains=query)
-            ).first()
+                aadhar_linked_phone_digits=phone_digits(query)
+            ).order_by('-created_at').first()
         
         if customer:
             # Fetch or Create Bank Details
@@ -948,7 +844,7 @@ def loan_dashboard(request):
             messages.error(request, "Customer not found with this phone number.")
     else:
         # Show recent customers if no query
-        recent_customers = list(CustomerSurvey.objects.all().order_by('-created_at')[:20])
+        recent_customers = list(CustomerSurvey.objects.select_related('bank_details').order_by('-created_at')[:20])
         for c in recent_customers:
             try:
                 # Accessing reverse one-to-one raises error if missing
@@ -968,7 +864,9 @@ def loan_dashboard(request):
 @user_passes_test(is_field_engineer)
 def survey_form_view(request):
     if request.method == 'POST':
-        form = SurveyForm(request.POST, request.FILES)
+        # Files come either in this POST or as chunked uploads referenced by id (see uploads.py)
+        staged = StagedFiles(request)
+        form = SurveyForm(request.POST, staged.merged(request.FILES, SurveyForm.IMAGE_FIELDS))
         bank_form = BankDetailsForm(request.POST) # Initialize Bank Form
         
         if form.is_valid() and bank_form.is_valid(): # Check both
@@ -994,9 +892,10 @@ def survey_form_view(request):
             }
             
             for field, m_type in media_map.items():
-                files = form.cleaned_data.get(field) or []
-                for f in files:
+                for f in form.cleaned_data.get(field) or []:
                     SurveyMedia.objects.create(survey=survey, file=f, media_type=m_type)
+            staged.finish()
+            record_upload_stats(request, 'survey')
 
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 messages.success(request, 'Survey and Bank Details submitted successfully!')
@@ -1005,6 +904,7 @@ def survey_form_view(request):
             messages.success(request, 'Survey and Bank Details submitted successfully!')
             return redirect('dashboard')
         else:
+            staged.close()
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 errors = {}
                 errors.update(form.errors)
@@ -1067,7 +967,9 @@ def new_installation(request):
                     return redirect('dashboard')
                 
                 # Process installation form
-                form = InstallationForm(request.POST, request.FILES)
+                # Files come either in this POST or as chunked uploads referenced by id (see uploads.py)
+                staged = StagedFiles(request)
+                form = InstallationForm(request.POST, staged.merged(request.FILES, InstallationForm.PHOTO_FIELDS))
                 if form.is_valid():
                     installation = form.save(commit=False)
                     installation.survey = survey
@@ -1093,9 +995,10 @@ def new_installation(request):
                     }
                     
                     for field, p_type in media_map.items():
-                        files = form.cleaned_data.get(field) or []
-                        for f in files:
+                        for f in form.cleaned_data.get(field) or []:
                             InstallationPhoto.objects.create(installation=installation, photo=f, photo_type=p_type)
+                    staged.finish()
+                    record_upload_stats(request, 'installation')
 
                     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                         messages.success(request, f"Installation submitted successfully for {survey.customer_name}!")
@@ -1104,6 +1007,7 @@ def new_installation(request):
                     messages.success(request, f"Installation submitted successfully for {survey.customer_name}!")
                     return redirect('dashboard')
                 else:
+                    staged.close()
                     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                         return JsonResponse({'success': False, 'errors': form.errors})
                         
@@ -1130,90 +1034,60 @@ def new_installation(request):
         'survey': survey
     })
 
+def _installer_surveys():
+    """Surveys annotated with whether they already have an installation (one EXISTS, no extra query)."""
+    return CustomerSurvey.objects.annotate(
+        installed=Exists(Installation.objects.filter(survey_id=OuterRef('pk')))
+    )
+
+@login_required
+@cache_json([CustomerSurvey, Installation])
 def get_survey_by_phone(request):
     """
     API Endpoint: Fetch customer survey details by phone number.
     Returns JSON with customer info for auto-fill.
-    Supports multiple surveys per phone number.
+    Supports multiple surveys per phone number; one query (`?fields=` to pick keys).
     """
     phone = request.GET.get('phone', '')
     
     if not phone:
         return JsonResponse({'found': False, 'message': 'Phone number is required.'})
     
-    # Query ALL surveys with this phone number (excluding those with installations)
-    surveys = CustomerSurvey.objects.filter(aadhar_linked_phone=phone).order_by('-created_at')
+    # Query ALL surveys with this phone number, flagged if they have an installation
+    single = SURVEY_DETAIL.select(request.GET.get('fields'))
+    record = SURVEY_RECORD.select(request.GET.get('fields'))
+    rows = list(_installer_surveys().filter(
+        aadhar_linked_phone_digits=phone_digits(phone)
+    ).order_by('-created_at').values('installed', 'workflow_status', *sources(single, record)))
     
-    if not surveys.exists():
+    if not rows:
         return JsonResponse({
             'found': False,
             'message': 'No customer found with this phone number.'
         })
     
     # Filter out surveys that already have installations AND must be Approved
-    available_surveys = [s for s in surveys if not hasattr(s, 'installation') and s.workflow_status == 'Approved']
+    available = [row for row in rows if not row['installed'] and row['workflow_status'] == 'Approved']
     
-    if not available_surveys:
+    if not available:
         return JsonResponse({
             'found': False,
             'message': 'All applications for this phone number already have installations completed.'
         })
     
     # If only one available survey, return it directly
-    if len(available_surveys) == 1:
-        survey = available_surveys[0]
-        return JsonResponse({
-            'found': True,
-            'count': 1,
-            'survey_id': survey.id,
-            'customer_name': survey.customer_name,
-            'connection_type': survey.connection_type,
-            'sc_no': survey.sc_no,
-            'phase': survey.phase,
-            'feasibility_kw': str(survey.feasibility_kw),
-            'aadhar_no': survey.aadhar_no,
-            'pan_card': survey.pan_card,
-            'email': survey.email,
-            'phone_number': survey.aadhar_linked_phone or '',
-            'area': survey.area,
-            'gps_coordinates': survey.gps_coordinates,
-            'roof_type': survey.roof_type,
-            'structure_type': survey.structure_type,
-            'structure_height': str(survey.structure_height),
-            'agreed_amount': str(survey.agreed_amount),
-            'advance_paid': str(survey.advance_paid) if survey.advance_paid else '0',
-            'mefma_status': 'Yes' if survey.mefma_status else 'No',
-            'rp_name': survey.rp_name or '',
-            'rp_phone_number': survey.rp_phone_number or '',
-            'fe_remarks': survey.fe_remarks or '',
-            'reference_name': survey.reference_name or '',
-            'pms_registration_number': survey.pms_registration_number or '',
-            'division': survey.division or '',
-            'registration_status': 'Yes' if survey.registration_status else 'No',
-        })
+    if len(available) == 1:
+        return JsonResponse({'found': True, 'count': 1, **SURVEY_DETAIL.serialize(available[0], single)})
     
     # Multiple surveys found - return list for selection
-    records = []
-    for survey in available_surveys:
-        records.append({
-            'id': survey.id,
-            'customer_name': survey.customer_name,
-            'sc_no': survey.sc_no,
-            'phase': survey.phase,
-            'area': survey.area,
-            'feasibility_kw': str(survey.feasibility_kw),
-            'agreed_amount': str(survey.agreed_amount),
-            'roof_type': survey.roof_type,
-            'connection_type': survey.connection_type,
-            'created_at': survey.created_at.strftime('%Y-%m-%d'),
-        })
-    
+    records = [SURVEY_RECORD.serialize(row, record) for row in available]
     return JsonResponse({
         'found': True,
         'count': len(records),
         'records': records
     })
 
+@login_required
 def get_survey_by_id(request):
     """
     API Endpoint: Fetch single survey details by ID.
@@ -1223,57 +1097,35 @@ def get_survey_by_id(request):
     
     if not survey_id:
         return JsonResponse({'found': False, 'message': 'Survey ID is required.'})
+    if not survey_id.isdigit():
+        return JsonResponse({'found': False, 'message': 'Survey not found.'})
     
-    try:
-        survey = CustomerSurvey.objects.get(id=survey_id)
-        
-        # Check if installation already exists
-        if hasattr(survey, 'installation'):
-            return JsonResponse({
-                'found': False,
-                'message': f'Installation already exists for this application.'
-            })
-            
-        if survey.workflow_status != 'Approved':
-            return JsonResponse({
-                'found': False,
-                'message': f'This application is pending Office approval and is not yet available for installation.'
-            })
-        
-        # Return full customer details
+    selected = SURVEY_DETAIL.select(request.GET.get('fields'))
+    row = _installer_surveys().filter(id=survey_id).values(
+        'installed', 'workflow_status', *sources(selected)
+    ).first()
+
+    if row is None:
         return JsonResponse({
-            'found': True,
-            'survey_id': survey.id,
-            'customer_name': survey.customer_name,
-            'connection_type': survey.connection_type,
-            'sc_no': survey.sc_no,
-            'phase': survey.phase,
-            'feasibility_kw': str(survey.feasibility_kw),
-            'aadhar_no': survey.aadhar_no,
-            'pan_card': survey.pan_card,
-            'email': survey.email,
-            'phone_number': survey.aadhar_linked_phone or '',
-            'area': survey.area,
-            'gps_coordinates': survey.gps_coordinates,
-            'roof_type': survey.roof_type,
-            'structure_type': survey.structure_type,
-            'structure_height': str(survey.structure_height),
-            'agreed_amount': str(survey.agreed_amount),
-            'advance_paid': str(survey.advance_paid) if survey.advance_paid else '0',
-            'mefma_status': 'Yes' if survey.mefma_status else 'No',
-            'rp_name': survey.rp_name or '',
-            'rp_phone_number': survey.rp_phone_number or '',
-            'fe_remarks': survey.fe_remarks or '',
-            'reference_name': survey.reference_name or '',
-            'pms_registration_number': survey.pms_registration_number or '',
-            'division': survey.division or '',
-            'registration_status': 'Yes' if survey.registration_status else 'No',
+            'found': False,
+            'message': 'Survey not found.'
         })
-    except CustomerSurvey.DoesNotExist:
+
+    # Check if installation already exists
+    if row['installed']:
         return JsonResponse({
             'found': False,
-            'message': 'Survey not found.'
+            'message': 'Installation already exists for this application.'
         })
+        
+    if row['workflow_status'] != 'Approved':
+        return JsonResponse({
+            'found': False,
+            'message': 'This application is pending Office approval and is not yet available for installation.'
+        })
+    
+    # Return full customer details
+    return JsonResponse({'found': True, **SURVEY_DETAIL.serialize(row, selected)})
 
 
 @login_required
@@ -1317,6 +1169,7 @@ def update_installation(request, pk):
                     InstallationPhoto.objects.filter(installation=inst, photo_type=p_type).delete()
                     for f in files:
                         InstallationPhoto.objects.create(installation=inst, photo=f, photo_type=p_type)
+            record_upload_stats(request, 'installation_update')
 
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 messages.success(request, f"Installation data updated for {survey.customer_name}.")
@@ -1388,6 +1241,31 @@ def site_detail(request, pk):
     context.update(_get_site_media_context(customer))
     return render(request, 'solar/site_detail.html', context)
 
+def _can_view_media(user, survey_ids, user_ids):
+    """Whether `user` may open a file belonging to these surveys / profile owners."""
+    if user.pk in user_ids:
+        return True
+    if is_office_staff(user) or is_loan_officer(user) or is_bank_user(user):
+        return bool(survey_ids or user_ids)
+    if not survey_ids:
+        return False
+    surveys = CustomerSurvey.objects.filter(pk__in=survey_ids)
+    if is_field_engineer(user) and surveys.filter(created_by=user).exists():
+        return True
+    # Installers work on approved surveys and the ones they have installed
+    if is_installer(user) and surveys.filter(Q(workflow_status='Approved') | Q(installation__isnull=False)).exists():
+        return True
+    return False
+
+@login_required
+def protected_media(request, path):
+    """Serves an uploaded file under MEDIA_URL after checking the requester may see its survey / profile."""
+    if not request.user.is_staff:
+        survey_ids, user_ids = media_owners(path)
+        if not _can_view_media(request.user, survey_ids, user_ids):
+            raise Http404('File not found')  # don't reveal whether the file exists
+    return media_response(request, path)
+
 @login_required
 def update_survey(request, pk):
     """Allow Field Engineers to update their own surveys."""
@@ -1405,7 +1283,9 @@ def update_survey(request, pk):
         bank_details = None
 
     if request.method == "POST":
-        form = SurveyForm(request.POST, request.FILES, instance=survey)
+        # Files come either in this POST or as chunked uploads referenced by id (see uploads.py)
+        staged = StagedFiles(request)
+        form = SurveyForm(request.POST, staged.merged(request.FILES, SurveyForm.IMAGE_FIELDS), instance=survey)
         bank_form = BankDetailsForm(request.POST, instance=bank_details)
         
         if form.is_valid() and bank_form.is_valid():
@@ -1434,6 +1314,8 @@ def update_survey(request, pk):
                     SurveyMedia.objects.filter(survey=survey, media_type=m_type).delete()
                     for f in files:
                         SurveyMedia.objects.create(survey=survey, file=f, media_type=m_type)
+            staged.finish()
+            record_upload_stats(request, 'survey_update')
             
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 messages.success(request, "Survey and Bank details updated.")
@@ -1441,6 +1323,7 @@ def update_survey(request, pk):
 
             messages.success(request, "Survey and Bank details updated.")
             return redirect('site_detail', pk=pk)
+        staged.close()
     else:
         form = SurveyForm(instance=survey)
         bank_form = BankDetailsForm(instance=bank_details)
@@ -1474,240 +1357,25 @@ def export_solar_data(request):
     """
     Export all details to Excel based on report type.
     Types: master (default), field_engineer, installer, material_dispatch, enquiries, users.
-    Office users may download: installer, material_dispatch.
+    Office users may download: installer, material_dispatch, enquiries.
     Staff/Admin may download all types.
+    The workbook is streamed to a spooled temp file (see exports.py), so memory stays flat.
     """
     try:
         report_type = request.GET.get('type', 'master')
 
         # Determine access
-        is_staff = request.user.is_staff
-        is_office = hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'Office'
-        office_allowed_types = {'installer', 'material_dispatch', 'enquiries'}
-
-        if not is_staff and not (is_office and report_type in office_allowed_types):
+        if not can_export(request.user, report_type):
             from django.http import HttpResponseForbidden
             return HttpResponseForbidden("You do not have permission to download this report.")
 
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
-
-        # Create Excel Workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"{report_type.title()} Report"
-
-        # Define Styles
-        header_font = Font(bold=True)
-
-        # 1. FIELD ENGINEER REPORT
-        if report_type == 'field_engineer':
-            headers = [
-                'Customer Name', 'SC No', 'Phone', 'Connection', 'Phase', 'Contracted Load (KW)', 'Feasibility KW',
-                'Aadhar No', 'PAN Card', 'Email', 'Aadhar Linked Phone', 'Bank Account No', 'Property Tax Photo',
-                'Roof Type', 'Structure Type', 'Structure Height', 'Floors', 'Area', 'GPS Coordinates',
-                'Agreed Amount', 'Advance Paid', 'MEFMA Status', 'RP Name', 'RP Phone',
-                'FE Remarks', 'Reference Name', 'PMS Registration Number', 'Division', 'Registration Status',
-                'Discom Status', 'Net Metering Status', 'Subsidy Status', 'Office Remarks',
-                'Workflow Status', 'Installation Date', 'Engineer', 'Date Created'
-            ]
-            ws.append(headers)
-            surveys = CustomerSurvey.objects.all().select_related('created_by').order_by('id').distinct()
-            for s in surveys:
-                ws.append([
-                    s.customer_name, s.sc_no, s.aadhar_linked_phone, s.connection_type, s.phase, s.contracted_load, s.feasibility_kw,
-                    s.aadhar_no, s.pan_card, s.email, s.aadhar_linked_phone, s.bank_account_no, 'Uploaded' if s.property_tax_photo or s.media_files.filter(media_type='property_tax').exists() else 'Not Uploaded',
-                    s.roof_type, s.structure_type, s.structure_height, s.floors if s.floors is not None else '', s.area, s.gps_coordinates,
-                    s.agreed_amount, s.advance_paid, 'Yes' if s.mefma_status else 'No', s.rp_name, s.rp_phone_number,
-                    s.fe_remarks, s.reference_name, s.pms_registration_number, s.division, 'Yes' if s.registration_status else 'No',
-                    s.discom_status, s.net_metering_status, s.subsidy_status, s.office_remarks,
-                    s.workflow_status, s.installation_date.strftime("%Y-%m-%d") if s.installation_date else '',
-                    s.created_by.get_full_name() if s.created_by else 'Unknown',
-                    s.created_at.strftime("%Y-%m-%d %H:%M")
-                ])
-
-        # 2. INSTALLER REPORT
-        elif report_type == 'installer':
-            headers = [
-                'Customer Name', 'SC No', 'Phone', 'Connection Type', 'Phase', 'Roof Type', 'Agreed Amount',
-                'Installer', 'Install Date', 'Inverter Make', 'Inverter Phase', 
-                'AC Cable (m)', 'DC Cable (m)', 'LA Cable (m)', 'Pipes (m)', 'Leftover Materials',
-                'DC Volt', 'AC Volt', 'Earth Resistance', 'Warranty Claimed', 'App Installed',
-                'Installer Remarks', 'Customer Remarks', 'Customer Rating', 'Status',
-                # Materials Dispatched
-                'Panels (Count)', 'Structure Kit', 'Inverter (kW)', 'Inverter Phase Type',
-                'AC Cable Red (m)', 'AC Cable Black (m)', 'DC Cable R&B (m)', 'LA Cable (m)',
-                'Pipes Count', 'Earthing Kit', 'ACDB', 'DCDB', 'MC4 Connectors',
-                'Long L Bands', 'Short L Bands', 'T Bands',
-                'Tapes Red', 'Tapes Black', 'Tags',
-                'Nail Clamps 2 Side', 'Nail Clamps 1 Side', 'Anchor Hardener',
-            ]
-            ws.append(headers)
-            installations = Installation.objects.all().select_related('survey', 'updated_by').order_by('id').distinct()
-            for i in installations:
-                sur = i.survey
-                ws.append([
-                    sur.customer_name, sur.sc_no, sur.aadhar_linked_phone, sur.connection_type, sur.phase, sur.roof_type, sur.agreed_amount,
-                    i.updated_by.get_full_name() if i.updated_by else 'Unknown',
-                    i.timestamp.strftime("%Y-%m-%d %H:%M"),
-                    i.inverter_make, i.inverter_phase, i.ac_cable_used, i.dc_cable_used,
-                    i.la_cable_used, i.pipes_used, i.leftover_materials, i.dc_voltage, i.ac_voltage, 
-                    i.earthing_resistance, 'Yes' if i.warranty_claimed else 'No', 'Yes' if i.app_installation_status else 'No',
-                    i.installer_remarks, i.customer_remarks, i.customer_rating,
-                    sur.workflow_status,
-                    # Materials Dispatched
-                    i.panels_count, i.structure_kit_type, i.inverter_kw, i.inverter_phase_type,
-                    i.ac_cable_red, i.ac_cable_black, i.dc_cable_red_black, i.la_cable_mtrs,
-                    i.pipes_count, i.earthing_kit_count, i.acdb_count, i.dcdb_count, i.mc4_connectors_count,
-                    i.long_l_bands_count, i.short_l_bands_count, i.t_bands_count,
-                    i.tapes_red_count, i.tapes_black_count, i.tags_count,
-                    i.nail_clamps_2side_count, i.nail_clamps_1side_count, i.anchor_hardener_count,
-                ])
-
-        # 3. ENQUIRIES REPORT
-        elif report_type == 'enquiries':
-            headers = ['Name', 'Mobile', 'Email', 'Address', 'Remarks', 'Date Received']
-            ws.append(headers)
-            enquiries = Enquiry.objects.all().order_by('-created_at')
-            for e in enquiries:
-                ws.append([
-                    e.name, e.mobile_number, e.email, e.address, e.remarks or '',
-                    e.created_at.strftime("%Y-%m-%d %H:%M")
-                ])
-
-        # 4. USERS REPORT
-        elif report_type == 'users':
-            headers = ['Username', 'Full Name', 'Mobile', 'Email', 'Role', 'Status', 'Date Joined']
-            ws.append(headers)
-            profiles = UserProfile.objects.all().select_related('user').order_by('-user__date_joined')
-            for p in profiles:
-                ws.append([
-                    p.user.username, p.user.get_full_name(), p.mobile_number, p.user.email,
-                    p.role, 'Approved' if p.is_approved else 'Pending',
-                    p.user.date_joined.strftime("%Y-%m-%d")
-                ])
-
-        # 5. MATERIAL DISPATCH REPORT
-        elif report_type == 'material_dispatch':
-            headers = [
-                'Customer Name', 'Mobile Number', 'SC Number',
-                'Item', 'Dispatched', 'Used', 'Difference',
-                'Installation Date', 'Installer Name',
-            ]
-            ws.append(headers)
-            installations = Installation.objects.all().select_related('survey', 'updated_by').order_by('survey__customer_name')
-            
-            def get_diff(disp, used):
-                try:
-                    return float(disp or 0) - float(used or 0)
-                except ValueError:
-                    return ''
-                    
-            for i in installations:
-                sur = i.survey
-                
-                def add_item_row(item_name, disp, used, is_text=False):
-                    if is_text:
-                        diff = ''
-                    else:
-                        diff = get_diff(disp, used)
-                    ws.append([
-                        sur.customer_name,
-                        sur.aadhar_linked_phone,
-                        sur.sc_no,
-                        item_name,
-                        disp,
-                        used,
-                        diff,
-                        i.timestamp.strftime("%Y-%m-%d %H:%M"),
-                        i.updated_by.get_full_name() if i.updated_by else 'Unknown',
-                    ])
-
-                add_item_row('Panels', i.panels_count, i.panels_used)
-                add_item_row('Structure Kit Type', i.structure_kit_type, i.structure_kit_used, is_text=True)
-                add_item_row('Inverter (kW)', i.inverter_kw, i.inverter_kw_used)
-                add_item_row('Inverter Phase Type', i.inverter_phase_type, i.inverter_phase_type_used, is_text=True)
-                add_item_row('AC Cable Red (m)', i.ac_cable_red, i.ac_cable_red_used)
-                add_item_row('AC Cable Black (m)', i.ac_cable_black, i.ac_cable_black_used)
-                add_item_row('DC Cable Red & Black (m)', i.dc_cable_red_black, i.dc_cable_red_black_used)
-                add_item_row('LA Cable (m)', i.la_cable_mtrs, i.la_cable_mtrs_used)
-                add_item_row('Pipes', i.pipes_count, i.pipes_count_used)
-                add_item_row('Earthing Kit', i.earthing_kit_count, i.earthing_kit_count_used)
-                add_item_row('ACDB', i.acdb_count, i.acdb_count_used)
-                add_item_row('DCDB', i.dcdb_count, i.dcdb_count_used)
-                add_item_row('MC4 Connectors', i.mc4_connectors_count, i.mc4_connectors_count_used)
-                add_item_row('Long L Bands', i.long_l_bands_count, i.long_l_bands_count_used)
-                add_item_row('Short L Bands', i.short_l_bands_count, i.short_l_bands_count_used)
-                add_item_row('T Bands', i.t_bands_count, i.t_bands_count_used)
-                add_item_row('Tapes Red', i.tapes_red_count, i.tapes_red_count_used)
-                add_item_row('Tapes Black', i.tapes_black_count, i.tapes_black_count_used)
-                add_item_row('Tags', i.tags_count, i.tags_count_used)
-                add_item_row('Nail Clamps 2 Side', i.nail_clamps_2side_count, i.nail_clamps_2side_count_used)
-                add_item_row('Nail Clamps 1 Side', i.nail_clamps_1side_count, i.nail_clamps_1side_count_used)
-                add_item_row('Anchor Hardener', i.anchor_hardener_count, i.anchor_hardener_count_used)
-                
-                # Blank row to separate customers for readability
-                ws.append([])
-
-        # 5. MASTER REPORT (Default) - ALL DATA FROM ALL TABLES
-        else:
-            headers = [
-                'Customer Name', 'SC No', 'Phone', 'Connection', 'Phase', 'Contracted Load (KW)', 'Feasibility KW',
-                'Aadhar No', 'PAN Card', 'Email', 'Aadhar Linked Phone', 'Bank Account No',
-                'Roof Type', 'Structure Type', 'Structure Height', 'Floors', 'Area', 'GPS Coordinates',
-                'Agreed Amount', 'Advance Paid', 'MEFMA Status', 'RP Name', 'RP Phone',
-                'FE Remarks', 'Reference Name', 'PMS Registration Number', 'Division', 'Registration Status',
-                'Discom Status', 'Net Metering Status', 'Subsidy Status', 'Office Remarks',
-                'Workflow Status', 'Installation Date', 'Field Engineer Name', 'Survey Date',
-                # Bank Details
-                'Parent Bank', 'Parent Bank A/C', 'Loan Applied Bank', 'Loan Applied IFSC', 'Loan Applied A/C',
-                'Manager Number', 'Loan Status', 'First Loan Amount', 'First Loan UTR', 'First Loan Date',
-                'Second Loan Amount', 'Second Loan UTR', 'Second Loan Date'
-            ]
-            ws.append(headers)
-            projects = CustomerSurvey.objects.all().select_related('created_by', 'installation', 'bank_details').order_by('id').distinct()
-            
-            for p in projects:
-                has_i = hasattr(p, 'installation')
-                has_b = hasattr(p, 'bank_details')
-                
-                row = [
-                    # FE / Survey Details
-                    p.customer_name, p.sc_no, p.aadhar_linked_phone, p.connection_type, p.phase, p.contracted_load, p.feasibility_kw,
-                    p.aadhar_no, p.pan_card, p.email, p.aadhar_linked_phone, p.bank_account_no,
-                    p.roof_type, p.structure_type, p.structure_height, p.floors if p.floors is not None else '', p.area, p.gps_coordinates,
-                    p.agreed_amount, p.advance_paid, 'Yes' if p.mefma_status else 'No', p.rp_name, p.rp_phone_number,
-                    p.fe_remarks, p.reference_name, p.pms_registration_number, p.division, 'Yes' if p.registration_status else 'No',
-                    p.discom_status, p.net_metering_status, p.subsidy_status, p.office_remarks,
-                    p.workflow_status, p.installation_date.strftime("%Y-%m-%d") if p.installation_date else '',
-                    p.created_by.get_full_name() if p.created_by else 'Unknown',
-                    p.created_at.strftime("%Y-%m-%d %I:%M %p"),
-                ]
-
-                # Bank Details
-                if has_b:
-                    row.extend([
-                        p.bank_details.parent_bank, p.bank_details.parent_bank_ac_no, p.bank_details.loan_applied_bank, p.bank_details.loan_applied_ifsc, p.bank_details.loan_applied_ac_no,
-                        p.bank_details.manager_number, p.bank_details.loan_pending_status, p.bank_details.first_loan_amount, p.bank_details.first_loan_utr, p.bank_details.first_loan_date.strftime("%Y-%m-%d") if p.bank_details.first_loan_date else '',
-                        p.bank_details.second_loan_amount, p.bank_details.second_loan_utr, p.bank_details.second_loan_date.strftime("%Y-%m-%d") if p.bank_details.second_loan_date else ''
-                    ])
-                else:
-                    row.extend([''] * 13) # 13 bank columns
-
-                ws.append(row)
-
-        # Style Header
-        for cell in ws[1]:
-            cell.font = header_font
-
-        # Create Response
-        filename = f"WeSolar_{report_type.title()}_Report_{timestamp}.xlsx"
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        report_file = build_report(report_type)
+        return FileResponse(
+            report_file,
+            as_attachment=True,
+            filename=report_filename(report_type),
+            content_type=XLSX_CONTENT_TYPE,
         )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        wb.save(response)
-        return response
 
     except Exception as e:
         import traceback
@@ -1715,18 +1383,137 @@ def export_solar_data(request):
         return HttpResponse(error_msg, content_type="text/plain", status=500)
 
 
+def _report_job_payload(job):
+    payload = {
+        'job_id': job.id,
+        'report_type': job.report_type,
+        'status': job.status,
+        'progress': job.progress,
+        'status_url': reverse('report_job_status', args=[job.id]),
+    }
+    if job.status == 'Completed' and job.file:
+        payload['download_url'] = reverse('download_report', args=[job.id])
+    if job.status == 'Failed':
+        payload['error'] = job.error
+    return payload
+
+@login_required
+def generate_report(request):
+    """
+    Queue a background Excel export (POST, type=<report type>) or bulk media
+    archive (type=media_archive, plus date_from / date_to / area / workflow_status / ids).
+    Returns the job as JSON; identical in-flight requests share one job.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    report_type = request.POST.get('type', 'master')
+    if not can_export(request.user, report_type):
+        return JsonResponse({'error': 'You do not have permission to download this report.'}, status=403)
+    if report_type == MEDIA_ARCHIVE:
+        try:
+            params = clean_archive_params(request.POST)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        job = request_media_archive(params, request.user)
+    else:
+        job = request_report(report_type, request.user)
+    return JsonResponse(_report_job_payload(job))
+
+@login_required
+def report_job_status(request, job_id):
+    """Poll endpoint for a report job's status and progress."""
+    job = get_object_or_404(ReportJob, pk=job_id)
+    if not can_export(request.user, job.report_type):
+        return JsonResponse({'error': 'You do not have permission to download this report.'}, status=403)
+    return JsonResponse(_report_job_payload(job))
+
+@login_required
+def download_report(request, job_id):
+    """Download the file of a completed report job (supports Range requests for resuming)."""
+    job = get_object_or_404(ReportJob, pk=job_id, status='Completed')
+    if not can_export(request.user, job.report_type):
+        from django.http import HttpResponseForbidden
+        return HttpResponseForbidden("You do not have permission to download this report.")
+    if not job.file:
+        from django.http import Http404
+        raise Http404("Report file has expired.")
+    content_type = 'application/zip' if job.report_type == MEDIA_ARCHIVE else XLSX_CONTENT_TYPE
+    return ranged_file_response(request, job.file, os.path.basename(job.file.name), content_type)
+
+
+# ==========================================
+# 6.5 CHUNKED UPLOADS (resumable, see uploads.py)
+# ==========================================
+def _upload_payload(upload):
+    return {
+        'upload_id': str(upload.id),
+        'offset': upload.received,
+        'size': upload.size,
+        'complete': upload.complete,
+        'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+    }
+
+@login_required
+def upload_start(request):
+    """Start a chunked upload (POST filename, size)."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        upload = start_upload(request.user, request.POST.get('filename'), int(request.POST.get('size', '')))
+    except (UploadError, ValueError) as e:
+        return JsonResponse({'error': str(e) or 'Invalid upload.'}, status=400)
+    return JsonResponse(_upload_payload(upload))
+
+@login_required
+def upload_chunk(request, upload_id):
+    """GET: how much of the upload has arrived (to resume). PUT: append a chunk at the Upload-Offset header."""
+    upload = get_object_or_404(StagedUpload, pk=upload_id, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(_upload_payload(upload))
+    if request.method != 'PUT':
+        return JsonResponse({'error': 'GET or PUT required'}, status=405)
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        append_chunk(upload, offset, request, length)
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset header required'}, status=400)
+    except UploadError as e:
+        payload = _upload_payload(upload)
+        payload['error'] = str(e)
+        return JsonResponse(payload, status=409)
+    return JsonResponse(_upload_payload(upload))
+
+@login_required
+def upload_complete(request, upload_id):
+    """Finish a chunked upload once every byte has arrived."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    upload = get_object_or_404(StagedUpload, pk=upload_id, user=request.user)
+    try:
+        complete_upload(upload)
+    except UploadError as e:
+        payload = _upload_payload(upload)
+        payload['error'] = str(e)
+        return JsonResponse(payload, status=409)
+    return JsonResponse(_upload_payload(upload))
+
+
 # ==========================================
 # 7. AJAX API (AUTO-FETCH)
 # ==========================================
+@login_required
 def get_customer_data(request):
     """API endpoint to auto-fill forms via phone number search."""
     phone = request.GET.get('phone', None)
     if not phone:
         return JsonResponse({'success': False, 'error': 'Phone required'}, status=400)
 
-    # Sanitize phone input (only digits)
-    clean_phone = re.sub(r'\D', '', phone)
-    
+    # Normalize the input the same way the stored numbers are (phones.py)
+    customer = CustomerSurvey.objects.filter(
+        aadhar_linked_phone_digits=phone_digits(phone)
+    ).order_by('-created_at').first()
+
     if customer:
         return JsonResponse({
             'success': True,
@@ -1760,6 +1547,7 @@ def update_profile(request):
                 files = form.cleaned_data.get(field) or []
                 for f in files:
                     ProfileMedia.objects.create(profile=profile, file=f, media_type=m_type)
+            record_upload_stats(request, 'profile')
 
             messages.success(request, 'Your profile has been updated successfully.')
             # Redirect back to the correct dashboard based on role
@@ -1801,8 +1589,9 @@ def create_enquiry(request):
 @staff_member_required
 def enquiry_list(request):
     """View to list all enquiries. Accessible by Admin only."""
-    enquiries = Enquiry.objects.all().order_by('-created_at')
-    return render(request, 'solar/enquiry_list.html', {'enquiries': enquiries})
+    if request.GET.get('format') == 'json':
+        return EnquiryTable().response(request)
+    return render(request, 'solar/enquiry_list.html')
 
 # ==========================================
 # 9. OFFICE PORTAL RESTRUCTURE
@@ -1811,14 +1600,18 @@ def enquiry_list(request):
 @staff_member_required
 def office_fe_data(request):
     """View to list all Field Engineer data (Customer Surveys). Read-only viewing but with Edit option."""
-    surveys = CustomerSurvey.objects.all().order_by('-created_at')
-    return render(request, 'solar/office_fe_data.html', {'surveys': surveys})
+    if request.GET.get('format') == 'json':
+        return SurveyTable().response(request)
+    return render(request, 'solar/office_fe_data.html', {
+        'status_choices': CustomerSurvey.WORKFLOW_STATUS_CHOICES,
+    })
 
 @staff_member_required
 def office_installer_data(request):
     """View to list all Installer data (Installations). Read-only viewing but with Edit option."""
-    installations = Installation.objects.all().select_related('survey').order_by('-timestamp')
-    return render(request, 'solar/office_installer_data.html', {'installations': installations})
+    if request.GET.get('format') == 'json':
+        return InstallationTable().response(request)
+    return render(request, 'solar/office_installer_data.html')
 
 @staff_member_required
 def office_workers_profiles(request):
@@ -1862,7 +1655,7 @@ def site_detail_installer_view(request, pk):
     context.update(_get_site_media_context(customer))
     return render(request, 'solar/site_detail.html', context)
 
-@user_passes_test(lambda u: u.is_superuser or (hasattr(u, 'userprofile') and u.userprofile.role == 'Admin'))
+@user_passes_test(is_admin)
 def delete_worker(request, user_id):
     """Delete a worker user. Admin only."""
     if request.method == 'POST':
@@ -1879,7 +1672,7 @@ def delete_worker(request, user_id):
     # If not POST, redirect back
     return redirect('office_workers_profiles')
 
-@user_passes_test(lambda u: u.is_superuser or (hasattr(u, 'userprofile') and u.userprofile.role == 'Admin'))
+@user_passes_test(is_admin)
 def set_worker_password(request, user_id):
     """Set/update a worker's password. Admin only. Updates both Django auth and plain_password."""
     if request.method == 'POST':
@@ -1896,7 +1689,7 @@ def set_worker_password(request, user_id):
             messages.error(request, "Password cannot be empty.")
     return redirect('office_workers_profiles')
 
-@user_passes_test(lambda u: u.is_superuser or (hasattr(u, 'userprofile') and u.userprofile.role == 'Admin'))
+@user_passes_test(is_admin)
 def delete_application(request, survey_id):
     """Delete a customer application. Admin only. Cascades to Installation and BankDetails."""
     if request.method == 'POST':
@@ -1960,48 +1753,21 @@ def manage_storage(request):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden('You do not have permission to access this page.')
 
-    try:
-        # Build list of surveys that have at least one media file
-        has_media = (
-            (~Q(roof_photo='') & ~Q(roof_photo__isnull=True)) |
-            (~Q(pan_card_photo='') & ~Q(pan_card_photo__isnull=True)) |
-            (~Q(aadhar_photo='') & ~Q(aadhar_photo__isnull=True)) |
-            (~Q(current_bill_photo='') & ~Q(current_bill_photo__isnull=True)) |
-            (~Q(bank_account_photo='') & ~Q(bank_account_photo__isnull=True)) |
-            (~Q(parent_bank_photo='') & ~Q(parent_bank_photo__isnull=True)) |
-            (~Q(installation__inverter_serial_photo='') & ~Q(installation__inverter_serial_photo__isnull=True)) |
-            (~Q(installation__inverter_acdb_photo='') & ~Q(installation__inverter_acdb_photo__isnull=True)) |
-            (~Q(installation__panel_serial_photo='') & ~Q(installation__panel_serial_photo__isnull=True)) |
-            (~Q(installation__site_photos_with_customer='') & ~Q(installation__site_photos_with_customer__isnull=True)) |
-            (~Q(media_files__isnull=True)) |
-            (~Q(installation__additional_photos__isnull=True))
-        )
-        surveys_with_media = CustomerSurvey.objects.filter(has_media).distinct().order_by('created_at')
-    except Exception:
-        surveys_with_media = CustomerSurvey.objects.none()
-
-    # Calculate overall stats — guard against missing media directory on server
-    total_limit_bytes = 5 * 1024 * 1024 * 1024
-    media_root = getattr(settings, 'MEDIA_ROOT', '')
-    if media_root and os.path.isdir(media_root):
-        used_storage_bytes = get_directory_size(media_root)
-    else:
-        used_storage_bytes = 0
-
-    used_storage_gb = used_storage_bytes / (1024 * 1024 * 1024)
-    remaining_storage_gb = max(0, 5.0 - used_storage_gb)
-    storage_percentage = min(100, (used_storage_bytes / total_limit_bytes) * 100)
+    # Surveys that have at least one media file, largest first (media_count / media_bytes are kept by signals)
+    surveys_with_media = CustomerSurvey.objects.filter(media_count__gt=0)
+    ordering = ('-media_bytes', 'id')
 
-    paginator = Paginator(surveys_with_media, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if request.GET.get('format') == 'json':
+        return _keyset_json(request, surveys_with_media, 20, ordering)
+    page_obj = KeysetPaginator(surveys_with_media, 20, ordering).page(request.GET.get('cursor'))
 
     context = {
         'surveys': page_obj,
-        'used_storage_gb': round(used_storage_gb, 2),
-        'remaining_storage_gb': round(remaining_storage_gb, 2),
-        'storage_percentage': round(storage_percentage, 1),
     }
+    context.update(storage_usage_context())
+    context.update(ingest_savings())
+    context.update(dedup_savings())
+    context.update(upload_savings())
     return render(request, 'solar/storage_management.html', context)
 
 @login_required
@@ -2010,20 +1776,14 @@ def delete_survey_media(request, survey_id):
     if request.method == 'POST':
         survey = get_object_or_404(CustomerSurvey, id=survey_id)
         
-        # Helper to safely delete file
-        def safe_delete_file(file_field):
-            if file_field and hasattr(file_field, 'path') and os.path.isfile(file_field.path):
-                try:
-                    os.remove(file_field.path)
-                except Exception as e:
-                    print(f"Error deleting file: {e}")
-
         # Delete from filesystem
-        safe_delete_file(survey.roof_photo)
-        safe_delete_file(survey.pan_card_photo)
-        safe_delete_file(survey.aadhar_photo)
-        safe_delete_file(survey.current_bill_photo)
-        safe_delete_file(survey.bank_account_photo)
+        delete_stored_file(survey.roof_photo)
+        delete_stored_file(survey.pan_card_photo)
+        delete_stored_file(survey.aadhar_photo)
+        delete_stored_file(survey.current_bill_photo)
+        delete_stored_file(survey.bank_account_photo)
+        delete_stored_file(survey.parent_bank_photo)
+        delete_stored_file(survey.property_tax_photo)
         
         # Nullify DB fields
         survey.roof_photo = None
@@ -2031,20 +1791,21 @@ def delete_survey_media(request, survey_id):
         survey.aadhar_photo = None
         survey.current_bill_photo = None
         survey.bank_account_photo = None
+        survey.parent_bank_photo = None
+        survey.property_tax_photo = None
         survey.save()
         
-        # Delete related SurveyMedia
+        # Delete related SurveyMedia (their files are released by the post_delete signal)
         for sm in survey.media_files.all():
-            safe_delete_file(sm.file)
             sm.delete()
         
         # Do the same for Installation if exists
         try:
             inst = survey.installation
-            safe_delete_file(inst.inverter_serial_photo)
-            safe_delete_file(inst.inverter_acdb_photo)
-            safe_delete_file(inst.panel_serial_photo)
-            safe_delete_file(inst.site_photos_with_customer)
+            delete_stored_file(inst.inverter_serial_photo)
+            delete_stored_file(inst.inverter_acdb_photo)
+            delete_stored_file(inst.panel_serial_photo)
+            delete_stored_file(inst.site_photos_with_customer)
             
             inst.inverter_serial_photo = None
             inst.inverter_acdb_photo = None
@@ -2052,9 +1813,8 @@ def delete_survey_media(request, survey_id):
             inst.site_photos_with_customer = None
             inst.save()
             
-            # Delete related InstallationPhoto
+            # Delete related InstallationPhoto (their files are released by the post_delete signal)
             for ip in inst.additional_photos.all():
-                safe_delete_file(ip.photo)
                 ip.delete()
         except CustomerSurvey.installation.RelatedObjectDoesNotExist:
             pass
@@ -2068,38 +1828,18 @@ def delete_survey_media(request, survey_id):
 def delete_all_media(request):
     """Deletes media files for ALL projects to free space."""
     if request.method == 'POST':
-        # Helper to safely delete file
-        def safe_delete_file(file_field):
-            if file_field and hasattr(file_field, 'path') and os.path.isfile(file_field.path):
-                try:
-                    os.remove(file_field.path)
-                except Exception as e:
-                    print(f"Error deleting file: {e}")
-
-        has_media = (
-            (~Q(roof_photo='') & ~Q(roof_photo__isnull=True)) |
-            (~Q(pan_card_photo='') & ~Q(pan_card_photo__isnull=True)) |
-            (~Q(aadhar_photo='') & ~Q(aadhar_photo__isnull=True)) |
-            (~Q(current_bill_photo='') & ~Q(current_bill_photo__isnull=True)) |
-            (~Q(bank_account_photo='') & ~Q(bank_account_photo__isnull=True)) |
-            (~Q(parent_bank_photo='') & ~Q(parent_bank_photo__isnull=True)) |
-            (~Q(installation__inverter_serial_photo='') & ~Q(installation__inverter_serial_photo__isnull=True)) |
-            (~Q(installation__inverter_acdb_photo='') & ~Q(installation__inverter_acdb_photo__isnull=True)) |
-            (~Q(installation__panel_serial_photo='') & ~Q(installation__panel_serial_photo__isnull=True)) |
-            (~Q(installation__site_photos_with_customer='') & ~Q(installation__site_photos_with_customer__isnull=True)) |
-            (~Q(media_files__isnull=True)) |
-            (~Q(installation__additional_photos__isnull=True))
-        )
-        surveys_with_media = CustomerSurvey.objects.filter(has_media).distinct()
+        surveys_with_media = CustomerSurvey.objects.filter(media_count__gt=0)
         
         count = 0
         for survey in surveys_with_media:
             # Delete from filesystem
-            safe_delete_file(survey.roof_photo)
-            safe_delete_file(survey.pan_card_photo)
-            safe_delete_file(survey.aadhar_photo)
-            safe_delete_file(survey.current_bill_photo)
-            safe_delete_file(survey.bank_account_photo)
+            delete_stored_file(survey.roof_photo)
+            delete_stored_file(survey.pan_card_photo)
+            delete_stored_file(survey.aadhar_photo)
+            delete_stored_file(survey.current_bill_photo)
+            delete_stored_file(survey.bank_account_photo)
+            delete_stored_file(survey.parent_bank_photo)
+            delete_stored_file(survey.property_tax_photo)
             
             # Nullify DB fields
             survey.roof_photo = None
@@ -2107,20 +1847,21 @@ def delete_all_media(request):
             survey.aadhar_photo = None
             survey.current_bill_photo = None
             survey.bank_account_photo = None
+            survey.parent_bank_photo = None
+            survey.property_tax_photo = None
             survey.save()
             
-            # Delete related SurveyMedia
+            # Delete related SurveyMedia (their files are released by the post_delete signal)
             for sm in survey.media_files.all():
-                safe_delete_file(sm.file)
                 sm.delete()
             
             # Do the same for Installation if exists
             try:
                 inst = survey.installation
-                safe_delete_file(inst.inverter_serial_photo)
-                safe_delete_file(inst.inverter_acdb_photo)
-                safe_delete_file(inst.panel_serial_photo)
-                safe_delete_file(inst.site_photos_with_customer)
+                delete_stored_file(inst.inverter_serial_photo)
+                delete_stored_file(inst.inverter_acdb_photo)
+                delete_stored_file(inst.panel_serial_photo)
+                delete_stored_file(inst.site_photos_with_customer)
                 
                 inst.inverter_serial_photo = None
                 inst.inverter_acdb_photo = None
@@ -2128,9 +1869,8 @@ def delete_all_media(request):
                 inst.site_photos_with_customer = None
                 inst.save()
                 
-                # Delete related InstallationPhoto
+                # Delete related InstallationPhoto (their files are released by the post_delete signal)
                 for ip in inst.additional_photos.all():
-                    safe_delete_file(ip.photo)
                     ip.delete()
             except CustomerSurvey.installation.RelatedObjectDoesNotExist:
                 pass
@@ -2175,22 +1915,15 @@ def reset_installation(request, installation_id):
 
     survey_id = installation.survey.id
     if request.method == 'POST':
-        # Safely delete files before deleting the record
-        def safe_delete_file(file_field):
-            if file_field and hasattr(file_field, 'path') and os.path.exists(file_field.path):
-                try:
-                    os.remove(file_field.path)
-                except:
-                    pass
-
-        safe_delete_file(installation.inverter_serial_photo)
-        safe_delete_file(installation.inverter_acdb_photo)
-        safe_delete_file(installation.panel_serial_photo)
-        safe_delete_file(installation.site_photos_with_customer)
+        # Delete files before deleting the record
+        delete_stored_file(installation.inverter_serial_photo)
+        delete_stored_file(installation.inverter_acdb_photo)
+        delete_stored_file(installation.panel_serial_photo)
+        delete_stored_file(installation.site_photos_with_customer)
         
-        # Delete related additional photos
+        # Delete related additional photos (their files are released by the post_delete signal;
+        # a file shared with another project is only unlinked when its last reference goes)
         for photo in installation.additional_photos.all():
-            safe_delete_file(photo.photo)
             photo.delete()
 
         installation.delete()
@@ -2207,12 +1940,7 @@ def delete_additional_photo(request, photo_id):
     photo = get_object_or_404(InstallationPhoto, id=photo_id)
     survey_id = photo.installation.survey.id
     if request.method == 'POST':
-        if photo.photo and os.path.exists(photo.photo.path):
-            try:
-                os.remove(photo.photo.path)
-            except:
-                pass
-        photo.delete()
+        photo.delete()  # post_delete releases the file
         messages.success(request, "Additional photo deleted.")
     return redirect('site_detail', pk=survey_id)
 
@@ -2224,12 +1952,7 @@ def clear_installation_field(request, installation_id, field_name):
     installation = get_object_or_404(Installation, id=installation_id)
     if request.method == 'POST':
         if hasattr(installation, field_name):
-            file_field = getattr(installation, field_name)
-            if file_field and hasattr(file_field, 'path') and os.path.exists(file_field.path):
-                try:
-                    os.remove(file_field.path)
-                except:
-                    pass
+            delete_stored_file(getattr(installation, field_name))
             setattr(installation, field_name, None)
             installation.save()
             messages.success(request, f"Image field '{field_name}' cleared.")
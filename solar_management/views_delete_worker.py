@@ -4,7 +4,9 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404
 
-@user_passes_test(lambda u: u.userprofile.role == 'Admin')
+from .roles import user_roles
+
+@user_passes_test(lambda u: user_roles(u).profile_role == 'Admin')
 def delete_worker(request, user_id):
     """Delete a worker user. Admin only."""
     if request.method == 'POST':
@@ -0,0 +1,125 @@
+/*
+ * Resumable chunked uploads for the survey / installation forms
+ * (server side: solar_management/uploads.py).
+ *
+ * ChunkedUpload.buildFormData(form, onProgress) uploads every selected file in
+ * chunks, one file at a time, and resolves with the form's FormData where the
+ * files are replaced by `<field>_upload_ids`. A dropped connection is retried
+ * and resumes from the last chunk the server acknowledged, also after a page
+ * reload (upload ids are remembered per file in localStorage).
+ */
+(function () {
+    const UPLOADS_URL = '/uploads/';
+    const MAX_RETRIES = 6;
+
+    function csrfToken(form) {
+        const el = form.querySelector('[name="csrfmiddlewaretoken"]');
+        return el ? el.value : '';
+    }
+
+    function fileKey(file) {
+        return `chunked-upload:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    // fetch + JSON, retrying network failures and 5xx with exponential backoff.
+    // 4xx answers resolve with ok=false so the caller can act on them.
+    function request(url, options, attempt = 0) {
+        return fetch(url, options)
+            .then(response => {
+                if (response.status >= 500) throw new Error(`Server error ${response.status}`);
+                return response.json().then(data => ({ ok: response.ok, status: response.status, data: data }));
+            })
+            .catch(error => {
+                if (attempt >= MAX_RETRIES) throw error;
+                const delay = Math.min(30000, 1000 * Math.pow(2, attempt));
+                return new Promise(resolve => setTimeout(resolve, delay))
+                    .then(() => request(url, options, attempt + 1));
+            });
+    }
+
+    function startOrResume(file, token) {
+        const start = () => request(UPLOADS_URL, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': token },
+            body: new URLSearchParams({ filename: file.name, size: file.size })
+        }).then(r => {
+            if (!r.ok) throw new Error(r.data.error || 'Upload could not be started.');
+            localStorage.setItem(fileKey(file), r.data.upload_id);
+            return r.data;
+        });
+
+        const savedId = localStorage.getItem(fileKey(file));
+        if (!savedId) return start();
+        return request(`${UPLOADS_URL}${savedId}/`, { headers: { 'X-CSRFToken': token } })
+            .then(r => (r.ok ? r.data : start()));
+    }
+
+    function uploadFile(file, token, onBytes) {
+        return startOrResume(file, token).then(function send(state) {
+            onBytes(state.offset);
+            if (state.complete) return state.upload_id;
+
+            if (state.offset >= state.size) {
+                return request(`${UPLOADS_URL}${state.upload_id}/complete/`, {
+                    method: 'POST',
+                    headers: { 'X-CSRFToken': token }
+                }).then(r => {
+                    if (!r.ok) throw new Error(r.data.error || 'Upload could not be completed.');
+                    return state.upload_id;
+                });
+            }
+
+            const chunk = file.slice(state.offset, state.offset + state.chunk_size);
+            return request(`${UPLOADS_URL}${state.upload_id}/`, {
+                method: 'PUT',
+                headers: {
+                    'X-CSRFToken': token,
+                    'Upload-Offset': String(state.offset),
+                    'Content-Type': 'application/octet-stream'
+                },
+                body: chunk
+            }).then(r => {
+                // 409 means the server has a different offset than we do: continue from its offset
+                if (!r.ok && (r.status !== 409 || r.data.offset === state.offset)) {
+                    throw new Error(r.data.error || 'Upload failed.');
+                }
+                return send(Object.assign(state, { offset: r.data.offset, complete: r.data.complete }));
+            });
+        });
+    }
+
+    function buildFormData(form, onProgress) {
+        const token = csrfToken(form);
+        const inputs = Array.from(form.querySelectorAll('input[type="file"]')).filter(input => input.files.length);
+        const files = [];
+        inputs.forEach(input => Array.from(input.files).forEach(file => files.push({ input: input, file: file })));
+
+        const formData = new FormData(form);
+        inputs.forEach(input => formData.delete(input.name));
+
+        const total = files.reduce((sum, item) => sum + item.file.size, 0) || 1;
+        const sent = new Map();
+        const report = () => {
+            if (!onProgress) return;
+            let bytes = 0;
+            sent.forEach(value => { bytes += value; });
+            onProgress(Math.min(100, Math.floor(bytes * 100 / total)));
+        };
+
+        // One file at a time: on a weak link parallel uploads only compete for bandwidth
+        return files.reduce((chain, item) => chain
+            .then(() => uploadFile(item.file, token, bytes => { sent.set(item.file, bytes); report(); }))
+            .then(uploadId => formData.append(`${item.input.name}_upload_ids`, uploadId)),
+            Promise.resolve()
+        ).then(() => formData);
+    }
+
+    // Forget remembered upload ids once the form that used them was saved
+    function forget(form) {
+        form.querySelectorAll('input[type="file"]').forEach(input => {
+            Array.from(input.files).forEach(file => localStorage.removeItem(fileKey(file)));
+        });
+    }
+
+    window.ChunkedUpload = { buildFormData: buildFormData, forget: forget };
+})();
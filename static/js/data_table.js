@@ -0,0 +1,157 @@
+/*
+ * Server-side data tables for the office list pages
+ * (server side: solar_management/datatables.py).
+ *
+ * Markup: a `[data-table]` element with `data-url` and `data-sort`, holding
+ *   [data-table-body]          the <tbody> the rows are rendered into
+ *   <template data-table-row>  one <tr>, filled per row:
+ *                                data-field="name"        text content
+ *                                data-bind-href="name"    any attribute (data-bind-<attribute>)
+ *                                data-if / data-unless    removed unless / if the value is truthy
+ *   <template data-table-empty>  shown when there are no rows
+ *   [data-table-search]        search box (?q=)
+ *   [data-table-filter="col"]  <select> filtering an exact column value
+ *   th[data-sort="col"]        sortable header; click toggles ascending / descending
+ *   [data-table-prev|next]     cursor buttons, [data-table-total] the row count
+ *
+ * Only the columns the row template uses are requested (?columns=).
+ */
+(function () {
+    const SEARCH_DELAY = 300;
+
+    function boundColumns(template) {
+        const names = new Set();
+        template.content.querySelectorAll('*').forEach(el => {
+            for (const attr of el.attributes) {
+                if (attr.name === 'data-field' || attr.name === 'data-if' || attr.name === 'data-unless'
+                    || attr.name.startsWith('data-bind-')) {
+                    names.add(attr.value);
+                }
+            }
+        });
+        return Array.from(names);
+    }
+
+    function renderRow(template, row) {
+        const tr = template.content.firstElementChild.cloneNode(true);
+        const elements = [tr, ...tr.querySelectorAll('*')];
+        elements.forEach(el => {
+            if (el.dataset.if !== undefined && !row[el.dataset.if]) return el.remove();
+            if (el.dataset.unless !== undefined && row[el.dataset.unless]) return el.remove();
+            if (el.dataset.field !== undefined) {
+                const value = row[el.dataset.field];
+                el.textContent = (value === null || value === undefined || value === '')
+                    ? (el.dataset.default || '') : value;
+            }
+            for (const attr of Array.from(el.attributes)) {
+                if (attr.name.startsWith('data-bind-')) {
+                    el.setAttribute(attr.name.slice('data-bind-'.length), row[attr.value] ?? '');
+                }
+            }
+        });
+        return tr;
+    }
+
+    class DataTable {
+        constructor(root) {
+            this.root = root;
+            this.url = root.dataset.url;
+            this.sort = root.dataset.sort || '';
+            this.body = root.querySelector('[data-table-body]');
+            this.rowTemplate = root.querySelector('template[data-table-row]');
+            this.emptyTemplate = root.querySelector('template[data-table-empty]');
+            this.columns = boundColumns(this.rowTemplate);
+            this.search = root.querySelector('[data-table-search]');
+            this.filters = root.querySelectorAll('[data-table-filter]');
+            this.prev = root.querySelector('[data-table-prev]');
+            this.next = root.querySelector('[data-table-next]');
+            this.total = root.querySelector('[data-table-total]');
+            this.requestId = 0;
+            this.bind();
+            this.load();
+        }
+
+        bind() {
+            let timer = null;
+            if (this.search) {
+                this.search.addEventListener('input', () => {
+                    clearTimeout(timer);
+                    timer = setTimeout(() => this.load(), SEARCH_DELAY);
+                });
+            }
+            this.filters.forEach(select => select.addEventListener('change', () => this.load()));
+            this.root.querySelectorAll('th[data-sort]').forEach(th => {
+                th.style.cursor = 'pointer';
+                th.addEventListener('click', () => {
+                    this.sort = this.sort === th.dataset.sort ? `-${th.dataset.sort}` : th.dataset.sort;
+                    this.load();
+                });
+            });
+            if (this.prev) this.prev.addEventListener('click', () => this.load(this.prev.dataset.cursor));
+            if (this.next) this.next.addEventListener('click', () => this.load(this.next.dataset.cursor));
+        }
+
+        params(cursor) {
+            const params = new URLSearchParams({ format: 'json', columns: this.columns.join(',') });
+            if (this.sort) params.set('sort', this.sort);
+            if (this.search && this.search.value.trim()) params.set('q', this.search.value.trim());
+            this.filters.forEach(select => {
+                if (select.value) params.set(select.dataset.tableFilter, select.value);
+            });
+            if (cursor) params.set('cursor', cursor);
+            return params;
+        }
+
+        load(cursor) {
+            const id = ++this.requestId;
+            this.root.setAttribute('aria-busy', 'true');
+            fetch(`${this.url}?${this.params(cursor)}`, { headers: { 'Accept': 'application/json' } })
+                .then(response => {
+                    if (!response.ok) throw new Error(`Server error ${response.status}`);
+                    return response.json();
+                })
+                .then(data => {
+                    if (id !== this.requestId) return; // a newer request is on its way
+                    this.render(data);
+                })
+                .catch(error => console.error('Data table load failed:', error))
+                .finally(() => {
+                    if (id === this.requestId) this.root.removeAttribute('aria-busy');
+                });
+        }
+
+        render(data) {
+            const rows = data.results.map(row => renderRow(this.rowTemplate, row));
+            if (!rows.length && this.emptyTemplate) {
+                rows.push(this.emptyTemplate.content.firstElementChild.cloneNode(true));
+            }
+            this.body.replaceChildren(...rows);
+
+            this.sort = data.sort;
+            this.root.querySelectorAll('th[data-sort]').forEach(th => {
+                const column = th.dataset.sort;
+                const state = this.sort === column ? 'ascending' : this.sort === `-${column}` ? 'descending' : 'none';
+                th.setAttribute('aria-sort', state);
+                th.querySelectorAll('.sort-indicator').forEach(el => el.remove());
+                if (state !== 'none') {
+                    const icon = document.createElement('i');
+                    icon.className = `sort-indicator bi ms-1 bi-caret-${state === 'ascending' ? 'up' : 'down'}-fill`;
+                    th.appendChild(icon);
+                }
+            });
+
+            for (const [button, cursor] of [[this.prev, data.previous], [this.next, data.next]]) {
+                if (!button) continue;
+                button.disabled = !cursor;
+                button.dataset.cursor = cursor || '';
+            }
+            if (this.total && data.total !== null) {
+                this.total.textContent = `${data.total}${data.total_capped ? '+' : ''} records`;
+            }
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-table]').forEach(root => new DataTable(root));
+    });
+})();
@@ -0,0 +1,146 @@
+/*
+ * Browser-side photo compression for the upload forms.
+ *
+ * When images are picked in any <input type="file">, JPEG / PNG / WebP files
+ * are scaled to fit data-max-dimension and re-encoded as JPEG at data-quality
+ * in a Web Worker (OffscreenCanvas), and the input's files are replaced with
+ * the smaller versions. PDFs and other files are left alone, as is any image
+ * the re-encode would not make smaller. Browsers without Worker /
+ * OffscreenCanvas simply send the originals (the server recompresses them too).
+ *
+ * A form submit waits for pending compressions, so the existing submit code
+ * (XHR or plain POST) always sends the compressed files. Hidden inputs
+ * `upload_original_bytes` / `upload_sent_bytes` / `upload_file_count` carry
+ * the totals so the server can record the bandwidth saved per submission.
+ *
+ * Configured by the <script> tag's data attributes, filled from the CLIENT_IMAGE_*
+ * settings (solar_management/context_processors.py).
+ */
+(function () {
+    const script = document.currentScript;
+    const config = {
+        enabled: script.dataset.enabled === 'true',
+        workerUrl: script.dataset.worker,
+        maxDimension: parseInt(script.dataset.maxDimension, 10) || 2560,
+        quality: (parseInt(script.dataset.quality, 10) || 82) / 100
+    };
+    const COMPRESSIBLE_TYPES = ['image/jpeg', 'image/png', 'image/webp'];
+
+    let supported = config.enabled && 'Worker' in window && 'OffscreenCanvas' in window
+        && 'createImageBitmap' in window && 'DataTransfer' in window;
+    let worker = null;
+    let nextId = 0;
+    const callbacks = new Map();
+    const pending = new Set();
+    const stats = new Map();        // input -> { original, sent, count }
+    const generations = new Map();  // input -> latest selection, so a stale result is dropped
+
+    function getWorker() {
+        if (!worker) {
+            worker = new Worker(config.workerUrl);
+            worker.onmessage = e => {
+                const callback = callbacks.get(e.data.id);
+                callbacks.delete(e.data.id);
+                if (callback) callback(e.data.blob);
+            };
+            worker.onerror = () => {
+                // Worker could not run: send originals from now on
+                supported = false;
+                callbacks.forEach(callback => callback(null));
+                callbacks.clear();
+            };
+        }
+        return worker;
+    }
+
+    function compress(file) {
+        if (!supported || !COMPRESSIBLE_TYPES.includes(file.type)) return Promise.resolve(file);
+        return new Promise(resolve => {
+            const id = ++nextId;
+            callbacks.set(id, blob => {
+                if (!blob || blob.size >= file.size) {
+                    resolve(file);
+                    return;
+                }
+                const name = file.name.replace(/\.[^.]+$/, '') + '.jpg';
+                resolve(new File([blob], name, { type: 'image/jpeg', lastModified: file.lastModified }));
+            });
+            getWorker().postMessage({ id: id, file: file, maxDimension: config.maxDimension, quality: config.quality });
+        });
+    }
+
+    function hiddenInput(form, name) {
+        let input = form.querySelector(`input[type="hidden"][name="${name}"]`);
+        if (!input) {
+            input = document.createElement('input');
+            input.type = 'hidden';
+            input.name = name;
+            form.appendChild(input);
+        }
+        return input;
+    }
+
+    function updateTotals(form) {
+        if (!form) return;
+        let original = 0, sent = 0, count = 0;
+        stats.forEach((value, input) => {
+            if (input.form === form && input.files.length) {
+                original += value.original;
+                sent += value.sent;
+                count += value.count;
+            }
+        });
+        hiddenInput(form, 'upload_original_bytes').value = original;
+        hiddenInput(form, 'upload_sent_bytes').value = sent;
+        hiddenInput(form, 'upload_file_count').value = count;
+    }
+
+    function onFilesSelected(input) {
+        const files = Array.from(input.files);
+        const generation = (generations.get(input) || 0) + 1;
+        generations.set(input, generation);
+
+        const job = Promise.all(files.map(compress)).then(results => {
+            if (generations.get(input) !== generation) return;
+            if (results.some((file, i) => file !== files[i])) {
+                const transfer = new DataTransfer();
+                results.forEach(file => transfer.items.add(file));
+                input.files = transfer.files;  // does not fire another change event
+            }
+            stats.set(input, {
+                original: files.reduce((sum, file) => sum + file.size, 0),
+                sent: results.reduce((sum, file) => sum + file.size, 0),
+                count: files.length
+            });
+            updateTotals(input.form);
+        });
+        pending.add(job);
+        job.finally(() => pending.delete(job));
+    }
+
+    function ready() {
+        return pending.size ? Promise.all(Array.from(pending)).then(ready) : Promise.resolve();
+    }
+
+    document.addEventListener('change', e => {
+        if (e.target.matches && e.target.matches('input[type="file"]')) onFilesSelected(e.target);
+    }, true);
+
+    // Runs before the page's own submit handlers (capture on document): hold the submit until compression is done
+    document.addEventListener('submit', e => {
+        if (!pending.size) return;
+        const form = e.target;
+        const submitter = e.submitter;
+        e.preventDefault();
+        e.stopImmediatePropagation();
+        ready().then(() => {
+            if (form.requestSubmit) {
+                form.requestSubmit(submitter && submitter.form === form ? submitter : undefined);
+            } else {
+                form.submit();
+            }
+        });
+    }, true);
+
+    window.ImageCompressor = { ready: ready };
+})();
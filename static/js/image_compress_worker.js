@@ -0,0 +1,27 @@
+/*
+ * Web Worker for static/js/image_compress.js: decodes one image, scales it to
+ * fit maxDimension and re-encodes it as JPEG, off the main thread.
+ * Replies { id, blob } (blob is null if the image could not be processed).
+ */
+self.onmessage = function (e) {
+    const { id, file, maxDimension, quality } = e.data;
+
+    createImageBitmap(file, { imageOrientation: 'from-image' })
+        .then(bitmap => {
+            const scale = Math.min(1, maxDimension / Math.max(bitmap.width, bitmap.height));
+            const width = Math.max(1, Math.round(bitmap.width * scale));
+            const height = Math.max(1, Math.round(bitmap.height * scale));
+
+            const canvas = new OffscreenCanvas(width, height);
+            const ctx = canvas.getContext('2d');
+            ctx.imageSmoothingQuality = 'high';
+            // Transparent PNG areas become white, as they do in the server-side ingest
+            ctx.fillStyle = '#ffffff';
+            ctx.fillRect(0, 0, width, height);
+            ctx.drawImage(bitmap, 0, 0, width, height);
+            bitmap.close();
+            return canvas.convertToBlob({ type: 'image/jpeg', quality: quality });
+        })
+        .then(blob => self.postMessage({ id: id, blob: blob }))
+        .catch(() => self.postMessage({ id: id, blob: null }));
+};
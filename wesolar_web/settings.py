@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'solar_management.middleware.RequestTimingMiddleware',  # Server-Timing / SQL stats (sampled)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,6 +69,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.media', # Added for photo support
+                'solar_management.context_processors.image_compression',
+                'solar_management.context_processors.roles',
             ],
         },
     },
@@ -119,13 +122,95 @@ STATICFILES_DIRS = [
 # This is what was missing!
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles') 
 
-# Enable WhiteNoise's GZip compression of static assets.
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# File storage backends.
+# - default: uploaded media, booked into the storage ledger (see solar_management/storage.py)
+# - staticfiles: WhiteNoise's GZip compression of static assets.
+STORAGES = {
+    'default': {
+        'BACKEND': 'solar_management.storage.LedgerFileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # 4. Media files (Photos uploaded by Installers)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# 5. Generated Excel reports (background jobs). Kept outside MEDIA_ROOT: only served through the app.
+REPORTS_ROOT = os.environ.get('DJANGO_REPORTS_ROOT', os.path.join(BASE_DIR, 'private', 'reports'))
+REPORT_RETENTION_HOURS = int(os.environ.get('REPORT_RETENTION_HOURS', 24))
+# A Running job without a heartbeat for this long belongs to a dead worker and is queued again
+REPORT_JOB_STALE_MINUTES = int(os.environ.get('REPORT_JOB_STALE_MINUTES', 10))
+
+# 6. Upload ingest: recompress survey / installation photos before storing them (see solar_management/ingest.py).
+# Off unless enabled: re-encoding is lossy, and these are Aadhar / PAN / bank document scans.
+IMAGE_INGEST_ENABLED = os.environ.get('IMAGE_INGEST_ENABLED', 'False') == 'True'
+IMAGE_INGEST_MAX_DIMENSION = int(os.environ.get('IMAGE_INGEST_MAX_DIMENSION', 2560))
+IMAGE_INGEST_QUALITY = int(os.environ.get('IMAGE_INGEST_QUALITY', 82))
+IMAGE_INGEST_FORMAT = os.environ.get('IMAGE_INGEST_FORMAT', 'JPEG')  # JPEG or WEBP
+
+# 7. Chunked (resumable) uploads from the survey / installation forms (see solar_management/uploads.py)
+UPLOAD_STAGING_ROOT = os.environ.get('DJANGO_UPLOAD_STAGING_ROOT', os.path.join(BASE_DIR, 'private', 'uploads'))
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 512 * 1024))
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 50 * 1024 * 1024))
+UPLOAD_STAGING_TTL_HOURS = int(os.environ.get('UPLOAD_STAGING_TTL_HOURS', 24))
+
+# 8. Browser-side photo compression before upload (see static/js/image_compress.js)
+CLIENT_IMAGE_COMPRESSION_ENABLED = os.environ.get('CLIENT_IMAGE_COMPRESSION_ENABLED', 'True') == 'True'
+CLIENT_IMAGE_MAX_DIMENSION = int(os.environ.get('CLIENT_IMAGE_MAX_DIMENSION', IMAGE_INGEST_MAX_DIMENSION))
+CLIENT_IMAGE_QUALITY = int(os.environ.get('CLIENT_IMAGE_QUALITY', 82))
+
+# 9. Protected media: MEDIA_URL goes through an access check, then the web server sends the file
+# (see solar_management/media_access.py). '' = Django streams it, 'x-accel-redirect' = nginx, 'x-sendfile' = Apache
+MEDIA_SENDFILE_BACKEND = os.environ.get('MEDIA_SENDFILE_BACKEND', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# 10. SiteSettings (maintenance mode) cached per worker; saving it bumps the stamp file (see solar_management/site_settings.py)
+SITE_SETTINGS_CACHE_TTL = float(os.environ.get('SITE_SETTINGS_CACHE_TTL', 60))
+SITE_SETTINGS_CHECK_INTERVAL = float(os.environ.get('SITE_SETTINGS_CHECK_INTERVAL', 1))
+SITE_SETTINGS_STAMP_FILE = os.environ.get('SITE_SETTINGS_STAMP_FILE', os.path.join(BASE_DIR, 'private', 'site_settings.stamp'))
+
+# 11. Cache tier (see solar_management/caching.py). CACHE_BACKEND: locmem, file or redis.
+# Defaults to locmem with DEBUG (local runs) and to the shared file cache otherwise, so all gunicorn
+# workers see the same cached data and model versions. redis needs the `redis` package (requirements.txt).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+if CACHE_BACKEND == 'redis':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    }}
+elif CACHE_BACKEND == 'file':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'private', 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }}
+else:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wesolar',
+    }}
+CACHES['default'].update({'KEY_PREFIX': 'wesolar', 'TIMEOUT': CACHE_DEFAULT_TIMEOUT})
+
+# 12. Request timing (see RequestTimingMiddleware in solar_management/middleware.py): share of requests
+# that get SQL / template timings logged (0 turns it off). Every request in DEBUG, 1 in 20 in production.
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 1.0 if DEBUG else 0.05))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'solar_management.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        # Failures in the upload hooks (thumbnails.py, ingest.py) and the rest of the app
+        'solar_management': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
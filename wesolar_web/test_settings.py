@@ -0,0 +1,32 @@
+"""
+Settings for the test suite: SQLite and throwaway media / report directories.
+    python manage.py test solar_management --settings=wesolar_web.test_settings
+"""
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+_TEST_ROOT = tempfile.mkdtemp(prefix='wesolar-tests-')
+MEDIA_ROOT = os.path.join(_TEST_ROOT, 'media')
+REPORTS_ROOT = os.path.join(_TEST_ROOT, 'reports')
+UPLOAD_STAGING_ROOT = os.path.join(_TEST_ROOT, 'uploads')
+SITE_SETTINGS_STAMP_FILE = os.path.join(_TEST_ROOT, 'site_settings.stamp')
+STATIC_ROOT = os.path.join(_TEST_ROOT, 'static')
+os.makedirs(STATIC_ROOT)
+
+STORAGES = dict(STORAGES, staticfiles={'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'})
+CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'wesolar-tests',
+    'KEY_PREFIX': 'wesolar',
+    'TIMEOUT': CACHE_DEFAULT_TIMEOUT,
+}}
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+REQUEST_TIMING_SAMPLE_RATE = 0
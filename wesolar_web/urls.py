@@ -3,7 +3,7 @@ from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from django.conf import settings
 from django.conf.urls.static import static
-from solar_management.views import custom_logout
+from solar_management.views import custom_logout, protected_media
 
 urlpatterns = [
     # 1. Admin Interface
@@ -20,7 +20,9 @@ urlpatterns = [
 ]
 
 # 4. Media & Static Files Support
-# Necessary for viewing uploaded Panel/Inverter photos during development
+# Uploaded media always goes through an access check (see solar_management/media_access.py)
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", protected_media, name='protected_media'),
+]
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file